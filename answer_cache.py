@@ -0,0 +1,119 @@
+"""
+Answer Cache
+Semantic cache of LLM answers keyed by question embedding and retrieved documents
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class CachedAnswer:
+    """An answer produced for a question and the documents it was grounded on"""
+    question: str
+    answer: str
+    embedding: np.ndarray
+    document_ids: tuple
+    created: float
+
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of answers for semantically similar questions
+
+    A cached answer is reused when the new question's embedding is within
+    `threshold` cosine similarity of a cached question AND retrieval returned
+    the same documents, so answers never outlive the context they were built
+    from. Entries expire after `ttl` seconds and the least recently used entry
+    is evicted once `max_entries` is reached. The whole cache is dropped when
+    the document store version changes.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def check_version(self, version: str):
+        """Clear the cache if the document store has changed since it was filled"""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def lookup(self, embedding: Sequence[float], document_ids: List[str]) -> Optional[CachedAnswer]:
+        """Find a cached answer for a similar question over the same documents"""
+        query = self._unit(embedding)
+        document_ids = tuple(document_ids)
+        now = time.time()
+
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if now - entry.created > self.ttl]
+            for key in expired:
+                del self._entries[key]
+
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.document_ids == document_ids
+            ]
+            if candidates:
+                scores = np.stack([entry.embedding for _, entry in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, embedding: Sequence[float], document_ids: List[str], answer: str):
+        """Cache an answer"""
+        entry = CachedAnswer(
+            question=question,
+            answer=answer,
+            embedding=self._unit(embedding),
+            document_ids=tuple(document_ids),
+            created=time.time()
+        )
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters since the cache was created"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions
+        }
@@ -0,0 +1,293 @@
+"""
+HTTP API Server
+Serves the knowledge base over HTTP from one shared, warmed RAG pipeline
+
+Endpoints:
+    POST /query         {"question": "...", "filters": {...}, "collection": "..."} -> answer and
+                        retrieved documents (JSON)
+    POST /query/stream  {"question": "...", "filters": {...}, "collection": "..."} -> newline-delimited
+                        JSON events (documents, then tokens, then done)
+
+"filters" is optional, e.g. {"file_type": ["pdf", "word"], "filepath": "*/policies/*"}
+"collection" is optional (default: DEFAULT_COLLECTION); collections load on their first question
+A W3C "traceparent" request header continues the caller's trace; answers include their "trace_id"
+    GET  /health        liveness - the process is up
+    GET  /ready         readiness - 200 once the pipeline is loaded, 503 before
+    GET  /metrics       per-stage query latency histograms and counters (Prometheus text format)
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict
+
+from haystack import Document
+from rich.console import Console
+
+import metrics
+import tracing
+from config import Config
+from llm_providers import CircuitOpenError
+from rag_pipeline import KnowledgeBaseManager, RAGPipeline
+
+console = Console()
+
+
+def document_summary(doc: Document) -> Dict[str, Any]:
+    """JSON-serialisable view of a retrieved document"""
+    return {"id": doc.id, "content": doc.content, "meta": doc.meta, "score": doc.score}
+
+
+def result_to_json(result: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serialisable view of a query result"""
+    result = dict(result)
+    result["retrieved_documents"] = [document_summary(doc) for doc in result.get("retrieved_documents", [])]
+    return result
+
+
+class PipelineService:
+    """Owns the shared knowledge bases and loads the default one in the background"""
+
+    def __init__(self):
+        self.knowledge_bases = KnowledgeBaseManager()
+        self.ready = False
+        self.error = None
+        self.num_documents = 0
+        self.started = time.time()
+
+    def load(self):
+        """Load the document store and warm the models (run once at startup)"""
+        try:
+            self.num_documents = len(self.knowledge_bases.get().documents)
+            self.ready = True
+            console.print(f"[green]+[/green] Pipeline ready ({self.num_documents} documents)")
+        except Exception as e:
+            self.error = str(e)
+            console.print(f"[red]X Pipeline failed to load: {e}[/red]")
+
+    @property
+    def rag(self) -> RAGPipeline:
+        """Pipeline of the default collection"""
+        return self.knowledge_bases.pipeline()
+
+    def start(self):
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "documents": self.num_documents,
+            "warmup": self.rag.readiness()["stages"],
+            "uptime": round(time.time() - self.started, 1),
+            "answer_cache": self.rag.cache_stats(),
+            "llm": self.rag.llm_stats(),
+            "coalescing": self.rag.coalescer.stats() if self.rag.coalescer is not None else None,
+            "collections": self.knowledge_bases.stats()
+        }
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """Request handler; the service is attached to the server"""
+
+    server_version = "RAPIDRAG/1.0"
+
+    @property
+    def service(self) -> PipelineService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        console.print(f"[dim]{self.address_string()} {format % args}[/dim]")
+
+    def send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_question(self):
+        """
+        Parse {"question": ..., "filters": ..., "collection": ...} from the request body
+
+        Returns (question, filters, pipeline), or None after sending an error
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Request body must be JSON"})
+            return None
+
+        question = payload.get("question") if isinstance(payload, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "'question' must be a non-empty string"})
+            return None
+
+        filters = payload.get("filters") or None
+        if filters is not None and not isinstance(filters, dict):
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "'filters' must be an object"})
+            return None
+
+        collection = payload.get("collection") or Config.DEFAULT_COLLECTION
+        if collection not in self.service.knowledge_bases.names():
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown collection: {collection}"})
+            return None
+
+        if not self.service.ready:
+            self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Pipeline is not ready", **self.service.status()})
+            return None
+
+        try:
+            rag = self.service.knowledge_bases.get(collection)
+        except FileNotFoundError as e:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": str(e)})
+            return None
+        return question.strip(), filters, rag
+
+    def request_span(self, name: str) -> tracing.Span:
+        """Root span of a request, continuing the caller's trace when a traceparent header is sent"""
+        trace_id, parent_id = tracing.parse_traceparent(self.headers.get("traceparent")) or (None, None)
+        return tracing.start_span(name, trace_id=trace_id, parent_id=parent_id, path=self.path)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/ready":
+            status = HTTPStatus.OK if self.service.ready else HTTPStatus.SERVICE_UNAVAILABLE
+            self.send_json(status, self.service.status())
+        elif self.path == "/metrics":
+            body = metrics.histograms.prometheus_text().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path == "/query":
+            self.handle_query()
+        elif self.path == "/query/stream":
+            self.handle_stream()
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+
+    def handle_query(self):
+        request = self.read_question()
+        if request is None:
+            return
+        question, filters, rag = request
+
+        start_time = time.perf_counter()
+        span = self.request_span("api.query")
+        try:
+            with tracing.use_span(span):
+                result = rag.query(question, filters=filters)
+        except ValueError as e:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": str(e), "trace_id": span.trace_id})
+            return
+        except CircuitOpenError as e:
+            self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e), "trace_id": span.trace_id})
+            return
+        except Exception as e:
+            self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e), "trace_id": span.trace_id})
+            return
+        finally:
+            tracing.end_span(span)
+
+        payload = result_to_json(result)
+        payload["elapsed"] = round(time.perf_counter() - start_time, 4)
+        payload["trace_id"] = span.trace_id
+        self.send_json(HTTPStatus.OK, payload)
+
+    def handle_stream(self):
+        request = self.read_question()
+        if request is None:
+            return
+        question, filters, rag = request
+
+        # HTTP/1.0 response: the body ends when the connection closes
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send_event(event: Dict[str, Any]):
+            self.wfile.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        span = self.request_span("api.query_stream")
+        try:
+            with tracing.use_span(span):
+                for event in rag.stream_query(question, filters):
+                    if event["type"] == "documents":
+                        event = {"type": "documents", "documents": [document_summary(d) for d in event["documents"]]}
+                    elif event["type"] == "done":
+                        event = {**result_to_json(event), "trace_id": span.trace_id}
+                    send_event(event)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            send_event({"type": "error", "error": str(e), "trace_id": span.trace_id})
+        finally:
+            tracing.end_span(span)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles requests on a fixed-size thread pool"""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, service: PipelineService, workers: int):
+        super().__init__(address, handler)
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-http")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the knowledge base over HTTP")
+    parser.add_argument("--host", default=Config.API_HOST, help=f"Bind address (default: {Config.API_HOST})")
+    parser.add_argument("--port", type=int, default=Config.API_PORT, help=f"Port (default: {Config.API_PORT})")
+    parser.add_argument("--workers", type=int, default=Config.API_WORKERS,
+                        help=f"Request worker threads (default: {Config.API_WORKERS})")
+    args = parser.parse_args()
+
+    service = PipelineService()
+    service.start()
+
+    server = PooledHTTPServer((args.host, args.port), RAGRequestHandler, service, max(1, args.workers))
+    console.print(f"\n[bold cyan]RAPIDRAG API listening on http://{args.host}:{args.port}[/bold cyan]")
+    console.print(f"[dim]{args.workers} worker thread(s); loading pipeline in the background...[/dim]\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[cyan]Shutting down...[/cyan]")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,36 @@ Interactive RAG Chatbot
 A command-line interface for chatting with your knowledge base
 """
 
+import argparse
 import sys
+import threading
+import time
 from datetime import datetime
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.prompt import Prompt
 from rich.table import Table
 
+import metrics
+import tracing
 from config import Config
+from metadata_index import parse_filter_args
+from metrics import format_seconds
+from profiling import profiled
 from rag_pipeline import SimpleRAGPipeline
 
 
 class InteractiveChatbot:
     """Interactive chatbot with CLI interface"""
     
-    def __init__(self):
+    def __init__(self, collection: str = None, profile: bool = False):
         self.console = Console()
-        self.rag = SimpleRAGPipeline()
+        self.profile = profile
+        self.rag = SimpleRAGPipeline(collection)
         self.conversation_history = []
+        self.filters = {}
         self.initialized = False
         
     def display_header(self):
@@ -53,6 +64,7 @@ class InteractiveChatbot:
             table.add_row("Model", llm_config["model"])
             table.add_row("URL", llm_config["base_url"])
         
+        table.add_row("Collection", self.rag.collection)
         table.add_row("Embedding Model", Config.EMBEDDING_MODEL)
         table.add_row("Retrieval Docs", str(Config.TOP_K_RETRIEVAL))
         
@@ -64,25 +76,55 @@ class InteractiveChatbot:
         self.console.print("[cyan]🔧 Initializing RAG system...[/cyan]")
         
         try:
-            with self.console.status("[bold cyan]Loading knowledge base..."):
-                num_docs = self.rag.initialize()
+            # Store, embedder and LLM load concurrently; show their progress meanwhile
+            result = {}
+            
+            def run():
+                try:
+                    result["num_docs"] = self.rag.initialize()
+                except Exception as e:
+                    result["error"] = e
+            
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            with self.console.status("[bold cyan]Loading knowledge base...") as status:
+                while thread.is_alive():
+                    stages = self.rag.readiness()["stages"]
+                    status.update("[bold cyan]Warming up: " + ", ".join(
+                        f"{stage} {state['status']}" for stage, state in stages.items()
+                    ))
+                    time.sleep(0.2)
+            if "error" in result:
+                raise result["error"]
+            num_docs = result["num_docs"]
             
             self.initialized = True
             self.console.print(f"[green]✓ Knowledge base loaded with {num_docs} documents[/green]")
+            self.display_warmup()
             self.console.print()
             return True
             
         except FileNotFoundError as e:
             self.console.print(f"\n[red]❌ Error: {e}[/red]\n")
+            collection_arg = f" --collection {self.rag.collection}" if self.rag.collection != "default" else ""
             self.console.print("[yellow]Please run the document ingestion first:[/yellow]")
-            self.console.print("[cyan]  python ingest_documents.py --samples[/cyan]")
-            self.console.print("[dim]  (or add your own documents to ./documents/)[/dim]\n")
+            self.console.print(f"[cyan]  python ingest_documents.py{collection_arg} --samples[/cyan]")
+            self.console.print(f"[dim]  (or add your own documents to {self.rag.rag.config.DOCUMENTS_DIR})[/dim]\n")
             return False
             
         except Exception as e:
             self.console.print(f"\n[red]❌ Initialization error: {e}[/red]\n")
             return False
     
+    def display_warmup(self):
+        """Show how long each start-up stage took"""
+        for stage, state in self.rag.readiness()["stages"].items():
+            seconds = f"{state['seconds']:.1f}s" if state["seconds"] is not None else "-"
+            if state["status"] == "degraded":
+                self.console.print(f"[yellow]! {stage}: {state['error']}[/yellow]")
+            else:
+                self.console.print(f"[dim]  {stage}: {state['status']} in {seconds}[/dim]")
+    
     def display_help(self):
         """Display help information"""
         help_text = """
@@ -93,6 +135,10 @@ class InteractiveChatbot:
 • `info` - Display system information
 • `history` - Show conversation history
 • `clear` - Clear conversation history
+• `filter field=value ...` - Only search matching documents, e.g.
+  `filter file_type=pdf filepath=*/policies/*` (comma-separate values to allow several)
+• `filter` - Show the active filter, `filter clear` - Remove it
+• `collection` - List knowledge bases, `collection <name>` - Switch to another one
 • `exit` or `quit` - Exit the chatbot
 
 **Tips:**
@@ -110,10 +156,42 @@ class InteractiveChatbot:
         info_table.add_column("Status", style="green")
         
         info_table.add_row("RAG System", "✓ Initialized" if self.initialized else "✗ Not initialized")
+        info_table.add_row("Collection", self.rag.collection)
         info_table.add_row("Conversations", str(len(self.conversation_history)))
         info_table.add_row("LLM Provider", Config.LLM_PROVIDER.upper())
         info_table.add_row("Privacy Mode", "✓ Local" if Config.LLM_PROVIDER != "openai" else "Cloud (OpenAI)")
         
+        cache_stats = self.rag.rag.cache_stats() if self.initialized else None
+        if cache_stats:
+            info_table.add_row(
+                "Answer Cache",
+                f"{cache_stats['hits']} hit(s) / {cache_stats['misses']} miss(es) "
+                f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} cached"
+            )
+        
+        llm_stats = self.rag.rag.llm_stats() if self.initialized else None
+        if llm_stats:
+            connections = llm_stats["connections"]
+            reuse = f", {connections['reuse_rate']:.0%} connection reuse" if connections and connections["reuse_rate"] is not None else ""
+            info_table.add_row(
+                "LLM Calls",
+                f"{llm_stats['calls']} call(s), {llm_stats['retries']} retried, {llm_stats['failures']} failed, "
+                f"circuit {llm_stats['circuit']['state']}{reuse}"
+            )
+        
+        latency = metrics.histograms.summary()
+        if latency:
+            info_table.add_row(
+                "Latency (p50 / p95)",
+                ", ".join(f"{stage} {format_seconds(latency[stage]['p50'])} / {format_seconds(latency[stage]['p95'])}"
+                          for stage in metrics.STAGES + ["total"] if stage in latency)
+            )
+        
+        kb_stats = self.rag.knowledge_bases.stats()
+        loaded = ", ".join(f"{name} ({mb:.0f} MB)" for name, mb in kb_stats["loaded"].items())
+        limit = f" of {kb_stats['limit_mb']} MB" if kb_stats["limit_mb"] else ""
+        info_table.add_row("Loaded Collections", f"{loaded or 'none'}{limit}")
+        
         self.console.print()
         self.console.print(info_table)
         self.console.print()
@@ -131,33 +209,115 @@ class InteractiveChatbot:
             self.console.print(f"[green]   A:[/green] {conv['answer'][:200]}...")
             self.console.print()
     
+    def set_filters(self, args: str):
+        """Handle the 'filter' command"""
+        args = args.strip()
+        if args.lower() == "clear":
+            self.filters = {}
+            self.console.print("[green]✓ Filter cleared - searching all documents[/green]\n")
+            return
+        
+        if args:
+            try:
+                filters = parse_filter_args(args.split())
+            except ValueError as e:
+                self.console.print(f"[red]❌ {e}[/red]\n")
+                return
+            unknown = [field for field in filters if field not in Config.METADATA_INDEX_FIELDS]
+            if unknown:
+                self.console.print(
+                    f"[red]❌ Cannot filter on {', '.join(unknown)}. "
+                    f"Available fields: {', '.join(Config.METADATA_INDEX_FIELDS)}[/red]\n"
+                )
+                return
+            self.filters = filters
+        
+        if self.filters:
+            active = ", ".join(f"{field}={value}" for field, value in self.filters.items())
+            self.console.print(f"[cyan]🔎 Active filter: {active}[/cyan]\n")
+        else:
+            self.console.print("[dim]No filter - searching all documents[/dim]\n")
+    
+    def set_collection(self, name: str):
+        """Handle the 'collection' command"""
+        name = name.strip()
+        available = self.rag.knowledge_bases.names()
+        if not name:
+            for collection in available:
+                marker = "→" if collection == self.rag.collection else " "
+                loaded = " [dim](loaded)[/dim]" if self.rag.knowledge_bases.is_loaded(collection) else ""
+                self.console.print(f"[cyan]{marker} {collection}[/cyan]{loaded}")
+            self.console.print()
+            return
+        
+        if name not in available:
+            self.console.print(f"[red]❌ Unknown collection '{name}'. Available: {', '.join(available)}[/red]\n")
+            return
+        
+        previous = self.rag.collection
+        self.rag.select_collection(name)
+        if not self.initialize_system():
+            self.rag.select_collection(previous)
+            return
+        self.console.print(f"[green]✓ Now searching the '{name}' collection[/green]\n")
+    
     def clear_history(self):
         """Clear conversation history"""
         self.conversation_history = []
         self.console.print("[green]✓ Conversation history cleared[/green]\n")
     
-    def ask_question(self, question: str):
-        """Process a user question"""
-        # Show thinking indicator
-        with self.console.status("[bold cyan]🤔 Thinking..."):
-            try:
-                result = self.rag.ask_detailed(question)
-            except Exception as e:
-                self.console.print(f"\n[red]❌ Error: {e}[/red]\n")
-                return
-        
-        # Display answer
-        answer = result["answer"]
-        self.console.print()
-        self.console.print(Panel(
+    @staticmethod
+    def answer_panel(answer: str) -> Panel:
+        """Panel used to display an answer"""
+        return Panel(
             answer,
             title="[bold green]🤖 Answer[/bold green]",
             border_style="green",
             padding=(1, 2)
-        ))
+        )
+    
+    def ask_question(self, question: str):
+        """Process a user question, displaying the answer as it streams in"""
+        result = None
+        answer = ""
+        # Root span of the question; the pipeline's spans join its trace
+        span = tracing.start_span("chatbot.question", collection=self.rag.collection)
+        try:
+            with tracing.use_span(span):
+                # Show thinking indicator until the documents are retrieved
+                with self.console.status("[bold cyan]🤔 Thinking..."):
+                    events = self.rag.ask_stream(question, filters=self.filters or None)
+                    next(events)
+                
+                # Display answer
+                self.console.print()
+                with Live(self.answer_panel(""), console=self.console, refresh_per_second=15) as live:
+                    for event in events:
+                        if event["type"] == "token":
+                            answer += event["text"]
+                            live.update(self.answer_panel(answer))
+                        elif event["type"] == "done":
+                            result = event
+                            answer = result["answer"]
+                            live.update(self.answer_panel(answer))
+        except Exception as e:
+            trace = f" [dim](trace {span.trace_id})[/dim]" if span.trace_id else ""
+            self.console.print(f"\n[red]❌ Error: {e}[/red]{trace}\n")
+            return
+        finally:
+            tracing.end_span(span)
         
         # Display metadata
-        self.console.print(f"[dim]📚 Retrieved {result['num_documents']} relevant document(s)[/dim]")
+        cached_note = " (cached answer)" if result.get("cached") else ""
+        self.console.print(f"[dim]📚 Retrieved {result['num_documents']} relevant document(s){cached_note}[/dim]")
+        timings = result.get("timings") or {}
+        stages = [f"{stage} {format_seconds(timings[stage])}" for stage in metrics.STAGES if stage in timings]
+        if "first_token" in timings and not result.get("cached"):
+            stages.append(f"first token {format_seconds(timings['first_token'])}")
+        if span.trace_id:
+            stages.append(f"trace {span.trace_id}")
+        if stages:
+            self.console.print(f"[dim]⏱  {' · '.join(stages)}[/dim]")
         self.console.print()
         
         # Save to history
@@ -165,7 +325,8 @@ class InteractiveChatbot:
             "timestamp": datetime.now().isoformat(),
             "question": question,
             "answer": answer,
-            "num_docs": result["num_documents"]
+            "num_docs": result["num_documents"],
+            "trace_id": span.trace_id
         })
     
     def run(self):
@@ -177,7 +338,9 @@ class InteractiveChatbot:
         self.display_config_info()
         
         # Initialize system
-        if not self.initialize_system():
+        with profiled("initialize", self.profile, console=self.console):
+            initialized = self.initialize_system()
+        if not initialized:
             return
         
         # Display welcome message
@@ -216,8 +379,17 @@ class InteractiveChatbot:
                     self.clear_history()
                     continue
                 
+                elif command == "filter" or command.startswith("filter "):
+                    self.set_filters(question.strip()[len("filter"):])
+                    continue
+                
+                elif command == "collection" or command.startswith("collection "):
+                    self.set_collection(question.strip()[len("collection"):])
+                    continue
+                
                 # Process as question
-                self.ask_question(question)
+                with profiled("query", self.profile, console=self.console):
+                    self.ask_question(question)
                 
             except KeyboardInterrupt:
                 self.console.print("\n\n[cyan]👋 Goodbye! Thanks for chatting.[/cyan]\n")
@@ -230,7 +402,23 @@ class InteractiveChatbot:
 
 def main():
     """Main entry point"""
-    chatbot = InteractiveChatbot()
+    parser = argparse.ArgumentParser(description="Chat with your knowledge base")
+    parser.add_argument(
+        "--collection",
+        type=str,
+        help=f"Knowledge base collection to search (default: {Config.DEFAULT_COLLECTION})"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Profile CPU time and allocations of start-up and every question (written to {Config.PROFILE_DIR})"
+    )
+    args = parser.parse_args()
+    
+    try:
+        chatbot = InteractiveChatbot(collection=args.collection, profile=args.profile or Config.PROFILE_ENABLED)
+    except ValueError as e:
+        parser.error(str(e))
     chatbot.run()
 
 
@@ -0,0 +1,124 @@
+"""
+Document Chunking
+Splits loaded documents into token-budgeted chunks before embedding
+"""
+
+import re
+from typing import Dict, Iterator, List, Tuple
+
+from haystack import Document
+
+# Approximate tokenizer: words and runs of punctuation.
+# Close enough to WordPiece/BPE counts for budgeting without loading a model.
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
+# Section markers written by the structured loaders in ingest_documents.py
+PAGE_BREAK = "\f"
+SLIDE_PATTERN = re.compile(r"^=== Slide (\d+) ===$", re.MULTILINE)
+SHEET_PATTERN = re.compile(r"^=== Sheet: (.+) ===$", re.MULTILINE)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of tokens in a piece of text"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class DocumentChunker:
+    """Splits documents into overlapping, token-budgeted chunks"""
+
+    def __init__(self, chunk_size: int = 200, chunk_overlap: int = 30):
+        if chunk_size < 0:
+            raise ValueError("chunk_size must be >= 0")
+        if chunk_size and not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be >= 0 and smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_sections(self, document: Document) -> List[Tuple[int, int, Dict]]:
+        """
+        Split a document into structural sections
+
+        Returns:
+            List of (char_start, char_end, section_meta) tuples
+        """
+        content = document.content or ""
+        file_type = document.meta.get("file_type")
+
+        if file_type == "pdf" and PAGE_BREAK in content:
+            sections = []
+            start = 0
+            for page_num, page in enumerate(content.split(PAGE_BREAK), 1):
+                end = start + len(page)
+                sections.append((start, end, {"page": page_num}))
+                start = end + len(PAGE_BREAK)
+            return sections
+
+        if file_type == "powerpoint":
+            return self._split_on_markers(content, SLIDE_PATTERN, "slide", int)
+
+        if file_type == "excel":
+            return self._split_on_markers(content, SHEET_PATTERN, "sheet", str)
+
+        return [(0, len(content), {})]
+
+    @staticmethod
+    def _split_on_markers(content: str, pattern, key: str, cast) -> List[Tuple[int, int, Dict]]:
+        """Split content at header lines such as '=== Slide 3 ==='"""
+        matches = list(pattern.finditer(content))
+        if not matches:
+            return [(0, len(content), {})]
+
+        sections = []
+        if content[:matches[0].start()].strip():
+            sections.append((0, matches[0].start(), {}))
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+            sections.append((match.start(), end, {key: cast(match.group(1))}))
+        return sections
+
+    def iter_chunks(self, document: Document) -> Iterator[Document]:
+        """Yield the chunks of a single document"""
+        content = document.content or ""
+
+        if not self.chunk_size:
+            meta = dict(document.meta)
+            meta.update({
+                "chunk_index": 0,
+                "chunk_count": 1,
+                "char_start": 0,
+                "char_end": len(content),
+                "token_count": count_tokens(content),
+            })
+            yield Document(content=content, meta=meta)
+            return
+
+        windows = []
+        step = self.chunk_size - self.chunk_overlap
+        for section_start, section_end, section_meta in self.split_sections(document):
+            spans = [m.span() for m in TOKEN_PATTERN.finditer(content, section_start, section_end)]
+            if not spans:
+                continue
+            for first in range(0, len(spans), step):
+                window = spans[first:first + self.chunk_size]
+                windows.append((window[0][0], window[-1][1], len(window), section_meta))
+                if first + self.chunk_size >= len(spans):
+                    break
+
+        for index, (char_start, char_end, token_count, section_meta) in enumerate(windows):
+            meta = dict(document.meta)
+            meta.update(section_meta)
+            meta.update({
+                "chunk_index": index,
+                "chunk_count": len(windows),
+                "char_start": char_start,
+                "char_end": char_end,
+                "token_count": token_count,
+            })
+            yield Document(content=content[char_start:char_end], meta=meta)
+
+    def split(self, documents: List[Document]) -> List[Document]:
+        """Split a list of documents into chunks"""
+        chunks = []
+        for document in documents:
+            chunks.extend(self.iter_chunks(document))
+        return chunks
@@ -4,12 +4,16 @@ Loads settings from .env file and provides configuration objects
 """
 
 import os
+import re
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Knowledge base collection names double as directory names
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
 class Config:
     """Main configuration class"""
     
@@ -19,6 +23,8 @@ class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    # OpenAI-compatible endpoint (e.g. a proxy or local server); empty = api.openai.com
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
     
     # Ollama Configuration
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
@@ -33,11 +39,119 @@ class Config:
     # Retrieval Settings
     TOP_K_RETRIEVAL = int(os.getenv("TOP_K_RETRIEVAL", "3"))
     
+    # Retriever: "exact" (vectorised scan of every embedding), "hnsw" or "ivf" (approximate
+    # index built at ingest time, for large stores) or "inmemory" (Haystack's retriever)
+    RETRIEVER = os.getenv("RETRIEVER", "exact").lower()
+    HNSW_M = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = 4 * sqrt(number of chunks)
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+    
+    # Prompt token budget (approximate tokens for template + question + context).
+    # CONTEXT_TOKEN_BUDGET overrides everything; CONTEXT_TOKEN_BUDGETS sets per-model
+    # budgets ("llama3.2=3000,gpt-4o-mini=12000"); otherwise the provider default applies.
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))
+    CONTEXT_TOKEN_BUDGETS = dict(
+        (item.split("=", 1)[0].strip(), int(item.split("=", 1)[1]))
+        for item in os.getenv("CONTEXT_TOKEN_BUDGETS", "").split(",") if "=" in item
+    )
+    DEFAULT_CONTEXT_TOKEN_BUDGETS = {"openai": 12000, "ollama": 3000, "huggingface": 3000}
+    
+    # Answer Cache (reuses answers to near-identical questions over the same retrieved documents)
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    
+    # Share one pipeline run between concurrent identical questions
+    COALESCE_QUERIES = os.getenv("COALESCE_QUERIES", "true").lower() == "true"
+    
+    # Seconds to wait for the LLM provider to preload its model at start-up
+    LLM_WARMUP_TIMEOUT = int(os.getenv("LLM_WARMUP_TIMEOUT", "120"))
+    
+    # LLM calls: timeouts (seconds), retries with jittered backoff, keep-alive
+    # connection pool and circuit breaker (fail fast after consecutive failures)
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # max wait for each response chunk
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+    LLM_RETRY_BACKOFF_MAX = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "8"))
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+    LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "5"))  # 0 disables the breaker
+    LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    
+    # Per-stage query timings: in-process histograms (GET /metrics on the API)
+    # and, when METRICS_JSONL_PATH is set, one JSON line per question
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", "")
+    
+    # Span tracing of ingestion runs and questions (comma-separated exporters:
+    # "file" appends OpenTelemetry-style JSON spans to TRACE_FILE, "console"
+    # prints them, "none" (the default) disables tracing; TRACE_FILE is not rotated)
+    TRACE_EXPORTER = [e.strip().lower() for e in os.getenv("TRACE_EXPORTER", "none").split(",")
+                      if e.strip() and e.strip().lower() != "none"]
+    
+    # Profiling: CPU profile and allocation snapshot of every question / ingestion
+    # phase (--profile on the command line; PROFILE_ENABLED=true also covers the web app)
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "15"))
+    
+    # HTTP API Server (api_server.py)
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+    
+    # Metadata fields indexed for filtered questions (comma-separated)
+    METADATA_INDEX_FIELDS = [f.strip() for f in os.getenv(
+        "METADATA_INDEX_FIELDS", "filename,filepath,file_type,source"
+    ).split(",") if f.strip()]
+    
+    # Chunking Settings (approximate tokens; CHUNK_SIZE=0 disables chunking)
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "200"))
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "30"))
+    
+    # Ingestion Settings (INGEST_WORKERS=0 uses one process per CPU core)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+    
+    # File Discovery Settings (comma-separated globs; MAX_FILE_SIZE_MB=0 disables the limit)
+    DISCOVERY_INCLUDE = [p.strip() for p in os.getenv("DISCOVERY_INCLUDE", "").split(",") if p.strip()]
+    DISCOVERY_EXCLUDE = [p.strip() for p in os.getenv(
+        "DISCOVERY_EXCLUDE", ".git,.svn,.hg,node_modules,__pycache__,.venv,venv,~$*"
+    ).split(",") if p.strip()]
+    MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "200"))
+    FOLLOW_SYMLINKS = os.getenv("FOLLOW_SYMLINKS", "true").lower() == "true"
+    
     # Paths
     PROJECT_ROOT = Path(__file__).parent
     DOCUMENTS_DIR = PROJECT_ROOT / "documents"
     DATA_DIR = PROJECT_ROOT / "data"
     DOCUMENT_STORE_PATH = Path(os.getenv("DOCUMENT_STORE_PATH", str(DATA_DIR / "document_store.json")))
+    DOCUMENT_STORE_DIR = Path(os.getenv("DOCUMENT_STORE_DIR", str(DATA_DIR / "document_store")))
+    
+    # Document store format: "binary" (memory-mapped .npy + sidecar) or "json" (legacy)
+    DOCUMENT_STORE_FORMAT = os.getenv("DOCUMENT_STORE_FORMAT", "binary").lower()
+    EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32").lower()
+    MANIFEST_PATH = Path(os.getenv("MANIFEST_PATH", str(DATA_DIR / "ingest_manifest.json")))
+    
+    # Knowledge bases: "default" is the store above; other collections live in
+    # COLLECTIONS_DIR/<name>/ and ingest from COLLECTION_DOCUMENTS_DIR/<name>/ by default
+    DEFAULT_COLLECTION = os.getenv("DEFAULT_COLLECTION", "default")
+    COLLECTIONS_DIR = Path(os.getenv("COLLECTIONS_DIR", str(DATA_DIR / "collections")))
+    COLLECTION_DOCUMENTS_DIR = Path(os.getenv("COLLECTION_DOCUMENTS_DIR", str(PROJECT_ROOT / "collections")))
+    # Least recently used collections are unloaded above this much memory (0 = no limit)
+    COLLECTION_MEMORY_LIMIT_MB = int(os.getenv("COLLECTION_MEMORY_LIMIT_MB", "0"))
+    COLLECTION = "default"
+    
+    # Embedding Cache (reuses embeddings of identical chunk text across runs)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", str(DATA_DIR / "embedding_cache.sqlite3")))
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+    
+    TRACE_FILE = Path(os.getenv("TRACE_FILE", str(DATA_DIR / "traces" / "spans.jsonl")))
+    PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(DATA_DIR / "profiles")))
     
     @classmethod
     def validate(cls):
@@ -53,6 +167,42 @@ class Config:
         if cls.LLM_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
             errors.append("OPENAI_API_KEY is required when using OpenAI provider")
         
+        # Validate retriever
+        valid_retrievers = ["exact", "hnsw", "ivf", "inmemory"]
+        if cls.RETRIEVER not in valid_retrievers:
+            errors.append(f"RETRIEVER must be one of {valid_retrievers}, got '{cls.RETRIEVER}'")
+        
+        # Validate answer cache
+        if not 0 < cls.ANSWER_CACHE_THRESHOLD <= 1:
+            errors.append(f"ANSWER_CACHE_THRESHOLD must be in (0, 1], got {cls.ANSWER_CACHE_THRESHOLD}")
+        
+        # Validate LLM call settings
+        if cls.LLM_TIMEOUT <= 0 or cls.LLM_CONNECT_TIMEOUT <= 0:
+            errors.append("LLM_TIMEOUT and LLM_CONNECT_TIMEOUT must be > 0")
+        if cls.LLM_MAX_RETRIES < 0:
+            errors.append(f"LLM_MAX_RETRIES must be >= 0, got {cls.LLM_MAX_RETRIES}")
+        if cls.LLM_POOL_SIZE < 1:
+            errors.append(f"LLM_POOL_SIZE must be >= 1, got {cls.LLM_POOL_SIZE}")
+        
+        # Validate tracing
+        unknown_exporters = [e for e in cls.TRACE_EXPORTER if e not in ["file", "console"]]
+        if unknown_exporters:
+            errors.append(f"TRACE_EXPORTER must list 'file', 'console' or 'none', got {unknown_exporters}")
+        
+        # Validate document store
+        if cls.DOCUMENT_STORE_FORMAT not in ["binary", "json"]:
+            errors.append(f"DOCUMENT_STORE_FORMAT must be 'binary' or 'json', got '{cls.DOCUMENT_STORE_FORMAT}'")
+        if cls.EMBEDDING_DTYPE not in ["float32", "float16"]:
+            errors.append(f"EMBEDDING_DTYPE must be 'float32' or 'float16', got '{cls.EMBEDDING_DTYPE}'")
+        if not COLLECTION_NAME_PATTERN.match(cls.DEFAULT_COLLECTION):
+            errors.append(f"DEFAULT_COLLECTION must match {COLLECTION_NAME_PATTERN.pattern}, got '{cls.DEFAULT_COLLECTION}'")
+        
+        # Validate chunking
+        if cls.CHUNK_SIZE < 0:
+            errors.append(f"CHUNK_SIZE must be >= 0, got {cls.CHUNK_SIZE}")
+        elif cls.CHUNK_SIZE and not 0 <= cls.CHUNK_OVERLAP < cls.CHUNK_SIZE:
+            errors.append(f"CHUNK_OVERLAP must be between 0 and CHUNK_SIZE - 1, got {cls.CHUNK_OVERLAP}")
+        
         # Create directories
         cls.DOCUMENTS_DIR.mkdir(exist_ok=True)
         cls.DATA_DIR.mkdir(exist_ok=True)
@@ -62,6 +212,52 @@ class Config:
         
         return True
     
+    @classmethod
+    def get_store_path(cls) -> Path:
+        """Path of the document store in the configured format"""
+        if cls.DOCUMENT_STORE_FORMAT == "json":
+            return cls.DOCUMENT_STORE_PATH
+        return cls.DOCUMENT_STORE_DIR
+    
+    @classmethod
+    def for_collection(cls, name: str = None):
+        """
+        Configuration for one knowledge base collection
+        
+        Args:
+            name: Collection name (default: DEFAULT_COLLECTION)
+            
+        Returns:
+            A Config subclass whose store, manifest and documents paths point at the collection
+        """
+        name = name or cls.DEFAULT_COLLECTION
+        if not COLLECTION_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid collection name '{name}' (letters, digits, '_' and '-' only)")
+        if name == cls.COLLECTION:
+            return cls
+        if name == "default":
+            return Config
+        
+        root = Config.COLLECTIONS_DIR / name
+        return type(f"Config[{name}]", (Config,), {
+            "COLLECTION": name,
+            "DOCUMENTS_DIR": Config.COLLECTION_DOCUMENTS_DIR / name,
+            "DOCUMENT_STORE_PATH": root / "document_store.json",
+            "DOCUMENT_STORE_DIR": root / "document_store",
+            "MANIFEST_PATH": root / "ingest_manifest.json"
+        })
+    
+    @classmethod
+    def list_collections(cls):
+        """Names of the collections that have been ingested (plus the default one)"""
+        names = {"default", cls.DEFAULT_COLLECTION}
+        if Config.COLLECTIONS_DIR.exists():
+            names.update(
+                path.name for path in Config.COLLECTIONS_DIR.iterdir()
+                if path.is_dir() and COLLECTION_NAME_PATTERN.match(path.name)
+            )
+        return sorted(names)
+    
     @classmethod
     def get_llm_config(cls):
         """Get LLM configuration based on provider"""
@@ -69,7 +265,8 @@ class Config:
             return {
                 "provider": "openai",
                 "model": cls.OPENAI_MODEL,
-                "api_key": cls.OPENAI_API_KEY
+                "api_key": cls.OPENAI_API_KEY,
+                "base_url": cls.OPENAI_BASE_URL
             }
         elif cls.LLM_PROVIDER == "ollama":
             return {
@@ -85,6 +282,20 @@ class Config:
         else:
             raise ValueError(f"Unknown LLM provider: {cls.LLM_PROVIDER}")
     
+    @classmethod
+    def get_context_token_budget(cls) -> int:
+        """Prompt token budget for the configured provider and model"""
+        if cls.CONTEXT_TOKEN_BUDGET > 0:
+            return cls.CONTEXT_TOKEN_BUDGET
+        model = {
+            "openai": cls.OPENAI_MODEL,
+            "ollama": cls.OLLAMA_MODEL,
+            "huggingface": cls.HUGGINGFACE_MODEL
+        }.get(cls.LLM_PROVIDER)
+        if model in cls.CONTEXT_TOKEN_BUDGETS:
+            return cls.CONTEXT_TOKEN_BUDGETS[model]
+        return cls.DEFAULT_CONTEXT_TOKEN_BUDGETS.get(cls.LLM_PROVIDER, 3000)
+    
     @classmethod
     def display_config(cls):
         """Display current configuration (safe - no secrets)"""
@@ -103,8 +314,20 @@ class Config:
         
         print(f"Embedding Model:  {cls.EMBEDDING_MODEL}")
         print(f"Top K Retrieval:  {cls.TOP_K_RETRIEVAL}")
+        print(f"Retriever:        {cls.RETRIEVER}")
+        print(f"Prompt Budget:    {cls.get_context_token_budget()} tokens")
+        if cls.ANSWER_CACHE_ENABLED:
+            print(f"Answer Cache:     similarity >= {cls.ANSWER_CACHE_THRESHOLD}, {cls.ANSWER_CACHE_TTL}s TTL")
+        else:
+            print("Answer Cache:     off")
+        print(f"Chunk Size:       {cls.CHUNK_SIZE} tokens ({cls.CHUNK_OVERLAP} overlap)")
         print(f"Documents Dir:    {cls.DOCUMENTS_DIR}")
         print(f"Data Dir:         {cls.DATA_DIR}")
+        print(f"Collection:       {cls.COLLECTION}")
+        print(f"Document Store:   {cls.get_store_path()} ({cls.DOCUMENT_STORE_FORMAT})")
+        if cls.TRACE_EXPORTER:
+            trace_file = f" ({cls.TRACE_FILE})" if "file" in cls.TRACE_EXPORTER else ""
+            print(f"Tracing:          {', '.join(cls.TRACE_EXPORTER)}{trace_file}")
         print("=" * 60)
         print()
 
@@ -0,0 +1,126 @@
+"""
+Context Packing
+Fits retrieved documents into the prompt's token budget
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from haystack import Document, component
+
+from chunking import TOKEN_PATTERN, count_tokens
+
+# Tokens spent on the separator between documents in the prompt
+DOCUMENT_SEPARATOR_TOKENS = 2
+
+# Don't bother including a truncated document shorter than this
+MIN_PARTIAL_TOKENS = 32
+
+# Jinja tags in a prompt template (not sent to the model)
+TEMPLATE_TAG_PATTERN = re.compile(r"\{%.*?%\}|\{\{.*?\}\}", re.DOTALL)
+
+
+def template_overhead(template: str) -> int:
+    """Tokens of a prompt template excluding its placeholders"""
+    return count_tokens(TEMPLATE_TAG_PATTERN.sub(" ", template))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text after max_tokens tokens"""
+    for i, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        if i == max_tokens - 1:
+            return text[:match.end()]
+    return text
+
+
+def _source(doc: Document) -> Optional[str]:
+    return doc.meta.get("filepath") or doc.meta.get("filename")
+
+
+@component
+class ContextPacker:
+    """
+    Select and trim retrieved documents to fit a prompt token budget
+
+    Documents are taken best score first. Exact duplicates are dropped and
+    chunks overlapping an already selected chunk of the same file are trimmed
+    to their new text. The last document that does not fit is truncated.
+    Token counts come from the chunk metadata computed at ingest time.
+    """
+
+    def __init__(self, token_budget: int, template_tokens: int = 0):
+        self.token_budget = token_budget
+        self.template_tokens = template_tokens
+
+    @staticmethod
+    def _remove_overlap(doc: Document, selected: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """Shrink a chunk's character range so it does not repeat selected ranges"""
+        start, end = doc.meta["char_start"], doc.meta["char_end"]
+        for sel_start, sel_end in selected:
+            if sel_start <= start and end <= sel_end:
+                return None
+            if sel_start <= start < sel_end:
+                start = sel_end
+            elif sel_start < end <= sel_end:
+                end = sel_start
+        return start, end
+
+    def pack(self, documents: List[Document], question: str = "") -> Tuple[List[Document], int]:
+        """
+        Returns:
+            (packed documents, total prompt tokens including template and question)
+        """
+        used = self.template_tokens + count_tokens(question)
+        ranked = sorted(documents, key=lambda d: d.score if d.score is not None else float("-inf"), reverse=True)
+
+        packed = []
+        seen_content = set()
+        ranges: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc in ranked:
+            content = doc.content or ""
+            if content in seen_content:
+                continue
+
+            meta = dict(doc.meta)
+            tokens = meta.get("token_count")
+            source = _source(doc)
+
+            # Trim text already included from an overlapping chunk of the same file
+            new_range = None
+            if source and "char_start" in meta and "char_end" in meta:
+                new_range = self._remove_overlap(doc, ranges.get(source, []))
+                if new_range is None:
+                    continue
+                if new_range != (meta["char_start"], meta["char_end"]):
+                    offset = meta["char_start"]
+                    content = content[new_range[0] - offset:new_range[1] - offset]
+                    meta["char_start"], meta["char_end"] = new_range
+                    tokens = None
+
+            if tokens is None:
+                tokens = count_tokens(content)
+            if not tokens:
+                continue
+
+            remaining = self.token_budget - used - DOCUMENT_SEPARATOR_TOKENS
+            if tokens > remaining:
+                if remaining < MIN_PARTIAL_TOKENS:
+                    continue
+                content = truncate_to_tokens(content, remaining)
+                tokens = remaining
+                meta["truncated"] = True
+
+            meta["token_count"] = tokens
+            seen_content.add(doc.content or "")
+            if new_range is not None:
+                ranges.setdefault(source, []).append(new_range)
+            packed.append(Document(id=doc.id, content=content, meta=meta, score=doc.score))
+            used += tokens + DOCUMENT_SEPARATOR_TOKENS
+
+        return packed, used
+
+    @component.output_types(documents=List[Document], token_count=int)
+    def run(self, documents: List[Document], question: str = ""):
+        packed, token_count = self.pack(documents, question)
+        return {"documents": packed, "token_count": token_count}
@@ -0,0 +1,408 @@
+"""
+Document Store I/O
+Streams documents to and from the on-disk knowledge base
+
+Two on-disk formats are supported:
+
+* Binary (a directory, default): a float32/float16 ``embeddings.npy`` matrix
+  that can be memory-mapped, a ``documents.jsonl`` sidecar with one
+  id/content/meta record per matrix row, and ``store_info.json``. Each save
+  goes into a new generation sub-directory and the ``CURRENT`` file points
+  at the live one, so readers holding an old generation open are never
+  disturbed.
+* JSON (a ``.json`` file): the original list of documents with embeddings.
+"""
+
+import argparse
+import json
+import shutil
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from haystack import Document
+
+STORE_FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+INFO_FILE = "store_info.json"
+
+# Fixed .npy header size, so the final row count can be written in place
+NPY_HEADER_SIZE = 128
+
+
+def document_to_dict(doc: Document) -> Dict:
+    """Serialize a document for the on-disk store"""
+    # Handle embedding - could be numpy array or list
+    embedding = doc.embedding
+    if embedding is not None and hasattr(embedding, 'tolist'):
+        embedding = embedding.tolist()
+
+    return {
+        "id": doc.id,
+        "content": doc.content,
+        "meta": doc.meta,
+        "embedding": embedding
+    }
+
+
+def dict_to_document(doc_dict: Dict) -> Document:
+    """Recreate a document from its on-disk form"""
+    return Document(
+        id=doc_dict["id"],
+        content=doc_dict["content"],
+        meta=doc_dict.get("meta", {}),
+        embedding=doc_dict.get("embedding")
+    )
+
+
+def is_binary_store(path: Path) -> bool:
+    """Binary stores are directories; JSON stores are .json files"""
+    return Path(path).suffix.lower() != ".json"
+
+
+def current_generation(path: Path) -> Path:
+    """Directory holding the live generation of a binary store"""
+    path = Path(path)
+    name = (path / CURRENT_FILE).read_text(encoding='utf-8').strip()
+    return path / name
+
+
+def store_exists(path: Path) -> bool:
+    """Check whether a document store has been saved at path"""
+    path = Path(path)
+    if is_binary_store(path):
+        return (path / CURRENT_FILE).exists()
+    return path.exists()
+
+
+def resolve_store_path(config) -> Path:
+    """Configured store path, falling back to a legacy JSON store that has not been converted yet"""
+    store_path = config.get_store_path()
+    if not store_exists(store_path) and store_exists(config.DOCUMENT_STORE_PATH):
+        return config.DOCUMENT_STORE_PATH
+    return store_path
+
+
+def store_version(path: Path) -> str:
+    """Identifier that changes whenever the store at path is rewritten"""
+    path = Path(path)
+    if not store_exists(path):
+        return ""
+    if is_binary_store(path):
+        return current_generation(path).name
+    return str(path.stat().st_mtime_ns)
+
+
+def read_store_info(path: Path) -> Dict:
+    """Summary of a store (document count, embedding dimension, dtype...)"""
+    path = Path(path)
+    if is_binary_store(path):
+        with open(current_generation(path) / INFO_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    count = 0
+    dim = 0
+    for record in iter_store_records(path):
+        count += 1
+        if not dim and record.get("embedding") is not None:
+            dim = len(record["embedding"])
+    return {"format": "json", "count": count, "dim": dim, "dtype": "float32"}
+
+
+def iter_store_records(path: Path, with_embeddings: bool = True) -> Iterator[Dict]:
+    """
+    Stream document records from a document store
+
+    Binary stores yield memory-mapped embedding rows. JSON stores written by
+    JsonStoreWriter hold one document per line and are read incrementally;
+    older pretty-printed stores are loaded in one go.
+    """
+    path = Path(path)
+    if is_binary_store(path):
+        generation = current_generation(path)
+        embeddings = np.load(generation / EMBEDDINGS_FILE, mmap_mode="r") if with_embeddings else None
+        with open(generation / DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
+            for row, line in enumerate(f):
+                record = json.loads(line)
+                if with_embeddings:
+                    record["embedding"] = embeddings[row]
+                yield record
+        return
+
+    for record in _iter_json_records(path):
+        if not with_embeddings:
+            record.pop("embedding", None)
+        yield record
+
+
+def _iter_json_records(path: Path) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+        second_line = f.readline()
+        streamable = first_line.strip() == "[" and second_line.lstrip().startswith('{"')
+
+        if not streamable:
+            f.seek(0)
+            yield from json.load(f)
+            return
+
+        line = second_line
+        while line:
+            line = line.strip().rstrip(",")
+            if line and line != "]":
+                yield json.loads(line)
+            line = f.readline()
+
+
+def load_store(path: Path, mmap: bool = True) -> Tuple[List[Dict], np.ndarray]:
+    """
+    Load a document store for querying
+
+    Returns:
+        (records, embeddings) - id/content/meta records without embeddings
+        and the matching (n_docs, dim) embedding matrix. For binary stores
+        the matrix is memory-mapped read-only unless mmap is False.
+    """
+    path = Path(path)
+    if is_binary_store(path):
+        generation = current_generation(path)
+        embeddings = np.load(generation / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+        records = list(iter_store_records(path, with_embeddings=False))
+        return records, embeddings
+
+    records = []
+    rows = []
+    for record in _iter_json_records(path):
+        rows.append(record.pop("embedding", None))
+        records.append(record)
+    dim = next((len(row) for row in rows if row is not None), 0)
+    embeddings = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row is not None:
+            embeddings[i] = row
+    return records, embeddings
+
+
+def load_embeddings(path: Path, mmap: bool = True) -> np.ndarray:
+    """Load only the embedding matrix of a store"""
+    path = Path(path)
+    if is_binary_store(path):
+        return np.load(current_generation(path) / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+    return load_store(path)[1]
+
+
+def open_store_writer(path: Path, dtype: str = "float32", info: Dict = None):
+    """Create the writer matching the store format implied by path"""
+    if is_binary_store(path):
+        return BinaryStoreWriter(path, dtype=dtype, info=info)
+    return JsonStoreWriter(path)
+
+
+class JsonStoreWriter:
+    """
+    Writes a JSON document store incrementally
+
+    Documents are appended one per line, so peak memory does not depend on
+    the size of the store. The target file is replaced atomically on commit().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.count = 0
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self._file.write("[")
+
+    def write_records(self, records: Iterable[Dict]):
+        """Append already serialized document records"""
+        for record in records:
+            embedding = record.get("embedding")
+            if embedding is not None and hasattr(embedding, 'tolist'):
+                record = dict(record, embedding=embedding.tolist())
+            self._file.write(",\n" if self.count else "\n")
+            self._file.write(json.dumps(record))
+            self.count += 1
+
+    def write_documents(self, documents: Iterable[Document]):
+        """Append documents"""
+        self.write_records(document_to_dict(doc) for doc in documents)
+
+    def commit(self):
+        """Finish the file and move it into place"""
+        self._file.write("\n]\n")
+        self._file.close()
+        self.tmp_path.replace(self.path)
+
+    def abort(self):
+        """Discard everything written so far"""
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class BinaryStoreWriter:
+    """
+    Writes a binary document store incrementally
+
+    Embedding rows are appended straight into the .npy file behind a
+    fixed-size header that is rewritten with the final shape on commit().
+    """
+
+    def __init__(self, path: Path, dtype: str = "float32", info: Dict = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.info = info or {}
+        self.dim = None
+        self.count = 0
+
+        existing = [int(p.name) for p in self.path.iterdir() if p.is_dir() and p.name.isdigit()]
+        self.generation = self.path / f"{max(existing, default=0) + 1:08d}"
+        self.generation.mkdir()
+
+        self._embeddings = open(self.generation / EMBEDDINGS_FILE, 'wb')
+        self._embeddings.write(b"\0" * NPY_HEADER_SIZE)
+        self._documents = open(self.generation / DOCUMENTS_FILE, 'w', encoding='utf-8')
+
+    def write_records(self, records: Iterable[Dict]):
+        """Append already serialized document records"""
+        for record in records:
+            embedding = record.get("embedding")
+            if embedding is None:
+                raise ValueError(f"Document {record['id']} has no embedding")
+
+            row = np.asarray(embedding, dtype=self.dtype)
+            if self.dim is None:
+                self.dim = row.shape[0]
+            elif row.shape[0] != self.dim:
+                raise ValueError(
+                    f"Document {record['id']} has embedding dimension {row.shape[0]}, expected {self.dim}"
+                )
+
+            self._embeddings.write(row.tobytes())
+            self._documents.write(json.dumps(
+                {"id": record["id"], "content": record["content"], "meta": record.get("meta", {})},
+                separators=(",", ":")
+            ) + "\n")
+            self.count += 1
+
+    def write_documents(self, documents: Iterable[Document]):
+        """Append documents"""
+        self.write_records(
+            {"id": doc.id, "content": doc.content, "meta": doc.meta, "embedding": doc.embedding}
+            for doc in documents
+        )
+
+    def commit(self):
+        """Finalize the generation and make it the live one"""
+        self._embeddings.seek(0)
+        self._embeddings.write(_npy_header((self.count, self.dim or 0), self.dtype))
+        self._embeddings.close()
+        self._documents.close()
+
+        info = dict(self.info)
+        info.update({
+            "format": "binary",
+            "format_version": STORE_FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim or 0,
+            "dtype": self.dtype.name,
+            "created": time.time()
+        })
+        with open(self.generation / INFO_FILE, 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
+
+        # Atomically switch readers over to the new generation
+        tmp_current = self.path / (CURRENT_FILE + ".tmp")
+        tmp_current.write_text(self.generation.name, encoding='utf-8')
+        tmp_current.replace(self.path / CURRENT_FILE)
+
+        # Old generations may still be memory-mapped by a running process;
+        # whatever cannot be removed now is cleaned up after a later save
+        for old in self.path.iterdir():
+            if old.is_dir() and old.name.isdigit() and old.name != self.generation.name:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def abort(self):
+        """Discard everything written so far"""
+        self._embeddings.close()
+        self._documents.close()
+        shutil.rmtree(self.generation, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def _npy_header(shape: Tuple[int, int], dtype: np.dtype) -> bytes:
+    """Build a version 1.0 .npy header padded to NPY_HEADER_SIZE bytes"""
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        np.lib.format.dtype_to_descr(dtype), tuple(shape)
+    )
+    preamble = b"\x93NUMPY\x01\x00"
+    header_len = NPY_HEADER_SIZE - len(preamble) - 2
+    header = header.ljust(header_len - 1) + "\n"
+    return preamble + struct.pack("<H", header_len) + header.encode("latin1")
+
+
+def convert_json_store(source: Path, target: Path, dtype: str = "float32") -> int:
+    """
+    Convert a JSON document store into the binary format
+
+    Returns:
+        Number of documents converted
+    """
+    with open_store_writer(target, dtype=dtype, info={"converted_from": str(source)}) as writer:
+        writer.write_records(_iter_json_records(source))
+    return writer.count
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Convert a JSON document store to the binary format")
+    parser.add_argument(
+        "--source",
+        type=str,
+        default=str(Config.DOCUMENT_STORE_PATH),
+        help=f"JSON document store to convert (default: {Config.DOCUMENT_STORE_PATH})"
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        default=str(Config.DOCUMENT_STORE_DIR),
+        help=f"Binary store directory to create (default: {Config.DOCUMENT_STORE_DIR})"
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float32", "float16"],
+        default=Config.EMBEDDING_DTYPE,
+        help=f"Embedding precision on disk (default: {Config.EMBEDDING_DTYPE})"
+    )
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    count = convert_json_store(Path(args.source), Path(args.target), dtype=args.dtype)
+    print(f"Converted {count} document(s) to {args.target} in {time.perf_counter() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
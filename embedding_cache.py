@@ -0,0 +1,126 @@
+"""
+Embedding Cache
+Persistent SQLite cache of chunk embeddings keyed by model and content hash
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement
+QUERY_BATCH_SIZE = 500
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of embeddings
+
+    Entries are keyed by (embedding model, sha256 of the text) and evicted
+    least-recently-used once the cache grows beyond max_entries.
+    """
+
+    def __init__(self, path: Path, model: str, max_entries: int = 500000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, hash)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up embeddings for texts (None where not cached)"""
+        hashes = [content_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), QUERY_BATCH_SIZE):
+            chunk = unique[start:start + QUERY_BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [self.model, *chunk]
+            ).fetchall()
+            for row_hash, vector in rows:
+                found[row_hash] = np.frombuffer(vector, dtype=np.float32)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                [(now, self.model, row_hash) for row_hash in found]
+            )
+            self._conn.commit()
+
+        results = [found.get(row_hash) for row_hash in hashes]
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence) -> None:
+        """Store embeddings for texts"""
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+            [
+                (self.model, content_hash(text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+                for text, embedding in zip(texts, embeddings)
+            ]
+        )
+        self._conn.commit()
+
+    def count(self) -> int:
+        """Number of cached embeddings (all models)"""
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries beyond max_entries"""
+        excess = self.count() - self.max_entries
+        if excess <= 0:
+            return 0
+
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._conn.commit()
+        return excess
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this session"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.count()
+        }
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
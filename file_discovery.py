@@ -0,0 +1,130 @@
+"""
+File Discovery
+Single-pass directory walker used by the ingestion pipeline
+"""
+
+import os
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class DiscoveredFile:
+    """A supported file found during discovery, with its stat info"""
+    path: Path
+    size: int
+    mtime: float
+
+
+@dataclass
+class FileListing:
+    """Result of a discovery walk"""
+    root: Path
+    files: List[DiscoveredFile] = field(default_factory=list)
+    excluded: int = 0
+    too_large: int = 0
+    unsupported: int = 0
+    symlink_loops: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def paths(self) -> List[Path]:
+        return [f.path for f in self.files]
+
+
+def _matches(rel_path: str, name: str, patterns: Iterable[str]) -> bool:
+    """Match a glob against either the entry name or its path relative to the root"""
+    return any(fnmatch(name, pattern) or fnmatch(rel_path, pattern) for pattern in patterns)
+
+
+def discover_files(
+    root: Path,
+    extensions: Dict[str, str],
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    max_file_size: Optional[int] = None,
+    follow_symlinks: bool = True
+) -> FileListing:
+    """
+    Walk a directory tree once and collect every supported file
+
+    Args:
+        root: Directory to walk
+        extensions: Supported extensions (lower-case, with leading dot)
+        include: Globs a file must match to be kept (default: everything)
+        exclude: Globs for files or directories to skip, e.g. 'node_modules'
+        max_file_size: Skip files larger than this many bytes
+        follow_symlinks: Descend into symlinked directories (loops are detected)
+
+    Returns:
+        FileListing with files sorted by path
+    """
+    root = Path(root)
+    include = include or []
+    exclude = exclude or []
+    listing = FileListing(root=root)
+
+    # Directories already walked, by (device, inode), to break symlink loops
+    visited = set()
+    root_stat = os.stat(root)
+    visited.add((root_stat.st_dev, root_stat.st_ino))
+
+    stack = [(root, "")]
+    while stack:
+        directory, rel_dir = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            listing.errors.append(f"{directory}: {e}")
+            continue
+
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+
+            if _matches(rel_path, entry.name, exclude):
+                listing.excluded += 1
+                continue
+
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if entry.is_symlink():
+                        target = os.stat(entry.path)
+                        key = (target.st_dev, target.st_ino)
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        key = (stat.st_dev, stat.st_ino)
+                        # Windows scandir does not fill in inode numbers
+                        if not stat.st_ino:
+                            key = os.path.realpath(entry.path)
+                    if key in visited:
+                        listing.symlink_loops += 1
+                        continue
+                    visited.add(key)
+                    stack.append((Path(entry.path), rel_path))
+                    continue
+
+                if not entry.is_file(follow_symlinks=follow_symlinks):
+                    continue
+
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext not in extensions:
+                    listing.unsupported += 1
+                    continue
+
+                if include and not _matches(rel_path, entry.name, include):
+                    listing.excluded += 1
+                    continue
+
+                stat = entry.stat(follow_symlinks=follow_symlinks)
+                if max_file_size and stat.st_size > max_file_size:
+                    listing.too_large += 1
+                    continue
+
+                listing.files.append(DiscoveredFile(Path(entry.path), stat.st_size, stat.st_mtime))
+            except OSError as e:
+                listing.errors.append(f"{entry.path}: {e}")
+
+    listing.files.sort(key=lambda f: str(f.path))
+    return listing
@@ -5,16 +5,31 @@ Loads documents, creates embeddings, and stores in DocumentStore
 
 import argparse
 import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import (
+    BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+)
 
 from haystack import Document
 from haystack.document_stores.in_memory import InMemoryDocumentStore
+from haystack.document_stores.types import DuplicatePolicy
 from haystack.components.embedders import SentenceTransformersDocumentEmbedder
 
 from config import Config
+from chunking import DocumentChunker
+from ingest_manifest import IngestManifest
+from document_store_io import iter_store_records, load_embeddings, open_store_writer, store_exists
+from file_discovery import FileListing, discover_files
+from embedding_cache import EmbeddingCache
+from vector_index import INDEX_TYPES, build_index, index_is_current, measure_recall, save_index
+import tracing
+from profiling import profiled
 
 # Document format processors
 try:
@@ -69,25 +84,79 @@ except ImportError:
 
 console = Console()
 
+# Supported file extensions
+SUPPORTED_EXTENSIONS = {
+    '.txt': 'text',
+    '.md': 'text',
+    '.pdf': 'pdf',
+    '.docx': 'docx',
+    '.html': 'html',
+    '.htm': 'html',
+    '.json': 'json',
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.pptx': 'powerpoint',
+    '.csv': 'csv',
+    '.rtf': 'rtf',
+    '.epub': 'epub',
+    '.xml': 'xml',
+    # Code files as text
+    '.py': 'text',
+    '.js': 'text',
+    '.java': 'text',
+    '.cpp': 'text',
+    '.c': 'text',
+    '.h': 'text',
+    '.cs': 'text',
+    '.php': 'text',
+    '.rb': 'text',
+    '.go': 'text',
+    '.rs': 'text',
+    '.ts': 'text',
+    '.jsx': 'text',
+    '.tsx': 'text',
+    '.sql': 'text',
+    '.sh': 'text',
+    '.yaml': 'text',
+    '.yml': 'text',
+    '.toml': 'text',
+    '.ini': 'text',
+    '.cfg': 'text',
+    '.conf': 'text'
+}
+
 
 class DocumentIngestionPipeline:
     """Pipeline for ingesting documents into the knowledge base"""
     
-    def __init__(self):
-        self.config = Config
+    def __init__(self, chunk_size: int = None, chunk_overlap: int = None, workers: int = None,
+                 use_cache: bool = None, collection: str = None, profile: bool = None):
+        self.config = Config.for_collection(collection)
+        self.profile = Config.PROFILE_ENABLED if profile is None else profile
+        self.workers = Config.INGEST_WORKERS if workers is None else workers
+        if self.workers <= 0:
+            self.workers = os.cpu_count() or 1
         self.document_store = InMemoryDocumentStore()
         self.doc_embedder = None
+        self.use_cache = Config.EMBEDDING_CACHE_ENABLED if use_cache is None else use_cache
+        self.embedding_cache = None
+        self.failed_files = []
+        self.file_timings = {}
+        self.files_processed = 0
+        self.last_listing = None
+        self.chunker = DocumentChunker(
+            chunk_size=Config.CHUNK_SIZE if chunk_size is None else chunk_size,
+            chunk_overlap=Config.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+        )
         
     def load_pdf(self, file_path: Path) -> str:
-        """Extract text from PDF file"""
+        """Extract text from PDF file (pages separated by form feeds)"""
         if not PDF_AVAILABLE:
             raise ImportError("pypdf not installed. Run: pip install pypdf")
         
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        pages = [(page.extract_text() or "").strip() for page in reader.pages]
+        return "\f".join(pages)
     
     def load_docx(self, file_path: Path) -> str:
         """Extract text from DOCX file"""
@@ -215,121 +284,227 @@ class DocumentIngestionPipeline:
             soup = BeautifulSoup(f.read(), 'lxml-xml')
             return soup.get_text()
     
-    def load_documents_from_directory(self, directory: Path) -> List[Document]:
-        """Load documents from a directory"""
-        documents = []
-        
-        # Supported file extensions
-        supported_extensions = {
-            '.txt': 'text',
-            '.md': 'text',
-            '.pdf': 'pdf',
-            '.docx': 'docx',
-            '.html': 'html',
-            '.htm': 'html',
-            '.json': 'json',
-            '.xlsx': 'excel',
-            '.xls': 'excel',
-            '.pptx': 'powerpoint',
-            '.csv': 'csv',
-            '.rtf': 'rtf',
-            '.epub': 'epub',
-            '.xml': 'xml',
-            # Code files as text
-            '.py': 'text',
-            '.js': 'text',
-            '.java': 'text',
-            '.cpp': 'text',
-            '.c': 'text',
-            '.h': 'text',
-            '.cs': 'text',
-            '.php': 'text',
-            '.rb': 'text',
-            '.go': 'text',
-            '.rs': 'text',
-            '.ts': 'text',
-            '.jsx': 'text',
-            '.tsx': 'text',
-            '.sql': 'text',
-            '.sh': 'text',
-            '.yaml': 'text',
-            '.yml': 'text',
-            '.toml': 'text',
-            '.ini': 'text',
-            '.cfg': 'text',
-            '.conf': 'text'
-        }
+    def discover(self, directory: Path) -> FileListing:
+        """Walk a directory once and list every supported file with its size and mtime"""
+        start_time = time.perf_counter()
+        with tracing.span("ingest.discover", directory=str(directory)) as span:
+            listing = discover_files(
+                directory,
+                SUPPORTED_EXTENSIONS,
+                include=self.config.DISCOVERY_INCLUDE,
+                exclude=self.config.DISCOVERY_EXCLUDE,
+                max_file_size=self.config.MAX_FILE_SIZE_MB * 1024 * 1024,
+                follow_symlinks=self.config.FOLLOW_SYMLINKS
+            )
+            span.set_attributes({
+                "files": len(listing.files),
+                "excluded": listing.excluded,
+                "too_large": listing.too_large,
+                "errors": len(listing.errors)
+            })
+        
+        skipped = []
+        if listing.excluded:
+            skipped.append(f"{listing.excluded} excluded")
+        if listing.too_large:
+            skipped.append(f"{listing.too_large} over {self.config.MAX_FILE_SIZE_MB} MB")
+        if listing.symlink_loops:
+            skipped.append(f"{listing.symlink_loops} symlink loop(s)")
+        console.print(
+            f"[cyan]Discovered {len(listing.files)} supported file(s) in "
+            f"{time.perf_counter() - start_time:.2f}s[/cyan]"
+            + (f" [dim](skipped {', '.join(skipped)})[/dim]" if skipped else "")
+        )
+        for error in listing.errors:
+            console.print(f"[red]-[/red] Cannot read {error}")
+        
+        self.last_listing = listing
+        return listing
+    
+    def find_files(self, directory: Path) -> List[Path]:
+        """Find all supported files below a directory"""
+        return self.discover(directory).paths
+    
+    def load_file(self, file_path: Path) -> Optional[Document]:
+        """
+        Load a single file as a Haystack Document
+        
+        Returns:
+            The document, or None if the file has no text content
+        """
+        ext = file_path.suffix.lower()
+        file_type = SUPPORTED_EXTENSIONS.get(ext, 'text')
+        
+        # Extract content based on file type
+        if file_type == 'pdf':
+            content = self.load_pdf(file_path)
+        elif file_type == 'docx':
+            content = self.load_docx(file_path)
+        elif file_type == 'html':
+            content = self.load_html(file_path)
+        elif file_type == 'json':
+            content = self.load_json(file_path)
+        elif file_type == 'excel':
+            content = self.load_excel(file_path)
+        elif file_type == 'powerpoint':
+            content = self.load_powerpoint(file_path)
+        elif file_type == 'csv':
+            content = self.load_csv(file_path)
+        elif file_type == 'rtf':
+            content = self.load_rtf(file_path)
+        elif file_type == 'epub':
+            content = self.load_epub(file_path)
+        elif file_type == 'xml':
+            content = self.load_xml(file_path)
+        else:  # text, md, code files
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        
+        if not content.strip():
+            return None
+        
+        # Create Haystack Document
+        return Document(
+            content=content,
+            meta={
+                "filename": file_path.name,
+                "filepath": str(file_path),
+                "file_type": file_type,
+                "source": "local"
+            }
+        )
+    
+    def load_documents_from_directory(self, directory: Path, files: List[Path] = None) -> List[Document]:
+        """
+        Load documents from a directory
+        
+        Args:
+            directory: Directory to scan
+            files: Pre-selected files to load (default: every supported file in directory)
+        """
+        return list(self.iter_documents_from_directory(directory, files))
+    
+    def iter_documents_from_directory(self, directory: Path, files: List[Path] = None) -> Iterator[Document]:
+        """
+        Stream documents from a directory
+        
+        Files are parsed lazily with only a few files per worker in flight,
+        so memory use does not grow with the number of files.
+        """
+        self.failed_files = []
+        self.file_timings = {}
+        self.files_processed = 0
         
         if not directory.exists():
             console.print(f"[yellow]WARNING: Directory not found: {directory}[/yellow]")
             console.print(f"[yellow]Creating directory: {directory}[/yellow]")
             directory.mkdir(parents=True, exist_ok=True)
-            return documents
+            return
         
         # Find all supported files
-        files = []
-        for ext in supported_extensions.keys():
-            files.extend(directory.rglob(f"*{ext}"))
-        
-        if not files:
-            console.print(f"[yellow]WARNING: No documents found in {directory}[/yellow]")
-            console.print(f"[yellow]Supported formats: {', '.join(supported_extensions.keys())}[/yellow]")
-            return documents
+        if files is None:
+            files = self.find_files(directory)
+            
+            if not files:
+                console.print(f"[yellow]WARNING: No documents found in {directory}[/yellow]")
+                console.print(f"[yellow]Supported formats: {', '.join(SUPPORTED_EXTENSIONS.keys())}[/yellow]")
+                return
         
+        workers = min(self.workers, len(files))
         console.print(f"[cyan]Found {len(files)} document(s)[/cyan]")
-        
-        # Load each file
-        for file_path in files:
-            try:
-                ext = file_path.suffix.lower()
-                file_type = supported_extensions.get(ext, 'text')
+        if workers > 1:
+            console.print(f"[cyan]Parsing with {workers} worker processes[/cyan]")
+            if self.profile:
+                console.print("[dim]Parsing in worker processes is not profiled (use --workers 1 to include it)[/dim]")
+        
+        # Load each file (results arrive in input order either way)
+        start_time = time.perf_counter()
+        try:
+            for file_path, (doc, elapsed, error) in zip(files, self._parse_files(files, workers)):
+                self.file_timings[file_path] = elapsed
+                self.files_processed += 1
+                # Parsed here or in a worker process - recorded as a span once the result is in
+                tracing.get_tracer().record(
+                    "ingest.parse_file", elapsed, error=error,
+                    filepath=str(file_path),
+                    file_type=SUPPORTED_EXTENSIONS.get(file_path.suffix.lower(), "text"),
+                    empty=doc is None and error is None
+                )
                 
-                # Extract content based on file type
-                if file_type == 'pdf':
-                    content = self.load_pdf(file_path)
-                elif file_type == 'docx':
-                    content = self.load_docx(file_path)
-                elif file_type == 'html':
-                    content = self.load_html(file_path)
-                elif file_type == 'json':
-                    content = self.load_json(file_path)
-                elif file_type == 'excel':
-                    content = self.load_excel(file_path)
-                elif file_type == 'powerpoint':
-                    content = self.load_powerpoint(file_path)
-                elif file_type == 'csv':
-                    content = self.load_csv(file_path)
-                elif file_type == 'rtf':
-                    content = self.load_rtf(file_path)
-                elif file_type == 'epub':
-                    content = self.load_epub(file_path)
-                elif file_type == 'xml':
-                    content = self.load_xml(file_path)
-                else:  # text, md, code files
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                if error is not None:
+                    self.failed_files.append(file_path)
+                    console.print(f"[red]-[/red] Error loading {file_path.name}: {error}")
+                    continue
                 
-                if not content.strip():
+                if doc is None:
                     console.print(f"[yellow]![/yellow] Skipped (empty): {file_path.name}")
                     continue
                 
-                # Create Haystack Document
-                doc = Document(
-                    content=content,
-                    meta={
-                        "filename": file_path.name,
-                        "filepath": str(file_path),
-                        "file_type": file_type,
-                        "source": "local"
-                    }
-                )
-                documents.append(doc)
-                console.print(f"[green]+[/green] Loaded ({file_type}): {file_path.name}")
-                
-            except Exception as e:
-                console.print(f"[red]-[/red] Error loading {file_path.name}: {str(e)}")
+                console.print(f"[green]+[/green] Loaded ({doc.meta['file_type']}): {file_path.name} [dim]({elapsed:.2f}s)[/dim]")
+                yield doc
+        finally:
+            self.report_parse_stats(time.perf_counter() - start_time)
+    
+    def _parse_files(self, files: List[Path], workers: int) -> Iterator[Tuple[Optional[Document], float, Optional[str]]]:
+        """Parse files in order, optionally across a bounded window of worker processes"""
+        if workers <= 1:
+            for file_path in files:
+                yield self.parse_file(file_path)
+            return
         
-        return documents
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = iter(files)
+            in_flight = deque()
+            for file_path in pending:
+                in_flight.append(executor.submit(_parse_file_in_worker, file_path))
+                if len(in_flight) >= workers * 4:
+                    break
+            
+            while in_flight:
+                result = in_flight.popleft().result()
+                next_file = next(pending, None)
+                if next_file is not None:
+                    in_flight.append(executor.submit(_parse_file_in_worker, next_file))
+                yield result
+        finally:
+            executor.shutdown(cancel_futures=True)
+    
+    def parse_file(self, file_path: Path) -> Tuple[Optional[Document], float, Optional[str]]:
+        """
+        Load a single file, capturing its parse time and any error
+        
+        Returns:
+            (document or None, seconds spent, error message or None)
+        """
+        start_time = time.perf_counter()
+        try:
+            doc = self.load_file(file_path)
+            return doc, time.perf_counter() - start_time, None
+        except Exception as e:
+            return None, time.perf_counter() - start_time, str(e)
+    
+    def report_parse_stats(self, wall_time: float, slowest: int = 5):
+        """Print parse timing and failure summary"""
+        if not self.file_timings:
+            return
+        
+        cpu_time = sum(self.file_timings.values())
+        console.print(
+            f"[cyan]Parsed {len(self.file_timings)} file(s) in {wall_time:.2f}s "
+            f"({cpu_time:.2f}s total parse time)[/cyan]"
+        )
+        
+        if len(self.file_timings) > slowest:
+            ranked = sorted(self.file_timings.items(), key=lambda item: item[1], reverse=True)[:slowest]
+            console.print("[dim]Slowest files: " + ", ".join(
+                f"{path.name} ({elapsed:.2f}s)" for path, elapsed in ranked
+            ) + "[/dim]")
+        
+        if self.failed_files:
+            console.print(f"[red]{len(self.failed_files)} file(s) failed to load:[/red]")
+            for file_path in self.failed_files:
+                console.print(f"[red]  - {file_path}[/red]")
     
     def load_sample_documents(self) -> List[Document]:
         """Load sample documents for testing"""
@@ -375,6 +550,24 @@ class DocumentIngestionPipeline:
         console.print(f"[green]+[/green] Loaded {len(documents)} sample documents")
         return documents
     
+    def chunk_documents(self, documents: List[Document]) -> List[Document]:
+        """Split documents into token-budgeted chunks"""
+        if not documents:
+            return documents
+        
+        chunks = self.chunker.split(documents)
+        if self.chunker.chunk_size:
+            console.print(
+                f"[cyan]Split {len(documents)} document(s) into {len(chunks)} chunk(s) "
+                f"(~{self.chunker.chunk_size} tokens, {self.chunker.chunk_overlap} overlap)[/cyan]"
+            )
+        return chunks
+    
+    def iter_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Stream the chunks of a stream of documents"""
+        for document in documents:
+            yield from self.chunker.iter_chunks(document)
+    
     def initialize_embedder(self):
         """Initialize the document embedder"""
         console.print(f"[cyan]Initializing embedder: {self.config.EMBEDDING_MODEL}[/cyan]")
@@ -390,6 +583,80 @@ class DocumentIngestionPipeline:
         
         console.print("[green]+[/green] Embedder initialized")
     
+    def progress(self) -> Progress:
+        """Progress bar used for embedding runs"""
+        return Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeElapsedColumn(),
+            console=console
+        )
+    
+    def embed_batches(self, chunks: Iterable[Document], batch_size: int = None) -> Iterator[List[Document]]:
+        """Embed chunks in fixed-size batches, yielding each embedded batch"""
+        batch_size = batch_size or self.config.EMBED_BATCH_SIZE
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield self.embed_batch(batch)
+                batch = []
+        if batch:
+            yield self.embed_batch(batch)
+    
+    def embed_batch(self, batch: List[Document]) -> List[Document]:
+        """Embed one batch, only sending chunks missing from the embedding cache to the model"""
+        with tracing.span("ingest.embed_batch", chunks=len(batch)) as span:
+            return self._embed_batch(batch, span)
+    
+    def _embed_batch(self, batch: List[Document], span: tracing.Span) -> List[Document]:
+        if not self.use_cache:
+            return self.doc_embedder.run(batch)["documents"]
+        
+        if self.embedding_cache is None:
+            self.embedding_cache = EmbeddingCache(
+                self.config.EMBEDDING_CACHE_PATH,
+                model=self.config.EMBEDDING_MODEL,
+                max_entries=self.config.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        
+        cached = self.embedding_cache.get_many([doc.content for doc in batch])
+        missing = [doc for doc, embedding in zip(batch, cached) if embedding is None]
+        span.set_attribute("cache_hits", len(batch) - len(missing))
+        
+        embedded = []
+        if missing:
+            embedded = self.doc_embedder.run(missing)["documents"]
+            self.embedding_cache.put_many([doc.content for doc in embedded], [doc.embedding for doc in embedded])
+        
+        # Reassemble the batch in its original order
+        fresh = iter(embedded)
+        results = []
+        for doc, embedding in zip(batch, cached):
+            if embedding is None:
+                results.append(next(fresh))
+            else:
+                doc.embedding = embedding.tolist()
+                results.append(doc)
+        return results
+    
+    def report_cache_stats(self):
+        """Print embedding cache statistics and apply size-bounded eviction"""
+        if self.embedding_cache is None:
+            return
+        
+        evicted = self.embedding_cache.evict()
+        stats = self.embedding_cache.stats()
+        console.print(
+            f"[cyan]Embedding cache: {stats['hits']} hit(s), {stats['misses']} miss(es) "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries"
+            + (f", {evicted} evicted" if evicted else "") + "[/cyan]"
+        )
+        self.embedding_cache.close()
+        self.embedding_cache = None
+    
     def embed_and_store_documents(self, documents: List[Document]):
         """Create embeddings and store documents"""
         if not documents:
@@ -398,74 +665,244 @@ class DocumentIngestionPipeline:
         
         console.print(f"[cyan]Creating embeddings for {len(documents)} document(s)...[/cyan]")
         
-        with console.status("[bold cyan]Generating embeddings..."):
-            # Create embeddings
-            docs_with_embeddings = self.doc_embedder.run(documents)
-            
-            # Write to document store
-            self.document_store.write_documents(docs_with_embeddings["documents"])
+        with self.progress() as progress:
+            task = progress.add_task("Generating embeddings", total=len(documents))
+            for batch in self.embed_batches(documents):
+                # Write to document store
+                self.document_store.write_documents(batch, policy=DuplicatePolicy.OVERWRITE)
+                progress.advance(task, len(batch))
         
         console.print(f"[green]+[/green] Stored {len(documents)} document(s) with embeddings")
     
+    def manifest_settings(self) -> Dict:
+        """Settings that invalidate every stored chunk when they change"""
+        return {
+            "embedding_model": self.config.EMBEDDING_MODEL,
+            "chunk_size": self.chunker.chunk_size,
+            "chunk_overlap": self.chunker.chunk_overlap,
+            "store_path": str(self.config.get_store_path())
+        }
+    
+    def open_store_writer(self):
+        """Writer for the configured document store format"""
+        return open_store_writer(
+            self.config.get_store_path(),
+            dtype=self.config.EMBEDDING_DTYPE,
+            info={"embedding_model": self.config.EMBEDDING_MODEL}
+        )
+    
     def save_document_store(self):
         """Save document store to disk for persistence"""
-        console.print(f"[cyan]Saving document store to {self.config.DOCUMENT_STORE_PATH}...[/cyan]")
-        
-        # Get all documents from store
-        all_docs = self.document_store.filter_documents()
-        
-        # Serialize to JSON
-        docs_data = []
-        for doc in all_docs:
-            # Handle embedding - could be numpy array or list
-            embedding = doc.embedding
-            if embedding is not None:
-                if hasattr(embedding, 'tolist'):
-                    embedding = embedding.tolist()
-            
-            doc_dict = {
-                "id": doc.id,
-                "content": doc.content,
-                "meta": doc.meta,
-                "embedding": embedding
-            }
-            docs_data.append(doc_dict)
+        console.print(f"[cyan]Saving document store to {self.config.get_store_path()}...[/cyan]")
         
-        # Save to file
-        self.config.DOCUMENT_STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.config.DOCUMENT_STORE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(docs_data, f, indent=2)
+        with tracing.span("ingest.save_store", store=str(self.config.get_store_path())):
+            with self.open_store_writer() as writer:
+                writer.write_documents(self.document_store.filter_documents())
         
         console.print(f"[green]+[/green] Document store saved successfully")
     
-    def run(self, source_dir: Path = None, use_samples: bool = False):
-        """Run the complete ingestion pipeline"""
+    def build_vector_index(self, force: bool = True):
+        """Build the configured approximate nearest-neighbour index and report its recall"""
+        kind = self.config.RETRIEVER
+        store_path = self.config.get_store_path()
+        if kind not in INDEX_TYPES or not store_exists(store_path):
+            return
+        matrix = load_embeddings(store_path)
+        if not force and index_is_current(kind, store_path, matrix):
+            return
+        
+        console.print(f"[cyan]Building {kind.upper()} index over {len(matrix)} chunk(s)...[/cyan]")
+        start_time = time.perf_counter()
+        with tracing.span("ingest.build_index", index=kind, vectors=len(matrix)):
+            index = build_index(kind, matrix, self.config)
+            save_index(index, store_path, matrix)
+        build_time = time.perf_counter() - start_time
+        
+        k = max(10, self.config.TOP_K_RETRIEVAL)
+        recall = measure_recall(index, matrix, k=k)
+        console.print(
+            f"[green]+[/green] {kind.upper()} index built in {build_time:.1f}s "
+            f"(recall@{k} vs exact scan: {recall:.3f})"
+        )
+    
+    def profile_phase(self, name: str):
+        """Profile one ingestion phase (CPU and allocations) when profiling is on"""
+        return profiled(f"ingest-{name}", self.profile, self.config, console)
+    
+    def run(self, source_dir: Path = None, use_samples: bool = False, incremental: bool = True) -> Dict:
+        """
+        Run the complete ingestion pipeline
+        
+        Args:
+            source_dir: Directory to ingest (default: the collection's documents directory)
+            use_samples: Ingest the built-in sample documents instead
+            incremental: Only process files that changed since the last run
+            
+        Returns:
+            Summary with counts of added, updated, removed and unchanged files
+        """
+        with tracing.span(
+            "ingest.run",
+            collection=self.config.COLLECTION,
+            source=str(source_dir or self.config.DOCUMENTS_DIR),
+            samples=use_samples,
+            incremental=incremental
+        ) as span:
+            summary = self._run(source_dir, use_samples, incremental)
+            span.set_attributes(summary)
+        if span.trace_id:
+            console.print(f"[dim]Trace {span.trace_id} (python tracing.py {span.trace_id})[/dim]\n")
+        return summary
+    
+    def _run(self, source_dir: Path, use_samples: bool, incremental: bool) -> Dict:
         console.print("\n[bold cyan]========================================[/bold cyan]")
         console.print("[bold cyan]   Document Ingestion Pipeline         [/bold cyan]")
         console.print("[bold cyan]========================================[/bold cyan]\n")
         
-        # Load documents
+        summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+        
+        # Samples replace the whole store, so the manifest no longer applies
         if use_samples:
-            documents = self.load_sample_documents()
+            with self.profile_phase("load"):
+                documents = self.load_sample_documents()
+                chunks = self.chunk_documents(documents)
+            with self.profile_phase("load_model"):
+                self.initialize_embedder()
+            with self.profile_phase("embed"):
+                self.embed_and_store_documents(chunks)
+            with self.profile_phase("save"):
+                self.save_document_store()
+            self.config.MANIFEST_PATH.unlink(missing_ok=True)
+            self.report_cache_stats()
+            with self.profile_phase("index"):
+                self.build_vector_index()
+            
+            summary.update(added=len(documents), chunks=len(chunks))
+            console.print("\n[bold green]SUCCESS: Document ingestion completed![/bold green]")
+            console.print(f"[green]Knowledge base ready with {len(documents)} document(s) in {len(chunks)} chunk(s)[/green]\n")
+            return summary
+        
+        source_dir = source_dir or self.config.DOCUMENTS_DIR
+        if not source_dir.exists():
+            self.load_documents_from_directory(source_dir)
+            return summary
+        
+        # Work out what changed since the last run
+        with self.profile_phase("discover"):
+            listing = self.discover(source_dir)
+        files = listing.paths
+        if not files and not self.config.MANIFEST_PATH.exists():
+            console.print(f"[yellow]WARNING: No documents found in {source_dir}[/yellow]")
+            console.print(f"[yellow]Supported formats: {', '.join(SUPPORTED_EXTENSIONS.keys())}[/yellow]")
+            return summary
+        manifest = IngestManifest.load(self.config.MANIFEST_PATH)
+        settings = self.manifest_settings()
+        
+        stale_ids = set()
+        store_path = self.config.get_store_path()
+        carry_over = incremental and manifest.is_compatible(settings) and store_exists(store_path)
+        
+        if carry_over:
+            changed, unchanged, deleted = manifest.diff(listing.files, source_dir)
+            summary["unchanged"] = len(unchanged)
+            
+            if not changed and not deleted:
+                manifest.save()
+                with self.profile_phase("index"):
+                    self.build_vector_index(force=False)
+                console.print(f"[green]+[/green] Knowledge base is up to date ({len(unchanged)} file(s) unchanged)\n")
+                return summary
+            
+            console.print(
+                f"[cyan]Incremental update: {len(changed)} new/changed, "
+                f"{len(deleted)} deleted, {len(unchanged)} unchanged[/cyan]"
+            )
+            
+            # Drop chunks of deleted files and of files about to be re-ingested
+            for key in deleted:
+                stale_ids.update(manifest.remove(key))
+            for file_path in changed:
+                key = manifest.key(file_path)
+                if key in manifest.files:
+                    summary["updated"] += 1
+                    stale_ids.update(manifest.remove(key))
+            summary["removed"] = len(deleted)
         else:
-            source_dir = source_dir or self.config.DOCUMENTS_DIR
-            documents = self.load_documents_from_directory(source_dir)
-        
-        if not documents:
-            console.print("[yellow]WARNING: No documents to process. Exiting.[/yellow]")
-            return
-        
-        # Initialize embedder
-        self.initialize_embedder()
-        
-        # Create embeddings and store
-        self.embed_and_store_documents(documents)
-        
-        # Save to disk
-        self.save_document_store()
-        
+            if incremental and manifest.files:
+                console.print("[yellow]Ingestion settings changed - rebuilding the knowledge base[/yellow]")
+            manifest = IngestManifest(self.config.MANIFEST_PATH, settings=settings)
+            changed = files
+        
+        summary["added"] = len(changed) - summary["updated"]
+        
+        # Stream the new store: unchanged chunks are copied over, then the
+        # new or changed files are loaded, chunked and embedded batch by batch
+        chunk_ids_by_file = {}
+        writer = self.open_store_writer()
+        try:
+            if carry_over:
+                with self.profile_phase("copy_unchanged"):
+                    writer.write_records(
+                        record for record in iter_store_records(store_path)
+                        if record["id"] not in stale_ids
+                    )
+            
+            if changed:
+                with self.profile_phase("load_model"):
+                    self.initialize_embedder()
+                documents = self.iter_documents_from_directory(source_dir, files=changed)
+                
+                # Parsing, chunking and embedding are streamed, so they are profiled together
+                with self.profile_phase("parse_and_embed"), self.progress() as progress:
+                    task = progress.add_task("Embedding", total=len(changed))
+                    for batch in self.embed_batches(self.iter_chunks(documents)):
+                        writer.write_documents(batch)
+                        for chunk in batch:
+                            key = manifest.key(Path(chunk.meta["filepath"]))
+                            chunk_ids_by_file.setdefault(key, []).append(chunk.id)
+                        progress.update(
+                            task,
+                            completed=self.files_processed,
+                            description=f"Embedding ({writer.count} chunks stored)"
+                        )
+                    progress.update(task, completed=len(changed))
+            
+            with self.profile_phase("save"), \
+                    tracing.span("ingest.save_store", store=str(store_path), chunks=writer.count):
+                writer.commit()
+        except BaseException:
+            writer.abort()
+            raise
+        
+        # Record which chunks every file produced (failed files are retried next run)
+        failed = {manifest.key(file_path) for file_path in self.failed_files}
+        for file_path in changed:
+            key = manifest.key(file_path)
+            if key not in failed:
+                manifest.record(file_path, chunk_ids_by_file.get(key, []))
+        manifest.save()
+        self.report_cache_stats()
+        with self.profile_phase("index"):
+            self.build_vector_index()
+        
+        summary["chunks"] = writer.count
         console.print("\n[bold green]SUCCESS: Document ingestion completed![/bold green]")
-        console.print(f"[green]Knowledge base ready with {len(documents)} document(s)[/green]\n")
+        console.print(
+            f"[green]Added {summary['added']}, updated {summary['updated']}, removed {summary['removed']} file(s); "
+            f"knowledge base holds {summary['chunks']} chunk(s)[/green]\n"
+        )
+        return summary
+
+
+_worker_pipeline = None
+
+
+def _parse_file_in_worker(file_path: Path) -> Tuple[Optional[Document], float, Optional[str]]:
+    """Parse a file inside a worker process (one pipeline instance per process)"""
+    global _worker_pipeline
+    if _worker_pipeline is None:
+        _worker_pipeline = DocumentIngestionPipeline(workers=1)
+    return _worker_pipeline.parse_file(file_path)
 
 
 def main():
@@ -475,21 +912,68 @@ def main():
         type=str,
         help="Source directory containing documents (default: ./documents)"
     )
+    parser.add_argument(
+        "--collection",
+        type=str,
+        help=f"Knowledge base collection to ingest into (default: {Config.DEFAULT_COLLECTION}); "
+             f"named collections read {Config.COLLECTION_DOCUMENTS_DIR}/<name>/ unless --source is given"
+    )
     parser.add_argument(
         "--samples",
         action="store_true",
         help="Load sample documents for testing"
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-ingest every file instead of only new or changed ones"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help=f"Approximate tokens per chunk, 0 disables chunking (default: {Config.CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        help=f"Approximate tokens shared by consecutive chunks (default: {Config.CHUNK_OVERLAP})"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=f"Parallel file parsing processes, 0 = one per CPU core (default: {Config.INGEST_WORKERS})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recompute every embedding instead of reusing the embedding cache"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Profile CPU time and allocations of each ingestion phase (written to {Config.PROFILE_DIR})"
+    )
     
     args = parser.parse_args()
     
+    # Run pipeline
+    try:
+        pipeline = DocumentIngestionPipeline(
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            workers=args.workers,
+            use_cache=False if args.no_cache else None,
+            collection=args.collection,
+            profile=True if args.profile else None
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    
     # Display configuration
-    Config.display_config()
+    pipeline.config.display_config()
     
-    # Run pipeline
-    pipeline = DocumentIngestionPipeline()
     source_dir = Path(args.source) if args.source else None
-    pipeline.run(source_dir=source_dir, use_samples=args.samples)
+    pipeline.run(source_dir=source_dir, use_samples=args.samples, incremental=not args.full)
 
 
 if __name__ == "__main__":
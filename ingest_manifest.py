@@ -0,0 +1,144 @@
+"""
+Ingestion Manifest
+Tracks ingested files so that only new or changed files are re-embedded
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from file_discovery import DiscoveredFile
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(file_path: Path, block_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Persistent record of ingested files and the chunks they produced"""
+
+    def __init__(self, path: Path, settings: Dict = None, files: Dict[str, Dict] = None):
+        self.path = Path(path)
+        self.settings = settings or {}
+        self.files = files or {}
+        self._hashes = {}
+        self._stats = {}
+
+    @classmethod
+    def load(cls, path: Path) -> "IngestManifest":
+        """Load a manifest from disk (an empty manifest if none exists)"""
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, settings=data.get("settings", {}), files=data.get("files", {}))
+
+    def save(self):
+        """Write the manifest to disk atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "settings": self.settings,
+                "files": self.files
+            }, f)
+        tmp_path.replace(self.path)
+
+    def is_compatible(self, settings: Dict) -> bool:
+        """Check that the stored chunks were produced with the same settings"""
+        return bool(self.files) and self.settings == settings
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        """Manifest key for a file"""
+        return str(Path(file_path).resolve())
+
+    def diff(self, files: Iterable[DiscoveredFile], root: Path) -> Tuple[List[Path], List[str], List[str]]:
+        """
+        Compare a discovery listing with the manifest
+
+        Files whose size and mtime are unchanged are trusted without hashing;
+        otherwise the content hash decides whether the file really changed.
+        The listing already carries stat info, so no file is stat'ed twice.
+
+        Args:
+            files: Files currently present under root (from discover_files)
+            root: Directory that was scanned; only entries below it can be deleted
+
+        Returns:
+            (changed, unchanged, deleted) - changed files to ingest, keys of
+            unchanged files and keys of files that no longer exist
+        """
+        changed, unchanged = [], []
+        seen = set()
+
+        for discovered in files:
+            file_path = discovered.path
+            key = self.key(file_path)
+            seen.add(key)
+            entry = self.files.get(key)
+            self._stats[key] = (discovered.size, discovered.mtime)
+
+            if entry is None:
+                changed.append(file_path)
+                continue
+
+            if entry["size"] == discovered.size and entry["mtime"] == discovered.mtime:
+                unchanged.append(key)
+                continue
+
+            content_hash = hash_file(file_path)
+            self._hashes[key] = content_hash
+            if content_hash == entry["sha256"]:
+                # Touched but not modified - refresh the stat fields only
+                entry["size"] = discovered.size
+                entry["mtime"] = discovered.mtime
+                unchanged.append(key)
+            else:
+                changed.append(file_path)
+
+        root = Path(root).resolve()
+        deleted = [
+            key for key in self.files
+            if key not in seen and Path(key).is_relative_to(root)
+        ]
+        return changed, unchanged, deleted
+
+    def record(self, file_path: Path, chunk_ids: List[str]):
+        """Record a freshly ingested file"""
+        key = self.key(file_path)
+        if key in self._stats:
+            size, mtime = self._stats.pop(key)
+        else:
+            stat = Path(file_path).stat()
+            size, mtime = stat.st_size, stat.st_mtime
+        self.files[key] = {
+            "size": size,
+            "mtime": mtime,
+            "sha256": self._hashes.pop(key, None) or hash_file(file_path),
+            "chunk_ids": chunk_ids
+        }
+
+    def remove(self, key: str) -> List[str]:
+        """Forget a file and return the chunk ids it produced"""
+        entry = self.files.pop(key, None)
+        return entry["chunk_ids"] if entry else []
+
+    def chunk_ids(self, key: str) -> List[str]:
+        """Chunk ids produced by a file"""
+        entry = self.files.get(key)
+        return entry["chunk_ids"] if entry else []
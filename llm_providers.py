@@ -0,0 +1,320 @@
+"""
+LLM Providers
+Timeouts, pooled keep-alive connections, retries and circuit breaking for LLM calls
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from haystack import component
+from haystack.dataclasses import ChatMessage, StreamingChunk
+
+try:
+    import openai
+    TRANSIENT_ERRORS = (TimeoutError, ConnectionError, httpx.TransportError, openai.APIConnectionError)
+    RESPONSE_TIMEOUTS = (httpx.ReadTimeout, openai.APITimeoutError)
+except ImportError:
+    TRANSIENT_ERRORS = (TimeoutError, ConnectionError, httpx.TransportError)
+    RESPONSE_TIMEOUTS = (httpx.ReadTimeout,)
+
+try:
+    from haystack_integrations.components.generators.ollama import OllamaChatGenerator
+    from ollama import AsyncClient, Client
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+# HTTP statuses worth retrying (timeouts, rate limits, overloaded or restarting servers)
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit is open"""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a failed LLM call may succeed if retried"""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after repeated failures
+
+    After `failure_threshold` consecutive failed calls the circuit opens and
+    calls fail fast with CircuitOpenError. After `reset_timeout` seconds one
+    trial call is let through (half-open): success closes the circuit again,
+    failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == "closed" or self.failure_threshold <= 0:
+                return
+            waited = time.monotonic() - self.opened_at
+            if self.state == "open" and waited >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_in = max(0.0, self.reset_timeout - waited)
+        raise CircuitOpenError(
+            f"LLM provider '{self.name}' is unavailable after {self.failures} consecutive failures; "
+            f"retrying in {retry_in:.0f}s"
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str, config) -> CircuitBreaker:
+    """The process-wide circuit breaker of a provider"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=config.LLM_CIRCUIT_FAILURES,
+                reset_timeout=config.LLM_CIRCUIT_RESET_SECONDS
+            )
+        return _breakers[provider]
+
+
+class ConnectionMonitor:
+    """Counts HTTP requests and newly opened connections (the rest reused a pooled one)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def _count(self, event: str):
+        with self._lock:
+            if event == "request":
+                self.requests += 1
+            elif event == "connection.connect_tcp.complete":
+                self.connections += 1
+
+    def _on_request(self, request: httpx.Request):
+        self._count("request")
+        request.extensions["trace"] = lambda event, info: self._count(event)
+
+    async def _on_request_async(self, request: httpx.Request):
+        async def trace(event, info):
+            self._count(event)
+        self._count("request")
+        request.extensions["trace"] = trace
+
+    def event_hooks(self, async_client: bool = False) -> Dict[str, List[Callable]]:
+        """httpx event_hooks that record requests and connections"""
+        return {"request": [self._on_request_async if async_client else self._on_request]}
+
+    def stats(self) -> Dict[str, Any]:
+        reused = self.requests - self.connections
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else None
+        }
+
+
+def http_timeout(config) -> httpx.Timeout:
+    """Connect timeout plus a limit on waiting for each response chunk"""
+    return httpx.Timeout(config.LLM_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT)
+
+
+def http_limits(config) -> Dict[str, Any]:
+    """Keep-alive connection pool size for a provider client"""
+    return {
+        "max_connections": config.LLM_POOL_SIZE,
+        "max_keepalive_connections": config.LLM_POOL_SIZE,
+        "keepalive_expiry": config.LLM_KEEPALIVE_SECONDS
+    }
+
+
+if OLLAMA_AVAILABLE:
+    @component
+    class PooledOllamaChatGenerator(OllamaChatGenerator):
+        """
+        OllamaChatGenerator with a connect timeout, a keep-alive connection pool and request counters
+
+        OllamaChatGenerator only takes a single timeout and creates its own
+        clients, so they are replaced after construction. If a release stops
+        creating them this fails instead of silently keeping the defaults.
+        """
+
+        def __init__(self, model: str, url: str, config, monitor: ConnectionMonitor, **kwargs):
+            # @component rebuilds the class, so zero-argument super() can't be used
+            OllamaChatGenerator.__init__(self, model=model, url=url, timeout=int(config.LLM_TIMEOUT), **kwargs)
+            for attribute, client_class, async_client in [("_client", Client, False),
+                                                         ("_async_client", AsyncClient, True)]:
+                if not isinstance(getattr(self, attribute, None), client_class):
+                    raise TypeError(
+                        f"OllamaChatGenerator has no {client_class.__name__} in '{attribute}' to replace; "
+                        "this ollama-haystack version is not supported"
+                    )
+                setattr(self, attribute, client_class(
+                    host=url,
+                    timeout=http_timeout(config),
+                    limits=httpx.Limits(**http_limits(config)),
+                    event_hooks=monitor.event_hooks(async_client)
+                ))
+
+
+@component
+class ResilientChatGenerator:
+    """
+    Wraps a chat generator with retries and a circuit breaker
+
+    Transient failures (dropped connections, connect timeouts, 429/5xx) are
+    retried with jittered exponential backoff. A streamed call is only retried
+    if no token has been delivered yet, so callers never see repeated text.
+    Response timeouts are not retried: a provider that sent nothing for
+    LLM_TIMEOUT seconds is hung, and retrying would multiply the wait.
+    """
+
+    def __init__(self, generator, provider: str, config, monitor: Optional[ConnectionMonitor] = None):
+        self.generator = generator
+        self.provider = provider
+        self.max_retries = config.LLM_MAX_RETRIES
+        self.backoff = config.LLM_RETRY_BACKOFF
+        self.backoff_max = config.LLM_RETRY_BACKOFF_MAX
+        self.breaker = get_circuit_breaker(provider, config)
+        self.monitor = monitor
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _should_retry(self, error: Exception, attempt: int, streamed: bool) -> bool:
+        transient = is_transient_error(error)
+        retryable = transient and not isinstance(error, RESPONSE_TIMEOUTS)
+        if retryable and not streamed and attempt < self.max_retries:
+            self._count("retries")
+            return True
+        self._count("failures")
+        if transient:
+            self.breaker.record_failure()
+        else:
+            # The provider answered (e.g. a bad request) - it is up
+            self.breaker.record_success()
+        return False
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, messages: List[ChatMessage], streaming_callback: Optional[Callable[[StreamingChunk], Any]] = None):
+        self._count("calls")
+        self.breaker.before_call()
+        streamed = False
+
+        def on_chunk(chunk: StreamingChunk):
+            nonlocal streamed
+            streamed = True
+            streaming_callback(chunk)
+
+        kwargs = {"streaming_callback": on_chunk} if streaming_callback is not None else {}
+        attempt = 0
+        while True:
+            try:
+                result = self.generator.run(messages=messages, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt, streamed):
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff, self.backoff_max))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    @component.output_types(replies=List[ChatMessage])
+    async def run_async(self, messages: List[ChatMessage],
+                        streaming_callback: Optional[Callable[[StreamingChunk], Any]] = None):
+        self._count("calls")
+        self.breaker.before_call()
+        streamed = False
+
+        async def on_chunk(chunk: StreamingChunk):
+            nonlocal streamed
+            streamed = True
+            await streaming_callback(chunk)
+
+        kwargs = {"streaming_callback": on_chunk} if streaming_callback is not None else {}
+        run_async = getattr(self.generator, "run_async", None)
+        loop = asyncio.get_running_loop()
+        if run_async is None and streaming_callback is not None:
+            # The sync generator runs in a worker thread; hand each chunk back to the loop
+            kwargs = {"streaming_callback": lambda chunk: asyncio.run_coroutine_threadsafe(on_chunk(chunk), loop).result()}
+        attempt = 0
+        while True:
+            try:
+                if run_async is not None:
+                    result = await run_async(messages=messages, **kwargs)
+                else:
+                    result = await loop.run_in_executor(None, lambda: self.generator.run(messages=messages, **kwargs))
+            except Exception as e:
+                if not self._should_retry(e, attempt, streamed):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, self.backoff_max))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Call, retry and failure counters, circuit state and connection reuse"""
+        return {
+            "provider": self.provider,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "circuit": self.breaker.stats(),
+            "connections": self.monitor.stats() if self.monitor is not None else None
+        }
@@ -0,0 +1,170 @@
+"""
+Metadata Index
+Inverted bitmap index over document metadata, used to pre-filter retrieval
+"""
+
+import sys
+from fnmatch import filter as fnmatch_filter
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+from haystack import Document
+
+# Fields recorded by ingest_documents.py
+DEFAULT_FIELDS = ["filename", "filepath", "file_type", "source"]
+
+# A filter maps a field to a value, a glob ("/policies/*") or a list of either.
+# Values in a list are OR'ed; fields are AND'ed.
+Filters = Dict[str, Union[str, List[str]]]
+
+GLOB_CHARS = set("*?[")
+
+# Beyond this many matching values, select rows from the value codes instead of OR-ing bitmaps
+MAX_BITMAPS_TO_COMBINE = 32
+
+# Field bitmaps remembered per (field, patterns) - filters tend to repeat
+FILTER_CACHE_SIZE = 256
+
+
+class MetadataIndex:
+    """
+    Inverted index from (field, value) to document rows
+
+    Common values are stored as bitmaps packed 8 rows per byte, rare values
+    (e.g. a single file's path) as sorted row lists, whichever is smaller.
+    Combining filters is then a handful of vectorised AND/OR operations.
+    """
+
+    def __init__(self, fields: Iterable[str] = DEFAULT_FIELDS):
+        self.fields = list(fields)
+        self.size = 0
+        self._codes: Dict[str, np.ndarray] = {}
+        self._vocab: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, List[np.ndarray]] = {}
+        self._cache: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, documents: List[Document], fields: Iterable[str] = DEFAULT_FIELDS) -> "MetadataIndex":
+        index = cls(fields)
+        index.add(documents)
+        return index
+
+    def add(self, documents: List[Document]):
+        """Index more documents; rows continue from the current size and only their values' postings change"""
+        start = self.size
+        self.size += len(documents)
+        self._cache = {}
+        for field in self.fields:
+            vocab = self._vocab.setdefault(field, {})
+            postings = self._postings.setdefault(field, [])
+            codes = np.empty(len(documents), dtype=np.int32)
+            for i, doc in enumerate(documents):
+                value = doc.meta.get(field)
+                codes[i] = -1 if value is None else vocab.setdefault(str(value), len(vocab))
+            self._codes[field] = _append(self._codes.get(field), codes, start)
+            postings.extend(np.empty(0, dtype=np.int32) for _ in range(len(vocab) - len(postings)))
+
+            # Sort the batch by code so each value's new rows are a contiguous (ascending) run
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            batch_codes, first = np.unique(codes[order], return_index=True)
+            bounds = np.append(first, len(order))
+            for code, lo, hi in zip(batch_codes, bounds[:-1], bounds[1:]):
+                if code >= 0:
+                    postings[code] = self._extend_posting(postings[code], order[lo:hi] + start)
+
+    def _extend_posting(self, posting: np.ndarray, new_rows: np.ndarray) -> np.ndarray:
+        """Append rows (all past the posting's last row) to a posting"""
+        if posting.dtype != np.uint8:
+            rows = np.concatenate([posting, new_rows])
+            if len(rows) * 32 <= self.size:
+                return rows
+            # A packed bitmap (size / 8 bytes) is now smaller than the row list
+            posting, new_rows = np.empty(0, dtype=np.uint8), rows
+        bitmap = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        bitmap[:len(posting)] = posting
+        np.bitwise_or.at(bitmap, new_rows >> 3, (0x80 >> (new_rows & 7)).astype(np.uint8))
+        return bitmap
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory of the codes, postings and value strings"""
+        total = sum(codes.nbytes for codes in self._codes.values())
+        total += sum(posting.nbytes for postings in self._postings.values() for posting in postings)
+        total += sum(sys.getsizeof(value) for vocab in self._vocab.values() for value in vocab)
+        return total + sum(bitmap.nbytes for bitmap in self._cache.values())
+
+    def values(self, field: str) -> List[str]:
+        """Distinct values of a field, sorted"""
+        return sorted(self._vocab.get(field, {}))
+
+    def _field_bitmap(self, field: str, wanted: Union[str, List[str]]) -> np.ndarray:
+        if field not in self._vocab:
+            raise ValueError(f"Cannot filter on '{field}'; indexed fields are {self.fields}")
+        patterns = tuple(str(p) for p in ([wanted] if isinstance(wanted, str) else wanted))
+        cache_key = (field, patterns)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        vocab = self._vocab[field]
+        matched = set()
+        for pattern in patterns:
+            if GLOB_CHARS & set(pattern):
+                matched.update(vocab[value] for value in fnmatch_filter(vocab, pattern))
+            elif pattern in vocab:
+                matched.add(vocab[pattern])
+
+        if len(matched) <= MAX_BITMAPS_TO_COMBINE:
+            result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+            row_lists = []
+            for code in matched:
+                posting = self._postings[field][code]
+                if posting.dtype == np.uint8:
+                    # Bitmaps only grow when their value gets new rows, so may be shorter
+                    result[:len(posting)] |= posting
+                else:
+                    row_lists.append(posting)
+            if row_lists:
+                mask = np.zeros(self.size, dtype=bool)
+                mask[np.concatenate(row_lists)] = True
+                result |= np.packbits(mask)
+        else:
+            result = np.packbits(np.isin(self._codes[field][:self.size], np.fromiter(matched, dtype=np.int32)))
+
+        if len(self._cache) >= FILTER_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[cache_key] = result
+        return result
+
+    def rows(self, filters: Filters) -> np.ndarray:
+        """Sorted row numbers of the documents matching every filter"""
+        combined = None
+        for field, wanted in filters.items():
+            bitmap = self._field_bitmap(field, wanted)
+            combined = bitmap if combined is None else combined & bitmap
+        if combined is None:
+            return np.arange(self.size)
+        return np.flatnonzero(np.unpackbits(combined, count=self.size))
+
+
+def _append(buffer: Optional[np.ndarray], values: np.ndarray, size: int) -> np.ndarray:
+    """Write values after the first size entries of buffer, growing it geometrically"""
+    needed = size + len(values)
+    if buffer is None or needed > len(buffer):
+        grown = np.empty(max(needed, 2 * len(buffer) if buffer is not None else 0), dtype=values.dtype)
+        if size:
+            grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:needed] = values
+    return buffer
+
+
+def parse_filter_args(items: Iterable[str]) -> Filters:
+    """Parse 'field=value' strings (comma-separated values are OR'ed) into filters"""
+    filters: Filters = {}
+    for item in items:
+        if "=" not in item:
+            raise ValueError(f"Filters must look like field=value, got '{item}'")
+        field, value = item.split("=", 1)
+        values = [v.strip() for v in value.split(",") if v.strip()]
+        filters[field.strip()] = values[0] if len(values) == 1 else values
+    return filters
@@ -0,0 +1,213 @@
+"""
+Query Metrics
+Per-stage query timings, exported to in-process histograms (Prometheus text format) and a JSONL log
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import tracing
+
+# Stages timed by RAGPipeline, in pipeline order
+STAGES = ["embed", "retrieve", "prompt", "generate"]
+
+# Prometheus histograms: timings named "total" and "first_token" get their own
+# series, every other timing is a stage of rapidrag_stage_seconds
+HISTOGRAMS = {
+    "stage": ("rapidrag_stage_seconds", "Time spent in each query stage"),
+    "total": ("rapidrag_query_seconds", "Time to answer a question, including waiting on a coalesced one"),
+    "first_token": ("rapidrag_first_token_seconds", "Time to the first streamed token")
+}
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+
+def format_seconds(seconds: float) -> str:
+    """Short human-readable duration ("12 ms", "1.8 s")"""
+    if seconds == float("inf"):
+        return f"> {LATENCY_BUCKETS[-2]:g} s"
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.1f} s"
+
+
+class QueryMetrics:
+    """Stage timings (seconds) and token counts of one query"""
+
+    def __init__(self, collection: str = "default"):
+        self.collection = collection
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.first_token: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str, span_name: Optional[str] = None):
+        """Time a block and trace it as a span ("rag.<stage>" by default); repeated blocks of a stage add up"""
+        start = time.perf_counter()
+        try:
+            with tracing.span(span_name or f"rag.{name}") as span:
+                yield span
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage timings plus total (and time to first token when streamed), in seconds"""
+        timings = {name: round(seconds, 6) for name, seconds in self.timings.items()}
+        if self.first_token is not None:
+            timings["first_token"] = round(self.first_token, 6)
+        timings["total"] = round(time.perf_counter() - self.started, 6)
+        return timings
+
+
+class HistogramSink:
+    """
+    In-process latency histograms and counters, labelled by collection
+
+    Thread-safe; prometheus_text() renders them in the Prometheus text
+    exposition format (served on /metrics by api_server.py).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, str, str], List] = {}  # (series, collection, stage) -> [bucket counts, sum, count]
+        self._counters: Dict[Tuple[str, str, str], float] = {}  # (name, collection, label) -> value
+        self._lock = threading.Lock()
+
+    def _observe(self, collection: str, name: str, seconds: float):
+        series, stage = (name, "") if name in HISTOGRAMS else ("stage", name)
+        histogram = self._histograms.setdefault((series, collection, stage), [[0] * len(self.buckets), 0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram[0][i] += 1
+                break
+        histogram[1] += seconds
+        histogram[2] += 1
+
+    def _increment(self, name: str, collection: str, label: str, value: float = 1):
+        key = (name, collection, label)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def record(self, record: Dict[str, Any]):
+        collection = record["collection"]
+        with self._lock:
+            for name, seconds in record["timings"].items():
+                self._observe(collection, name, seconds)
+            self._increment("queries", collection, "true" if record["cached"] else "false")
+            if record.get("error"):
+                self._increment("errors", collection, "")
+            for kind in ["prompt", "completion"]:
+                if record.get(f"{kind}_tokens"):
+                    self._increment("tokens", collection, kind, record[f"{kind}_tokens"])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Count, mean and approximate p50/p95 (bucket upper bounds) per stage,
+        plus "total" and "first_token", all collections combined
+        """
+        with self._lock:
+            combined: Dict[str, List] = {}
+            for (series, _, stage), (counts, total, count) in self._histograms.items():
+                merged = combined.setdefault(stage or series, [[0] * len(self.buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+
+        summary = {}
+        for stage, (counts, total, count) in combined.items():
+            if not count:
+                continue
+            summary[stage] = {
+                "count": count,
+                "mean": total / count,
+                "p50": self._quantile(counts, count, 0.5),
+                "p95": self._quantile(counts, count, 0.95)
+            }
+        return summary
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= q * count:
+                return bound
+        return self.buckets[-1]
+
+    def prometheus_text(self) -> str:
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for series, (metric, help_text) in HISTOGRAMS.items():
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (name, collection, stage), (counts, total, count) in sorted(self._histograms.items()):
+                    if name != series:
+                        continue
+                    labels = f'collection="{collection}"' + (f',stage="{stage}"' if stage else "")
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                    lines.append(f"{metric}_sum{{{labels}}} {total}")
+                    lines.append(f"{metric}_count{{{labels}}} {count}")
+
+            counters = [
+                ("queries", "cached", "Answered questions"),
+                ("errors", None, "Questions that failed"),
+                ("tokens", "kind", "Prompt and completion tokens")
+            ]
+            for name, label_name, help_text in counters:
+                lines.append(f"# HELP rapidrag_{name}_total {help_text}")
+                lines.append(f"# TYPE rapidrag_{name}_total counter")
+                for (counter, collection, label), value in sorted(self._counters.items()):
+                    if counter != name:
+                        continue
+                    labels = f'collection="{collection}"'
+                    if label_name:
+                        labels += f',{label_name}="{label}"'
+                    lines.append(f"rapidrag_{name}_total{{{labels}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class JsonlSink:
+    """Appends one JSON line per query (timings, token counts, cache hit - not the question text)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]):
+        line = json.dumps({"timestamp": time.time(), **record}, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+# Shared by every pipeline in the process
+histograms = HistogramSink()
+_jsonl_sinks: Dict[Path, JsonlSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_metrics_sinks(config) -> List:
+    """Sinks that receive every query record: the process-wide histograms and, if configured, a JSONL log"""
+    if not config.METRICS_ENABLED:
+        return []
+    sinks = [histograms]
+    if config.METRICS_JSONL_PATH:
+        path = Path(config.METRICS_JSONL_PATH)
+        with _sinks_lock:
+            if path not in _jsonl_sinks:
+                _jsonl_sinks[path] = JsonlSink(path)
+            sinks.append(_jsonl_sinks[path])
+    return sinks
@@ -0,0 +1,174 @@
+"""
+Profiling
+CPU profiles (cProfile) and allocation snapshots (tracemalloc) of questions and ingestion phases
+
+Each profiled block writes to PROFILE_DIR:
+    <time>-<name>.prof        pstats file (python -m pstats, snakeviz, flameprof, gprof2dot)
+    <time>-<name>.tracemalloc tracemalloc snapshot (tracemalloc.Snapshot.load)
+and prints the top functions by cumulative time and the top allocation growth.
+"""
+
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+# Frames kept per allocation traceback
+TRACEMALLOC_FRAMES = 10
+
+# cProfile and tracemalloc are process-wide, so only one block is profiled at a time
+_active = threading.Lock()
+
+# From Python 3.12 cProfile runs on the interpreter-wide sys.monitoring: one
+# profiler sees every thread and a second one cannot be enabled
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """
+    Profile a block: CPU time of the calling thread and of threads it starts, and memory allocations
+
+    From Python 3.12 one profiler covers every thread. Before that each new
+    thread gets its own, so threads that were already running (e.g. pooled
+    executor threads) are not profiled; a profiler can only be switched off
+    from its own thread, so threads that outlive the block drop theirs at
+    their next profiled event. Worker processes are never profiled.
+    """
+
+    def __init__(self, name: str, output_dir: Path, top: int = 15, console: Optional[Console] = None):
+        self.name = name
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.console = console or Console()
+        self.profile_path: Optional[Path] = None
+        self.snapshot_path: Optional[Path] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._owns_lock = False
+        self._started_tracemalloc = False
+        self._done = False
+
+    def _profile_new_thread(self, frame, event, arg):
+        # Installed by threading.setprofile (before 3.12): swap in a profiler for this thread
+        sys.setprofile(None)
+        profile = cProfile.Profile(self._thread_timer)
+        try:
+            profile.enable()
+        except ValueError:
+            return  # Another profiling tool is active; run the thread unprofiled
+        self._profiles.append(profile)
+
+    def _thread_timer(self) -> float:
+        # Timer of the per-thread profilers, called on each of their events
+        if self._done:
+            sys.setprofile(None)
+        return time.perf_counter()
+
+    def __enter__(self) -> "Profiler":
+        self._owns_lock = _active.acquire(blocking=False)
+        if not self._owns_lock:
+            self.console.print(f"[yellow]Profiling of '{self.name}' skipped: another block is being profiled[/yellow]")
+            return self
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self._start = time.perf_counter()
+
+        if not PROCESS_WIDE_PROFILER:
+            threading.setprofile(self._profile_new_thread)
+        main_profile = cProfile.Profile()
+        self._profiles.append(main_profile)
+        main_profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._owns_lock:
+            return False
+        try:
+            if not PROCESS_WIDE_PROFILER:
+                threading.setprofile(None)
+            self._done = True
+            self._profiles[0].disable()
+            elapsed = time.perf_counter() - self._start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            self.save(snapshot)
+            self.report(elapsed, peak, snapshot)
+        finally:
+            _active.release()
+        return False
+
+    def save(self, snapshot: tracemalloc.Snapshot):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{self.name}"
+        self.profile_path = self.output_dir / f"{stem}.prof"
+        self.snapshot_path = self.output_dir / f"{stem}.tracemalloc"
+
+        self.stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            try:
+                self.stats.add(profile)
+            except (TypeError, ValueError):
+                pass  # A thread that never ran any Python code
+        self.stats.dump_stats(self.profile_path)
+        snapshot.dump(str(self.snapshot_path))
+
+    def report(self, elapsed: float, peak: int, snapshot: tracemalloc.Snapshot):
+        """Print the top functions by cumulative time and the lines that allocated the most"""
+        threads = "all threads" if PROCESS_WIDE_PROFILER else f"{len(self._profiles)} thread(s)"
+        functions = Table(title=f"Profile: {self.name} ({elapsed:.2f}s, {threads})", box=None)
+        functions.add_column("Cumulative", justify="right", style="cyan")
+        functions.add_column("Own", justify="right")
+        functions.add_column("Calls", justify="right")
+        functions.add_column("Function", style="dim")
+        # The profiler's own enter/exit frames are left out
+        ranked = sorted(
+            (item for item in self.stats.stats.items() if item[0][0] != __file__),
+            key=lambda item: item[1][3], reverse=True
+        )
+        for (filename, line, function), (_, calls, own, cumulative, _) in ranked[:self.top]:
+            location = f"{Path(filename).name}:{line}" if line else filename
+            functions.add_row(f"{cumulative:.3f}s", f"{own:.3f}s", str(calls), f"{function} ({location})")
+
+        allocations = Table(title=f"Allocations: {peak / 1024 / 1024:.1f} MB peak", box=None)
+        allocations.add_column("Growth", justify="right", style="cyan")
+        allocations.add_column("Blocks", justify="right")
+        allocations.add_column("Line", style="dim")
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        growth = [
+            d for d in snapshot.filter_traces(ignore).compare_to(self._baseline.filter_traces(ignore), "lineno")
+            if d.size_diff > 0
+        ]
+        for diff in growth[:self.top]:
+            frame = diff.traceback[0]
+            allocations.add_row(
+                f"{diff.size_diff / 1024:.1f} KB", f"{diff.count_diff:+d}",
+                f"{Path(frame.filename).name}:{frame.lineno}"
+            )
+
+        self.console.print()
+        self.console.print(functions)
+        self.console.print(allocations)
+        self.console.print(f"[dim]Saved {self.profile_path} and {self.snapshot_path}[/dim]\n")
+
+
+def profiled(name: str, enabled: bool, config=None, console: Optional[Console] = None):
+    """A Profiler writing to config.PROFILE_DIR when enabled, otherwise a no-op context"""
+    if not enabled:
+        return nullcontext()
+    if config is None:
+        from config import Config as config
+    return Profiler(name, config.PROFILE_DIR, top=config.PROFILE_TOP_N, console=console)
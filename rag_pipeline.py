@@ -3,56 +3,155 @@ RAG Pipeline - Retrieval-Augmented Generation
 Handles query processing, retrieval, and response generation
 """
 
+import asyncio
 import json
 import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 
-from haystack import Pipeline, Document
+import numpy as np
+from haystack import Document
 from haystack.document_stores.in_memory import InMemoryDocumentStore
-from haystack.components.embedders import SentenceTransformersTextEmbedder
+from haystack.components.embedders import SentenceTransformersDocumentEmbedder, SentenceTransformersTextEmbedder
 from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
 from haystack.components.builders import ChatPromptBuilder
 from haystack.dataclasses import ChatMessage
 
+from answer_cache import SemanticAnswerCache
+from chunking import count_tokens
 from config import Config
+from context_packing import ContextPacker, template_overhead
+from llm_providers import OLLAMA_AVAILABLE, ConnectionMonitor, ResilientChatGenerator, http_limits
+from metadata_index import Filters, MetadataIndex
+from metrics import QueryMetrics, get_metrics_sinks
+import tracing
+from request_coalescing import RequestCoalescer, normalize_question
+from document_store_io import load_store, resolve_store_path, store_exists, store_version
+from vector_index import (
+    INDEX_TYPES, AnnEmbeddingRetriever, MatrixEmbeddingRetriever, build_index, exact_search, load_index,
+    save_index
+)
+
+# Providers whose generators can stream tokens through a streaming_callback
+STREAMING_PROVIDERS = ["openai", "ollama"]
+
+# Marks the end of a token stream
+_STREAM_END = object()
+
+# Start-up stages, run concurrently by RAGPipeline.initialize
+WARMUP_STAGES = ["store", "embedder", "llm"]
+
+# Rough per-document memory besides its text (Document object, metadata, store entry)
+DOCUMENT_OVERHEAD_BYTES = 1024
+
+# Filters keeping at least this fraction of the rows search the approximate index
+# (over-fetching ANN_OVERFETCH times the expected hits); narrower ones scan exactly
+BROAD_FILTER_FRACTION = 0.1
+ANN_OVERFETCH = 2
+
+PROMPT_TEMPLATE = """You are a helpful assistant that answers questions based on the provided context.
+Use the context below to answer the question. If you cannot answer based on the context, say so.
+
+Context:
+{% for document in documents %}
+{{ document.content }}
+---
+{% endfor %}
+
+Question: {{question}}
+
+Answer:"""
 
 
 class RAGPipeline:
     """RAG Pipeline for question answering"""
     
-    def __init__(self):
-        self.config = Config
+    def __init__(self, config=None):
+        self.config = config or Config
         self.document_store = InMemoryDocumentStore()
-        self.pipeline = None
+        self.built = False
         self.llm_generator = None
+        self.store_path = None
+        self.store_version = ""
+        self.embeddings = None
+        self.documents = []
+        self.metadata_index = None
+        self.vector_index = None
+        self.query_embedder = None
+        self.batch_embedder = None
+        self.retriever = None
+        self.context_packer = None
+        self.prompt_builder = None
+        self.warmup = {stage: {"status": "pending", "seconds": None, "error": None} for stage in WARMUP_STAGES}
+        self._warmup_lock = threading.Lock()
+        self.coalescer = RequestCoalescer() if self.config.COALESCE_QUERIES else None
+        # Objects with a record(dict) method; each answered question is reported to them
+        self.metrics_sinks = get_metrics_sinks(self.config)
+        self.answer_cache = None
+        if self.config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=self.config.ANSWER_CACHE_THRESHOLD,
+                ttl=self.config.ANSWER_CACHE_TTL,
+                max_entries=self.config.ANSWER_CACHE_MAX_ENTRIES
+            )
         
-    def load_document_store(self):
-        """Load document store from disk"""
-        if not self.config.DOCUMENT_STORE_PATH.exists():
+    def existing_store_path(self) -> Path:
+        """Path of the collection's document store, or FileNotFoundError if it was never ingested"""
+        store_path = resolve_store_path(self.config)
+        if not store_exists(store_path):
+            command = "python ingest_documents.py"
+            if self.config.COLLECTION != "default":
+                command += f" --collection {self.config.COLLECTION}"
             raise FileNotFoundError(
-                f"Document store not found at {self.config.DOCUMENT_STORE_PATH}\n"
-                "Please run 'python ingest_documents.py' first to create the knowledge base."
+                f"Document store not found at {store_path}\n"
+                f"Please run '{command}' first to create the knowledge base."
             )
+        return store_path
+    
+    def load_document_store(self):
+        """Load document store from disk"""
+        store_path = self.existing_store_path()
         
         # Check if already loaded
         if self.document_store.count_documents() > 0:
-            return len(self.document_store.filter_documents())
+            return self.document_store.count_documents()
         
-        # Load documents from JSON
-        with open(self.config.DOCUMENT_STORE_PATH, 'r', encoding='utf-8') as f:
-            docs_data = json.load(f)
+        # Load records and the (memory-mapped) embedding matrix
+        records, embeddings = load_store(store_path)
+        self.store_path = store_path
+        self.store_version = store_version(store_path)
+        self.embeddings = embeddings
         
-        # Recreate documents with embeddings
+        # Recreate documents (per-document embeddings are only needed by
+        # Haystack's InMemoryEmbeddingRetriever; the others use the matrix)
+        per_document = self.config.RETRIEVER == "inmemory"
         documents = []
-        for doc_dict in docs_data:
+        for row, doc_dict in enumerate(records):
             doc = Document(
                 id=doc_dict["id"],
                 content=doc_dict["content"],
-                meta=doc_dict.get("meta", {}),
-                embedding=doc_dict.get("embedding")
+                meta=doc_dict.get("meta", {})
             )
+            if per_document:
+                # Document() turns arrays into lists of floats; a row view of the
+                # memory-mapped matrix avoids copying every embedding
+                object.__setattr__(doc, "embedding", embeddings[row])
             documents.append(doc)
+        self.documents = documents
+        self.metadata_index = MetadataIndex.build(documents, self.config.METADATA_INDEX_FIELDS)
+        
+        # Load the approximate index saved at ingest time (built now if missing)
+        if self.config.RETRIEVER in INDEX_TYPES:
+            self.vector_index = load_index(self.config.RETRIEVER, store_path, embeddings, self.config)
+            if self.vector_index is None:
+                self.vector_index = build_index(self.config.RETRIEVER, embeddings, self.config)
+                save_index(self.vector_index, store_path, embeddings)
         
         # Write to document store (using policy to skip duplicates)
         self.document_store.write_documents(documents, policy="skip")
@@ -60,35 +159,49 @@ class RAGPipeline:
         return len(documents)
     
     def initialize_llm_generator(self):
-        """Initialize LLM generator based on configuration"""
+        """
+        Initialize LLM generator based on configuration
+        
+        The generator gets the configured timeouts and keep-alive connection
+        pool, and is wrapped to retry transient failures behind a per-provider
+        circuit breaker (see llm_providers.py).
+        """
         llm_config = self.config.get_llm_config()
+        monitor = None
         
         if llm_config["provider"] == "openai":
             # Lazy import to avoid dependency issues on startup
-            from haystack.components.generators.openai import OpenAIGenerator
+            from haystack.components.generators.chat import OpenAIChatGenerator
             os.environ["OPENAI_API_KEY"] = llm_config["api_key"]
-            llm = OpenAIGenerator(model=llm_config["model"])
-            self.llm_generator = llm
+            llm = OpenAIChatGenerator(
+                model=llm_config["model"],
+                api_base_url=llm_config["base_url"] or None,
+                timeout=self.config.LLM_TIMEOUT,
+                max_retries=0,  # retried by ResilientChatGenerator
+                http_client_kwargs={"limits": http_limits(self.config)}
+            )
             
         elif llm_config["provider"] == "ollama":
             # Ollama Generator (requires ollama-haystack integration)
-            try:
-                from haystack_integrations.components.generators.ollama import OllamaChatGenerator
-                self.llm_generator = OllamaChatGenerator(
-                    model=llm_config["model"],
-                    url=llm_config["base_url"]
-                )
-            except ImportError:
+            if not OLLAMA_AVAILABLE:
                 raise ImportError(
                     "Ollama integration not installed. Install with:\n"
                     "pip install ollama-haystack"
                 )
+            from llm_providers import PooledOllamaChatGenerator
+            monitor = ConnectionMonitor()
+            llm = PooledOllamaChatGenerator(
+                model=llm_config["model"],
+                url=llm_config["base_url"],
+                config=self.config,
+                monitor=monitor
+            )
                 
         elif llm_config["provider"] == "huggingface":
             # HuggingFace Generator
             try:
                 from haystack.components.generators.chat import HuggingFaceTGIChatGenerator
-                self.llm_generator = HuggingFaceTGIChatGenerator(
+                llm = HuggingFaceTGIChatGenerator(
                     model=llm_config["model"]
                 )
             except ImportError:
@@ -97,99 +210,670 @@ class RAGPipeline:
                 )
         else:
             raise ValueError(f"Unknown LLM provider: {llm_config['provider']}")
-    
-    def build_pipeline(self):
-        """Build the RAG pipeline"""
-        
-        # Initialize components
         
-        # 1. Query embedder (force CPU to avoid CUDA errors)
+        self.llm_generator = ResilientChatGenerator(llm, llm_config["provider"], self.config, monitor)
+    
+    def warm_up_embedder(self):
+        """Load the query embedding model (otherwise it loads on the first question)"""
+        if self.query_embedder is not None:
+            return
+        # Force CPU to avoid CUDA errors
         from haystack.utils import ComponentDevice
         query_embedder = SentenceTransformersTextEmbedder(
             model=self.config.EMBEDDING_MODEL,
             device=ComponentDevice.from_str("cpu")
         )
+        query_embedder.warm_up()
+        self.query_embedder = query_embedder
+    
+    def warm_up_llm(self) -> Optional[str]:
+        """
+        Create the LLM generator and ask the provider to preload the model
         
-        # 2. Retriever - finds relevant documents
-        retriever = InMemoryEmbeddingRetriever(
-            document_store=self.document_store,
+        Returns:
+            A warning if the provider could not be reached (not fatal - the
+            first question will retry), otherwise None
+        """
+        if self.llm_generator is None:
+            self.initialize_llm_generator()
+        
+        if self.config.LLM_PROVIDER != "ollama":
+            return None
+        # An empty generate request makes Ollama load the model into memory
+        request = urllib.request.Request(
+            f"{self.config.OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+            data=json.dumps({"model": self.config.OLLAMA_MODEL, "prompt": ""}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.config.LLM_WARMUP_TIMEOUT) as response:
+                response.read()
+        except Exception as e:
+            return f"Could not preload {self.config.OLLAMA_MODEL} from {self.config.OLLAMA_BASE_URL}: {e}"
+        return None
+    
+    def _run_warmup_stage(self, stage: str, fn: Callable):
+        """Run one start-up stage, recording its status and duration"""
+        with self._warmup_lock:
+            self.warmup[stage].update(status="loading", error=None)
+        start_time = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            with self._warmup_lock:
+                self.warmup[stage].update(status="failed", seconds=time.perf_counter() - start_time, error=str(e))
+            raise
+        
+        warning = result if stage == "llm" else None
+        with self._warmup_lock:
+            self.warmup[stage].update(
+                status="degraded" if warning else "ready",
+                seconds=time.perf_counter() - start_time,
+                error=warning
+            )
+        return result
+    
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Start-up state for status displays
+        
+        Returns:
+            {"ready": bool, "failed": bool, "stages": {stage: {"status", "seconds", "error"}}}
+            where status is pending, loading, ready, degraded (LLM not reachable
+            yet) or failed
+        """
+        with self._warmup_lock:
+            stages = {stage: dict(state) for stage, state in self.warmup.items()}
+        return {
+            "ready": self.built,
+            "failed": any(state["status"] == "failed" for state in stages.values()),
+            "stages": stages
+        }
+    
+    def share_models(self, other: "RAGPipeline"):
+        """Reuse another pipeline's query embedder and LLM generator instead of loading new ones"""
+        self.query_embedder = other.query_embedder
+        self.llm_generator = other.llm_generator
+        with self._warmup_lock:
+            for stage in ["embedder", "llm"]:
+                self.warmup[stage] = dict(other.warmup[stage], seconds=0.0)
+    
+    def memory_footprint(self) -> int:
+        """Approximate bytes held by the loaded knowledge base (models excluded)"""
+        total = sum(len(doc.content or "") + DOCUMENT_OVERHEAD_BYTES for doc in self.documents)
+        if self.metadata_index is not None:
+            total += self.metadata_index.nbytes
+        if isinstance(self.retriever, MatrixEmbeddingRetriever):
+            # self.embeddings is a view of the retriever's matrix
+            total += self.retriever.nbytes
+        elif self.embeddings is not None:
+            total += self.embeddings.nbytes
+        if self.vector_index is not None:
+            total += self.vector_index.nbytes
+        return total
+    
+    def build_retriever(self):
+        """Create the configured retriever (exact matrix scan, approximate index or Haystack in-memory)"""
+        if self.vector_index is not None:
+            return AnnEmbeddingRetriever(
+                index=self.vector_index,
+                documents=self.documents,
+                top_k=self.config.TOP_K_RETRIEVAL
+            )
+        if self.config.RETRIEVER == "inmemory":
+            return InMemoryEmbeddingRetriever(
+                document_store=self.document_store,
+                top_k=self.config.TOP_K_RETRIEVAL
+            )
+        embeddings = self.embeddings if self.embeddings is not None else np.empty((0, 0), dtype=np.float32)
+        return MatrixEmbeddingRetriever(
+            embeddings=embeddings,
+            documents=self.documents,
             top_k=self.config.TOP_K_RETRIEVAL
         )
+    
+    def add_documents(self, documents: List[Document]) -> int:
+        """
+        Add embedded documents to the loaded knowledge base (in memory only)
         
-        # 3. Prompt Builder - creates the prompt with context
-        template = [
-            ChatMessage.from_user(
-                """You are a helpful assistant that answers questions based on the provided context.
-Use the context below to answer the question. If you cannot answer based on the context, say so.
-
-Context:
-{% for document in documents %}
-{{ document.content }}
----
-{% endfor %}
-
-Question: {{question}}
-
-Answer:"""
+        The exact retrievers are updated in place; approximate indexes are
+        rebuilt by the next ingestion run instead.
+        """
+        if self.vector_index is not None:
+            raise RuntimeError(
+                f"Documents cannot be added to a loaded {self.config.RETRIEVER.upper()} index. "
+                "Run 'python ingest_documents.py' to rebuild it."
             )
-        ]
+        if any(doc.embedding is None for doc in documents):
+            raise ValueError("Documents must be embedded before they are added")
+        
+        self.document_store.write_documents(documents, policy="skip")
+        self.documents.extend(documents)
+        self.metadata_index.add(documents)
+        # Answers cached or in flight before the addition are not reused
+        self.store_version = f"{self.store_version.split('+')[0]}+{len(self.documents)}"
+        embeddings = np.array([doc.embedding for doc in documents], dtype=np.float32)
+        if isinstance(self.retriever, MatrixEmbeddingRetriever):
+            self.retriever.add(embeddings, documents)
+            # The retriever's (normalised) matrix already holds every row
+            self.embeddings = self.retriever.matrix
+        elif self.embeddings is None or not len(self.embeddings):
+            self.embeddings = embeddings
+        else:
+            self.embeddings = np.concatenate([self.embeddings, embeddings])
+        return len(documents)
+    
+    def build_pipeline(self):
+        """Build the RAG pipeline"""
+        
+        # Initialize components
+        
+        # 1. Query embedder (already loaded if initialize() warmed it up)
+        self.warm_up_embedder()
+        query_embedder = self.query_embedder
+        
+        # 2. Retriever - finds relevant documents
+        retriever = self.build_retriever()
+        
+        # 3. Context Packer - fits the retrieved documents into the prompt token budget
+        context_packer = ContextPacker(
+            token_budget=self.config.get_context_token_budget(),
+            template_tokens=template_overhead(PROMPT_TEMPLATE)
+        )
+        
+        # 4. Prompt Builder - creates the prompt with context
+        template = [ChatMessage.from_user(PROMPT_TEMPLATE)]
         prompt_builder = ChatPromptBuilder(template=template)
         
-        # 4. LLM Generator - generates the answer
-        self.initialize_llm_generator()
+        # 5. LLM Generator - generates the answer
+        if self.llm_generator is None:
+            self.initialize_llm_generator()
         
-        # Build pipeline
-        pipeline = Pipeline()
+        # Keep direct references so query() can run the stages one by one
+        self.query_embedder = query_embedder
+        self.retriever = retriever
+        self.context_packer = context_packer
+        self.prompt_builder = prompt_builder
         
-        # Add components
-        pipeline.add_component("text_embedder", query_embedder)
-        pipeline.add_component("retriever", retriever)
-        pipeline.add_component("prompt_builder", prompt_builder)
-        pipeline.add_component("llm", self.llm_generator)
+        self.built = True
+    
+    def search(self, queries: np.ndarray, k: int, filters: Optional[Filters] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k document rows and cosine scores for a batch of query embeddings
         
-        # Connect components
-        pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
-        pipeline.connect("retriever.documents", "prompt_builder.documents")
-        pipeline.connect("prompt_builder.prompt", "llm.messages")
+        With filters, the metadata index selects the candidate rows first. The
+        exact retriever and narrow filters score only those rows; broad filters
+        on an approximate index over-fetch from it and drop the other rows.
+        """
+        if not filters:
+            if hasattr(self.retriever, "search"):
+                return self.retriever.search(queries, k)
+            return exact_search(self.embeddings, queries, k)
         
-        self.pipeline = pipeline
+        rows = self.metadata_index.rows(filters)
+        if isinstance(self.retriever, MatrixEmbeddingRetriever):
+            return self.retriever.search(queries, k, rows=rows)
+        if hasattr(self.retriever, "search") and len(rows) >= BROAD_FILTER_FRACTION * len(self.documents):
+            return self.filtered_index_search(queries, k, rows)
+        # Approximate indexes can't be restricted to a subset; scan a narrow subset exactly
+        labels, scores = exact_search(self.embeddings[rows], queries, k)
+        return rows[labels], scores
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def filtered_index_search(self, queries: np.ndarray, k: int,
+                              rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Query the RAG pipeline
+        Search the approximate index past k and keep the hits inside rows
         
-        Args:
-            question: User question
-            
-        Returns:
-            Dictionary with answer and metadata
+        The over-fetch is scaled by how many rows the filter drops; queries
+        still short of k hits are answered by scanning the subset exactly.
         """
-        if not self.pipeline:
+        queries = np.atleast_2d(queries)
+        k = min(k, len(rows))
+        fetch = min(len(self.documents), int(np.ceil(k * ANN_OVERFETCH * len(self.documents) / max(len(rows), 1))))
+        found, found_scores = self.retriever.search(queries, fetch)
+        
+        labels = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        short = []
+        for i in range(len(queries)):
+            keep = np.flatnonzero((found[i] >= 0) & np.isin(found[i], rows))[:k]
+            if len(keep) < k:
+                short.append(i)
+                continue
+            labels[i], scores[i] = found[i, keep], found_scores[i, keep]
+        if short:
+            subset_labels, subset_scores = exact_search(self.embeddings[rows], queries[short], k)
+            labels[short], scores[short] = rows[subset_labels], subset_scores
+        return labels, scores
+    
+    def documents_for(self, labels: np.ndarray, scores: np.ndarray) -> List[Document]:
+        """Documents for one row of search results (-1 labels are skipped)"""
+        documents = []
+        for label, score in zip(labels, scores):
+            if label < 0:
+                continue
+            doc = self.documents[label]
+            documents.append(Document(id=doc.id, content=doc.content, meta=doc.meta, score=float(score)))
+        return documents
+    
+    def retrieve(self, question: str, filters: Optional[Filters] = None,
+                 metrics: Optional[QueryMetrics] = None) -> Tuple[List[float], List[Document]]:
+        """Embed a question and retrieve its context documents (optionally filtered by metadata)"""
+        if not self.built:
             raise RuntimeError("Pipeline not built. Call build_pipeline() first.")
+        metrics = metrics or self.new_metrics()
         
-        # Run pipeline
-        result = self.pipeline.run({
-            "text_embedder": {"text": question},
-            "prompt_builder": {"question": question}
-        })
+        with metrics.stage("embed"):
+            embedding = self.query_embedder.run(text=question)["embedding"]
+        
+        with metrics.stage("retrieve") as span:
+            span.set_attributes({"retriever": self.config.RETRIEVER, "top_k": self.config.TOP_K_RETRIEVAL})
+            if not filters:
+                return embedding, self.retriever.run(query_embedding=embedding)["documents"]
+            labels, scores = self.search(np.asarray([embedding], dtype=np.float32), self.config.TOP_K_RETRIEVAL, filters)
+            return embedding, self.documents_for(labels[0], scores[0])
+    
+    def embed_many(self, questions: List[str]) -> np.ndarray:
+        """Embed many questions in one batched model call"""
+        if self.batch_embedder is None:
+            # Same model and device as the query embedder (the loaded model is shared)
+            from haystack.utils import ComponentDevice
+            self.batch_embedder = SentenceTransformersDocumentEmbedder(
+                model=self.config.EMBEDDING_MODEL,
+                device=ComponentDevice.from_str("cpu"),
+                batch_size=self.config.EMBED_BATCH_SIZE,
+                progress_bar=False
+            )
+            self.batch_embedder.warm_up()
+        
+        documents = [Document(content=question) for question in questions]
+        embedded = self.batch_embedder.run(documents=documents)["documents"]
+        return np.array([doc.embedding for doc in embedded], dtype=np.float32)
+    
+    def retrieve_many(self, questions: List[str], filters: Optional[Filters] = None,
+                      metrics: Optional[QueryMetrics] = None) -> Tuple[np.ndarray, List[List[Document]]]:
+        """
+        Embed and retrieve for a batch of questions
+        
+        Retrieval is one matrix multiply over the embedding matrix (or one
+        batched index search for HNSW/IVF). Scores are cosine similarities.
+        The metrics receive the timings of the whole batch.
+        """
+        if not self.built:
+            raise RuntimeError("Pipeline not built. Call build_pipeline() first.")
+        metrics = metrics or self.new_metrics()
+        
+        with metrics.stage("embed"):
+            embeddings = self.embed_many(questions)
+        with metrics.stage("retrieve") as span:
+            span.set_attributes({"retriever": self.config.RETRIEVER, "top_k": self.config.TOP_K_RETRIEVAL})
+            labels, scores = self.search(embeddings, self.config.TOP_K_RETRIEVAL, filters)
+            batch_docs = [self.documents_for(row_labels, row_scores) for row_labels, row_scores in zip(labels, scores)]
+        return embeddings, batch_docs
+    
+    @staticmethod
+    def reply_text(reply: ChatMessage, metrics: QueryMetrics) -> str:
+        """Text of an LLM reply; records its completion tokens (reported usage, else estimated)"""
+        usage = (reply.meta or {}).get("usage") or {}
+        metrics.completion_tokens = usage.get("completion_tokens") or count_tokens(reply.text or "")
+        return reply.text
+    
+    def generate(self, question: str, documents: List[Document],
+                 streaming_callback: Optional[Callable[[str], None]] = None,
+                 metrics: Optional[QueryMetrics] = None) -> str:
+        """Build the prompt and call the LLM, optionally streaming tokens"""
+        metrics = metrics or self.new_metrics()
+        with metrics.stage("prompt"):
+            prompt = self.prompt_builder.run(documents=documents, question=question)["prompt"]
         
-        # Extract answer
-        answer = result["llm"]["replies"][0].text
+        with metrics.stage("generate") as span:
+            span.set_attribute("llm.provider", self.config.LLM_PROVIDER)
+            if streaming_callback is None:
+                reply = self.llm_generator.run(messages=prompt)["replies"][0]
+                return self.reply_text(reply, metrics)
+            
+            if self.config.LLM_PROVIDER in STREAMING_PROVIDERS:
+                def on_chunk(chunk):
+                    if chunk.content:
+                        metrics.mark_first_token()
+                        streaming_callback(chunk.content)
+                
+                reply = self.llm_generator.run(messages=prompt, streaming_callback=on_chunk)["replies"][0]
+                return self.reply_text(reply, metrics)
+            
+            # Provider cannot stream - deliver the whole answer as one chunk
+            answer = self.reply_text(self.llm_generator.run(messages=prompt)["replies"][0], metrics)
+            metrics.mark_first_token()
+            streaming_callback(answer)
+            return answer
+    
+    async def agenerate(self, question: str, documents: List[Document],
+                        metrics: Optional[QueryMetrics] = None) -> str:
+        """Build the prompt and await the LLM (async client when the generator has one)"""
+        metrics = metrics or self.new_metrics()
+        with metrics.stage("prompt"):
+            prompt = self.prompt_builder.run(documents=documents, question=question)["prompt"]
         
-        # Extract retrieved documents
-        retrieved_docs = result.get("retriever", {}).get("documents", [])
+        with metrics.stage("generate") as span:
+            span.set_attribute("llm.provider", self.config.LLM_PROVIDER)
+            run_async = getattr(self.llm_generator, "run_async", None)
+            if run_async is not None:
+                result = await run_async(messages=prompt)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, lambda: self.llm_generator.run(messages=prompt))
+        return self.reply_text(result["replies"][0], metrics)
+    
+    @staticmethod
+    def build_result(question: str, answer: str, retrieved_docs: List[Document], cached: bool,
+                     metrics: Optional[QueryMetrics] = None) -> Dict[str, Any]:
+        """
+        Result dictionary returned by the query methods
         
+        "timings" holds the seconds spent embedding the question, retrieving,
+        building the prompt and generating, the total and (when streamed) the
+        time to the first token. Token counts are None when no prompt was sent.
+        """
         return {
             "question": question,
             "answer": answer,
             "retrieved_documents": retrieved_docs,
-            "num_documents": len(retrieved_docs)
+            "num_documents": len(retrieved_docs),
+            "cached": cached,
+            "prompt_tokens": metrics.prompt_tokens if metrics else None,
+            "completion_tokens": metrics.completion_tokens if metrics else None,
+            "timings": metrics.as_dict() if metrics else {}
+        }
+    
+    def new_metrics(self) -> QueryMetrics:
+        return QueryMetrics(collection=self.config.COLLECTION)
+    
+    def record_metrics(self, result: Dict[str, Any], error: Optional[Exception] = None):
+        """Report a finished question to the metrics sinks and annotate its trace span"""
+        tracing.current_span().set_attributes({
+            "cached": result["cached"],
+            "num_documents": result["num_documents"],
+            "prompt_tokens": result["prompt_tokens"],
+            "completion_tokens": result["completion_tokens"]
+        })
+        record = {
+            "collection": self.config.COLLECTION,
+            "cached": result["cached"],
+            "coalesced": result.get("coalesced", False),
+            "num_documents": result["num_documents"],
+            "prompt_tokens": result["prompt_tokens"],
+            "completion_tokens": result["completion_tokens"],
+            "timings": result["timings"]
         }
+        if error is not None:
+            record["error"] = type(error).__name__
+        for sink in self.metrics_sinks:
+            try:
+                sink.record(record)
+            except Exception:
+                pass  # Metrics must never fail a question
+    
+    def cached_answer(self, embedding: List[float], retrieved_docs: List[Document]) -> Optional[str]:
+        """Answer to a near-identical question over the same documents, if cached"""
+        if self.answer_cache is None:
+            return None
+        self.answer_cache.check_version(self.store_version)
+        cached = self.answer_cache.lookup(embedding, [doc.id for doc in retrieved_docs])
+        return cached.answer if cached is not None else None
+    
+    def cache_answer(self, question: str, embedding: List[float], retrieved_docs: List[Document], answer: str):
+        """Remember an answer for similar future questions"""
+        if self.answer_cache is not None:
+            self.answer_cache.store(question, embedding, [doc.id for doc in retrieved_docs], answer)
+    
+    def answer(self, question: str, embedding: List[float], retrieved_docs: List[Document],
+               streaming_callback: Optional[Callable[[str], None]] = None,
+               metrics: Optional[QueryMetrics] = None) -> Dict[str, Any]:
+        """Answer a question from already retrieved documents (answer cache, then LLM)"""
+        metrics = metrics or self.new_metrics()
+        cached = self.cached_answer(embedding, retrieved_docs)
+        if cached is not None:
+            if streaming_callback is not None:
+                metrics.mark_first_token()
+                streaming_callback(cached)
+            result = self.build_result(question, cached, retrieved_docs, cached=True, metrics=metrics)
+            self.record_metrics(result)
+            return result
+        
+        try:
+            with metrics.stage("prompt", span_name="rag.pack_context"):
+                context_docs, metrics.prompt_tokens = self.context_packer.pack(retrieved_docs, question)
+            answer = self.generate(question, context_docs, streaming_callback, metrics)
+        except Exception as e:
+            self.record_metrics(self.build_result(question, None, retrieved_docs, cached=False, metrics=metrics), e)
+            raise
+        self.cache_answer(question, embedding, retrieved_docs, answer)
+        result = self.build_result(question, answer, retrieved_docs, cached=False, metrics=metrics)
+        self.record_metrics(result)
+        return result
+    
+    def query(self, question: str, streaming_callback: Optional[Callable[[str], None]] = None,
+              filters: Optional[Filters] = None) -> Dict[str, Any]:
+        """
+        Query the RAG pipeline
+        
+        The stages are run one by one so the answer cache can sit between
+        retrieval and the LLM call.
+        Concurrent identical questions (ignoring case and whitespace) against
+        the same store version share one run unless a streaming_callback is given.
+        
+        Args:
+            question: User question
+            streaming_callback: Called with each piece of the answer as it is generated
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            
+        Returns:
+            Dictionary with answer and metadata
+        """
+        ran = False  # whether this call ran the question rather than waiting on an identical one
+        
+        def run():
+            nonlocal ran
+            ran = True
+            metrics = self.new_metrics()
+            try:
+                embedding, retrieved_docs = self.retrieve(question, filters, metrics)
+            except Exception as e:
+                self.record_metrics(self.build_result(question, None, [], cached=False, metrics=metrics), e)
+                raise
+            return self.answer(question, embedding, retrieved_docs, streaming_callback, metrics)
+        
+        with tracing.span("rag.query", collection=self.config.COLLECTION, filtered=bool(filters)) as span:
+            if self.coalescer is None or streaming_callback is not None:
+                return run()
+            
+            key = (
+                normalize_question(question),
+                self.store_version,
+                json.dumps(filters or {}, sort_keys=True)
+            )
+            start = time.perf_counter()
+            try:
+                result, shared = self.coalescer.run(key, run)
+            except Exception as e:
+                if not ran:
+                    # The identical question this call waited on failed
+                    failed = self.build_result(question, None, [], cached=False)
+                    self.record_metrics({**failed, "timings": {"total": round(time.perf_counter() - start, 6)}}, e)
+                raise
+            span.set_attribute("coalesced", shared)
+            result = {**result, "question": question, "coalesced": shared}
+            if shared:
+                # The leader recorded its stages and tokens; count this question's wait
+                self.record_metrics({**result, "prompt_tokens": None, "completion_tokens": None,
+                                     "timings": {"total": round(time.perf_counter() - start, 6)}})
+            return result
+    
+    def query_many(self, questions: List[str], concurrency: int = 4,
+                   filters: Optional[Filters] = None) -> List[Dict[str, Any]]:
+        """
+        Answer many questions
+        
+        All questions are embedded in one batched call and retrieved with one
+        matrix multiply; LLM calls then run on up to `concurrency` threads.
+        
+        Args:
+            questions: User questions
+            concurrency: Maximum number of LLM calls in flight
+            filters: Optional metadata filters applied to every question
+            
+        Returns:
+            One result per question, in order. A failed question has
+            answer None and an "error" message instead of raising.
+        """
+        if not questions:
+            return []
+        
+        with tracing.span("rag.query_many", collection=self.config.COLLECTION, questions=len(questions),
+                          concurrency=concurrency, filtered=bool(filters)):
+            batch_metrics = self.new_metrics()
+            embeddings, batch_docs = self.retrieve_many(questions, filters, batch_metrics)
+            
+            def answer_one(i: int) -> Dict[str, Any]:
+                # Every question waited for the whole batched embed/retrieve
+                metrics = self.new_metrics()
+                metrics.started = batch_metrics.started
+                metrics.timings = dict(batch_metrics.timings)
+                with tracing.span("rag.query", collection=self.config.COLLECTION, batch_index=i) as span:
+                    try:
+                        return self.answer(questions[i], embeddings[i], batch_docs[i], metrics=metrics)
+                    except Exception as e:
+                        span.record_error(e)
+                        result = self.build_result(questions[i], None, batch_docs[i], cached=False, metrics=metrics)
+                        result["error"] = str(e)
+                        return result
+            
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                futures = [executor.submit(tracing.in_current_context(answer_one), i) for i in range(len(questions))]
+                return [future.result() for future in futures]
+    
+    async def aquery(self, question: str, filters: Optional[Filters] = None) -> Dict[str, Any]:
+        """
+        Query the RAG pipeline without blocking the event loop
+
+        Embedding and retrieval are CPU-bound and run in the default executor;
+        the LLM call is awaited, so many questions can be in flight at once.
+
+        Args:
+            question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+
+        Returns:
+            Dictionary with answer and metadata (same as query())
+        """
+        with tracing.span("rag.query", collection=self.config.COLLECTION, filtered=bool(filters)):
+            loop = asyncio.get_running_loop()
+            metrics = self.new_metrics()
+            embedding, retrieved_docs = await loop.run_in_executor(
+                None, tracing.in_current_context(self.retrieve), question, filters, metrics
+            )
+
+            cached = self.cached_answer(embedding, retrieved_docs)
+            if cached is not None:
+                result = self.build_result(question, cached, retrieved_docs, cached=True, metrics=metrics)
+                self.record_metrics(result)
+                return result
+
+            try:
+                with metrics.stage("prompt", span_name="rag.pack_context"):
+                    context_docs, metrics.prompt_tokens = self.context_packer.pack(retrieved_docs, question)
+                answer = await self.agenerate(question, context_docs, metrics)
+            except Exception as e:
+                self.record_metrics(self.build_result(question, None, retrieved_docs, cached=False, metrics=metrics), e)
+                raise
+            self.cache_answer(question, embedding, retrieved_docs, answer)
+            result = self.build_result(question, answer, retrieved_docs, cached=False, metrics=metrics)
+            self.record_metrics(result)
+            return result
+
+    def stream_query(self, question: str, filters: Optional[Filters] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Query the RAG pipeline, yielding events as the answer is generated
+        
+        Yields, in order:
+            {"type": "documents", "documents": [...]} - as soon as retrieval finishes
+            {"type": "token", "text": "..."}         - for each piece of the answer
+            {"type": "done", **result}                - the same dictionary query() returns
+        """
+        # The span is only made current while pipeline code runs, never across a yield
+        span = tracing.start_span("rag.query", collection=self.config.COLLECTION, filtered=bool(filters), streamed=True)
+        try:
+            metrics = self.new_metrics()
+            with tracing.use_span(span):
+                embedding, retrieved_docs = self.retrieve(question, filters, metrics)
+            yield {"type": "documents", "documents": retrieved_docs}
+            
+            # The generator blocks until the reply is complete, so run it in a
+            # thread and hand tokens back through a queue
+            tokens = queue.Queue()
+            outcome = {}
+            
+            def worker():
+                try:
+                    with tracing.use_span(span):
+                        outcome["result"] = self.answer(question, embedding, retrieved_docs, tokens.put, metrics)
+                except Exception as e:
+                    outcome["error"] = e
+                finally:
+                    tokens.put(_STREAM_END)
+            
+            thread = threading.Thread(target=worker, daemon=True)
+            thread.start()
+            while True:
+                token = tokens.get()
+                if token is _STREAM_END:
+                    break
+                yield {"type": "token", "text": token}
+            thread.join()
+            
+            if "error" in outcome:
+                raise outcome["error"]
+            yield {"type": "done", **outcome["result"]}
+        finally:
+            tracing.end_span(span)
+    
+    def llm_stats(self) -> Optional[Dict[str, Any]]:
+        """LLM call, retry and failure counts, circuit breaker state and connection reuse"""
+        stats = getattr(self.llm_generator, "stats", None)
+        return stats() if stats is not None else None
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Answer cache hit/miss statistics (None when the cache is disabled)"""
+        return self.answer_cache.stats() if self.answer_cache is not None else None
     
     def initialize(self):
-        """Initialize the complete RAG system"""
-        # Load document store
-        num_docs = self.load_document_store()
+        """
+        Initialize the complete RAG system
+        
+        The document store, the query embedding model and the LLM are loaded
+        concurrently; progress is available from readiness() meanwhile.
+        """
+        # A missing store (e.g. a mistyped collection) fails at once, not after the models load
+        try:
+            self.existing_store_path()
+        except FileNotFoundError as e:
+            with self._warmup_lock:
+                self.warmup["store"].update(status="failed", error=str(e))
+            raise
+        
+        stages = {
+            "store": self.load_document_store,
+            "embedder": self.warm_up_embedder,
+            "llm": self.warm_up_llm
+        }
+        with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="warmup") as executor:
+            futures = {stage: executor.submit(self._run_warmup_stage, stage, fn) for stage, fn in stages.items()}
+        
+        # Re-raise the first failure (in stage order)
+        num_docs = futures["store"].result()
+        futures["embedder"].result()
+        futures["llm"].result()
         
         # Build pipeline
         self.build_pipeline()
@@ -197,59 +881,271 @@ Answer:"""
         return num_docs
 
 
+class KnowledgeBaseManager:
+    """
+    Named knowledge base collections, loaded on first use
+    
+    Every collection has its own document store and index but they share one
+    query embedder and LLM generator. When the loaded collections' estimated
+    memory exceeds the limit, the least recently used ones are unloaded
+    (queries already running on them still finish).
+    """
+    
+    def __init__(self, memory_limit_mb: Optional[int] = None):
+        limit = Config.COLLECTION_MEMORY_LIMIT_MB if memory_limit_mb is None else memory_limit_mb
+        self.memory_limit = limit * 1024 * 1024
+        self._loaded: "OrderedDict[str, RAGPipeline]" = OrderedDict()  # least recently used first
+        self._pending: Dict[str, RAGPipeline] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+    
+    def names(self) -> List[str]:
+        """Collections available on disk"""
+        return Config.list_collections()
+    
+    def is_loaded(self, name: Optional[str] = None) -> bool:
+        return (name or Config.DEFAULT_COLLECTION) in self._loaded
+    
+    def pipeline(self, name: Optional[str] = None) -> RAGPipeline:
+        """A collection's pipeline without loading it (e.g. to watch its readiness)"""
+        name = name or Config.DEFAULT_COLLECTION
+        with self._lock:
+            rag = self._loaded.get(name) or self._pending.get(name)
+            if rag is None:
+                rag = self._pending[name] = RAGPipeline(Config.for_collection(name))
+            return rag
+    
+    def get(self, name: Optional[str] = None) -> RAGPipeline:
+        """
+        A collection's loaded pipeline, loading it on first use
+        
+        Args:
+            name: Collection name (default: Config.DEFAULT_COLLECTION)
+            
+        Returns:
+            The collection's RAGPipeline
+        """
+        name = name or Config.DEFAULT_COLLECTION
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        
+        # One loader per collection; other collections stay usable meanwhile
+        with load_lock:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    return self._loaded[name]
+                shared = next(reversed(self._loaded.values()), None)
+            
+            rag = self.pipeline(name)
+            if shared is None:
+                rag.initialize()
+            else:
+                rag.share_models(shared)
+                rag._run_warmup_stage("store", rag.load_document_store)
+                rag.build_pipeline()
+            
+            with self._lock:
+                self._pending.pop(name, None)
+                self._loaded[name] = rag
+                self.loads += 1
+                self._evict(keep=name)
+            return rag
+    
+    def _evict(self, keep: str):
+        """Unload least recently used collections until under the memory limit"""
+        if not self.memory_limit:
+            return
+        footprints = {name: rag.memory_footprint() for name, rag in self._loaded.items()}
+        total = sum(footprints.values())
+        for name in list(self._loaded):
+            if total <= self.memory_limit:
+                break
+            if name == keep:
+                continue
+            del self._loaded[name]
+            total -= footprints[name]
+            self.evictions += 1
+    
+    def evict(self, name: str) -> bool:
+        """Unload a collection (e.g. after re-ingesting it); the next question reloads it"""
+        with self._lock:
+            self._pending.pop(name, None)
+            return self._loaded.pop(name, None) is not None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Loaded collections with their estimated memory, plus load/eviction counters"""
+        with self._lock:
+            loaded = {name: rag.memory_footprint() / (1024 * 1024) for name, rag in self._loaded.items()}
+        return {
+            "loaded": {name: round(mb, 1) for name, mb in loaded.items()},
+            "memory_mb": round(sum(loaded.values()), 1),
+            "limit_mb": self.memory_limit // (1024 * 1024) or None,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+
 class SimpleRAGPipeline:
     """
     Simplified RAG Pipeline for direct usage
     This is a convenience wrapper around RAGPipeline
+    
+    Questions go to the selected collection unless another one is passed.
     """
     
-    def __init__(self):
-        self.rag = RAGPipeline()
-        self.initialized = False
+    def __init__(self, collection: Optional[str] = None):
+        self.knowledge_bases = KnowledgeBaseManager()
+        self.collection = Config.for_collection(collection).COLLECTION
+    
+    @property
+    def rag(self) -> RAGPipeline:
+        """Pipeline of the selected collection"""
+        return self.knowledge_bases.pipeline(self.collection)
+    
+    @property
+    def initialized(self) -> bool:
+        return self.knowledge_bases.is_loaded(self.collection)
+    
+    def select_collection(self, name: str):
+        """Send questions to another collection (loaded on its first question)"""
+        self.collection = Config.for_collection(name).COLLECTION
+    
+    def collection_pipeline(self, collection: Optional[str] = None) -> RAGPipeline:
+        """Loaded pipeline of a collection (default: the selected one)"""
+        return self.knowledge_bases.get(collection or self.collection)
     
     def initialize(self):
-        """Initialize the RAG system"""
-        if not self.initialized:
-            num_docs = self.rag.initialize()
-            self.initialized = True
-            return num_docs
-        return 0
+        """Initialize the RAG system (loads the selected collection)"""
+        return len(self.collection_pipeline().documents)
+    
+    def initialize_in_background(self, collection: Optional[str] = None) -> threading.Thread:
+        """Load a collection (default: the selected one) in a daemon thread; poll readiness() for progress"""
+        def run():
+            try:
+                self.collection_pipeline(collection)
+            except Exception:
+                pass  # Recorded in readiness()
+        
+        thread = threading.Thread(target=run, daemon=True, name="rag-initialize")
+        thread.start()
+        return thread
     
-    def ask(self, question: str) -> str:
+    def readiness(self, collection: Optional[str] = None) -> Dict[str, Any]:
+        """Start-up state of a collection, default the selected one (see RAGPipeline.readiness)"""
+        return self.knowledge_bases.pipeline(collection or self.collection).readiness()
+    
+    def ask(self, question: str, filters: Optional[Filters] = None, collection: Optional[str] = None) -> str:
         """
         Ask a question and get an answer
         
         Args:
             question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            collection: Knowledge base to search (default: the selected one)
             
         Returns:
             Answer string
         """
-        if not self.initialized:
-            self.initialize()
-        
-        result = self.rag.query(question)
+        result = self.collection_pipeline(collection).query(question, filters=filters)
         return result["answer"]
     
-    def ask_detailed(self, question: str) -> Dict[str, Any]:
+    def ask_detailed(self, question: str, filters: Optional[Filters] = None,
+                     collection: Optional[str] = None) -> Dict[str, Any]:
         """
         Ask a question and get detailed results
         
         Args:
             question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            collection: Knowledge base to search (default: the selected one)
+            
+        Returns:
+            Dictionary with answer and metadata
+        """
+        return self.collection_pipeline(collection).query(question, filters=filters)
+    
+    def ask_many(self, questions: List[str], concurrency: int = 4,
+                 filters: Optional[Filters] = None, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Ask many questions at once
+        
+        Args:
+            questions: User questions
+            concurrency: Maximum number of LLM calls in flight
+            filters: Optional metadata filters applied to every question
+            collection: Knowledge base to search (default: the selected one)
+            
+        Returns:
+            Detailed results in the same order as the questions; failed
+            questions carry an "error" message instead of an answer
+        """
+        return self.collection_pipeline(collection).query_many(questions, concurrency=concurrency, filters=filters)
+    
+    async def aask(self, question: str, filters: Optional[Filters] = None, collection: Optional[str] = None) -> str:
+        """
+        Ask a question and await the answer
+        
+        Args:
+            question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            collection: Knowledge base to search (default: the selected one)
+            
+        Returns:
+            Answer string
+        """
+        result = await self.aask_detailed(question, filters, collection)
+        return result["answer"]
+    
+    async def aask_detailed(self, question: str, filters: Optional[Filters] = None,
+                            collection: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ask a question and await detailed results
+        
+        Args:
+            question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            collection: Knowledge base to search (default: the selected one)
             
         Returns:
             Dictionary with answer and metadata
         """
-        if not self.initialized:
-            self.initialize()
+        rag = await asyncio.get_running_loop().run_in_executor(None, self.collection_pipeline, collection)
+        return await rag.aquery(question, filters)
+    
+    def ask_stream(self, question: str, filters: Optional[Filters] = None,
+                   collection: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Ask a question and stream the answer
         
-        return self.rag.query(question)
+        Args:
+            question: User question
+            filters: Optional metadata filters, e.g. {"file_type": "pdf", "filepath": "*/policies/*"}
+            collection: Knowledge base to search (default: the selected one)
+            
+        Yields:
+            Events from RAGPipeline.stream_query (documents, tokens, done)
+        """
+        yield from self.collection_pipeline(collection).stream_query(question, filters)
 
 
 # Example usage
 if __name__ == "__main__":
+    import argparse
     from rich.console import Console
+    from profiling import profiled
+    
+    parser = argparse.ArgumentParser(description="Answer a few test questions")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile CPU time and allocations of start-up and the questions "
+                             f"(written to {Config.PROFILE_DIR})")
+    args = parser.parse_args()
+    profile = args.profile or Config.PROFILE_ENABLED
     
     console = Console()
     
@@ -259,7 +1155,8 @@ if __name__ == "__main__":
         # Initialize pipeline
         console.print("[cyan]Initializing RAG system...[/cyan]")
         rag = SimpleRAGPipeline()
-        num_docs = rag.initialize()
+        with profiled("initialize", profile, console=console):
+            num_docs = rag.initialize()
         console.print(f"[green]✓ Loaded {num_docs} documents[/green]\n")
         
         # Test questions
@@ -269,10 +1166,15 @@ if __name__ == "__main__":
             "What are embeddings?"
         ]
         
-        for question in test_questions:
-            console.print(f"[yellow]Q: {question}[/yellow]")
+        with profiled("questions", profile, console=console):
+            results = rag.ask_many(test_questions)
+        
+        for result in results:
+            console.print(f"[yellow]Q: {result['question']}[/yellow]")
             
-            result = rag.ask_detailed(question)
+            if result.get("error"):
+                console.print(f"[red]Error: {result['error']}[/red]\n")
+                continue
             
             console.print(f"[green]A: {result['answer']}[/green]")
             console.print(f"[dim]Retrieved {result['num_documents']} documents[/dim]\n")
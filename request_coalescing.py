@@ -0,0 +1,74 @@
+"""
+Request Coalescing
+Lets concurrent identical requests share a single execution
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question"""
+    return " ".join(question.casefold().split())
+
+
+class _InFlight:
+    """A running call that later arrivals can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Single-flight execution keyed by request
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is running block and receive the same result (or
+    exception). Nothing is cached once the call has finished.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _InFlight] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for an identical in-flight call
+
+        Returns:
+            (result, shared) - shared is True when another caller's run was reused
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlight()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict:
+        """Executed vs coalesced call counters"""
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
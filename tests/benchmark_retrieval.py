@@ -0,0 +1,385 @@
+"""
+Retrieval benchmark suite: the retrievers used by RAGPipeline on synthetic corpora
+Corpora are random clustered embeddings, so no models or knowledge base are required
+
+For every corpus size and retriever it reports load time, index build time,
+measured memory, single-query latency (p50/p95/p99), queries per second and
+recall@k against the exact scan, and writes the results to a JSON file that
+a later run can be compared against (--compare) to catch regressions.
+
+Usage:
+    python tests/benchmark_retrieval.py                          # 10k, 100k and 1M vectors
+    python tests/benchmark_retrieval.py --sizes 10000,50000 --retrievers exact,ivf
+    python tests/benchmark_retrieval.py --compare data/benchmarks/retrieval-<time>.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config  # noqa: E402
+from document_store_io import load_embeddings, open_store_writer, read_store_info, store_exists  # noqa: E402
+from rag_pipeline import RAGPipeline  # noqa: E402
+from vector_index import (  # noqa: E402
+    HNSW_AVAILABLE, INDEX_TYPES, build_index, exact_search, index_file, normalize, save_index
+)
+
+console = Console()
+
+RETRIEVERS = ["exact", "ivf", "hnsw", "inmemory"]
+
+# Rows generated and written per block
+BLOCK_ROWS = 50000
+
+
+def corpus_path(work_dir: Path, size: int, dim: int, seed: int) -> Path:
+    return work_dir / f"synthetic-{size}x{dim}-seed{seed}"
+
+
+def generate_corpus(path: Path, size: int, dim: int, clusters: int, spread: float, seed: int):
+    """
+    Write a binary document store of `size` clustered unit vectors
+
+    Vectors are noisy copies of random cluster centres, so approximate
+    indexes see the kind of structure real embeddings have. `spread` is the
+    noise norm relative to the centre's: larger values blur the clusters
+    and make approximate search harder.
+    """
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.normal(size=(clusters, dim)).astype(np.float32))
+    with open_store_writer(path, info={"synthetic": True, "seed": seed, "clusters": clusters, "spread": spread}) as writer:
+        for start in range(0, size, BLOCK_ROWS):
+            rows = min(BLOCK_ROWS, size - start)
+            block = centres[rng.integers(clusters, size=rows)]
+            block = normalize(block + rng.normal(scale=spread / np.sqrt(dim), size=block.shape).astype(np.float32))
+            writer.write_records(
+                {"id": str(start + i), "content": f"synthetic document {start + i}", "embedding": row}
+                for i, row in enumerate(block)
+            )
+
+
+def ensure_corpus(work_dir: Path, size: int, dim: int, clusters: int, spread: float, seed: int) -> Path:
+    """Path of a synthetic corpus, generated on first use and reused afterwards"""
+    path = corpus_path(work_dir, size, dim, seed)
+    if store_exists(path):
+        info = read_store_info(path)
+        if (info.get("count"), info.get("clusters"), info.get("spread")) == (size, clusters, spread):
+            return path
+    shutil.rmtree(path, ignore_errors=True)
+    start = time.perf_counter()
+    with console.status(f"[cyan]Generating {size:,} x {dim} corpus...[/cyan]"):
+        generate_corpus(path, size, dim, clusters, spread, seed)
+    console.print(f"[green]+[/green] Generated {size:,} x {dim} corpus in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def make_queries(matrix: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Stored vectors with a little noise (as in measure_recall), so the exact answer is not always the query's row"""
+    rng = np.random.default_rng(seed + 1)
+    rows = np.sort(rng.choice(len(matrix), min(count, len(matrix)), replace=False))
+    queries = normalize(np.asarray(matrix[rows], dtype=np.float32))
+    return normalize(queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32))
+
+
+def benchmark_config(store: Path, retriever: str, top_k: int):
+    """Config pointing RAGPipeline at a synthetic store"""
+    return type("BenchmarkConfig", (Config,), {
+        "DOCUMENT_STORE_FORMAT": "binary",
+        "DOCUMENT_STORE_DIR": store,
+        "RETRIEVER": retriever,
+        "TOP_K_RETRIEVAL": top_k,
+        "ANSWER_CACHE_ENABLED": False,
+        "COALESCE_QUERIES": False,
+        "METRICS_ENABLED": False
+    })
+
+
+def resident_bytes():
+    """Resident set size of this process, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def measure_memory(store: Path, retriever: str, top_k: int) -> dict:
+    """
+    Memory of building the index and loading the store, in an untimed pass
+
+    tracemalloc sees the Python and numpy allocations (retained once loaded,
+    and the peak over build and load) but not memory-mapped embeddings,
+    whose touched pages show in the resident set growth instead.
+    """
+    config = benchmark_config(store, retriever, top_k)
+    gc.collect()
+    rss_before = resident_bytes()
+    tracemalloc.start()
+    try:
+        if retriever in INDEX_TYPES:
+            matrix = load_embeddings(store)
+            save_index(build_index(retriever, matrix, config), store, matrix)
+            del matrix
+        rag = RAGPipeline(config=config)
+        rag.load_document_store()
+        rag.retriever = rag.build_retriever()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = resident_bytes()
+    memory = {
+        "memory_bytes": retained,
+        "peak_memory_bytes": peak,
+        "rss_growth_bytes": rss_after - rss_before if rss_before is not None else None,
+        # RAGPipeline's own estimate, used to unload collections over COLLECTION_MEMORY_LIMIT_MB
+        "estimated_memory_bytes": rag.memory_footprint()
+    }
+    del rag
+    gc.collect()
+    return memory
+
+
+def run_benchmark(store: Path, retriever: str, queries: np.ndarray, truth: np.ndarray, top_k: int,
+                  warmup: int) -> dict:
+    """Load the store through RAGPipeline with one retriever and time its queries"""
+    config = benchmark_config(store, retriever, top_k)
+
+    # Index build (normally done at ingest time), timed apart from loading
+    build_seconds = None
+    if retriever in INDEX_TYPES:
+        index_file(store, retriever).unlink(missing_ok=True)
+        start = time.perf_counter()
+        matrix = load_embeddings(store)
+        save_index(build_index(retriever, matrix, config), store, matrix)
+        build_seconds = time.perf_counter() - start
+
+    rag = RAGPipeline(config=config)
+    start = time.perf_counter()
+    rag.load_document_store()
+    rag.retriever = rag.build_retriever()
+    load_seconds = time.perf_counter() - start
+
+    # Single queries the way RAGPipeline.retrieve() runs them
+    for query in queries[:warmup]:
+        rag.retriever.run(query_embedding=query.tolist())
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        documents = rag.retriever.run(query_embedding=query.tolist())["documents"]
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(doc.id) for doc in documents} & set(expected.tolist()))
+    latencies = np.array(latencies) * 1000
+
+    # One batched search, as used by query_many() (Haystack's retriever has no batch search)
+    batch_qps = None
+    if hasattr(rag.retriever, "search"):
+        start = time.perf_counter()
+        rag.search(queries, top_k)
+        batch_qps = len(queries) / (time.perf_counter() - start)
+
+    result = {
+        "retriever": retriever,
+        "load_seconds": round(load_seconds, 4),
+        "build_seconds": round(build_seconds, 4) if build_seconds is not None else None,
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 4),
+            "p50": round(float(np.percentile(latencies, 50)), 4),
+            "p95": round(float(np.percentile(latencies, 95)), 4),
+            "p99": round(float(np.percentile(latencies, 99)), 4)
+        },
+        "qps": round(1000 / float(latencies.mean()), 2),
+        "batch_qps": round(batch_qps, 2) if batch_qps is not None else None,
+        "recall_at_k": round(hits / truth.size, 4)
+    }
+    del rag
+    gc.collect()
+    result.update(measure_memory(store, retriever, top_k))
+    return result
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "hnswlib": HNSW_AVAILABLE
+    }
+
+
+def results_table(results: list, top_k: int) -> Table:
+    table = Table(title="Retrieval benchmark")
+    table.add_column("Docs", justify="right")
+    table.add_column("Retriever", style="cyan")
+    table.add_column("Load", justify="right")
+    table.add_column("Build", justify="right")
+    table.add_column("Memory", justify="right")
+    table.add_column("Peak", justify="right")
+    table.add_column("p50 (ms)", justify="right", style="green")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("p99 (ms)", justify="right")
+    table.add_column("Queries/s", justify="right")
+    table.add_column("Batch q/s", justify="right")
+    table.add_column(f"Recall@{top_k}", justify="right")
+    for r in results:
+        table.add_row(
+            f"{r['size']:,}",
+            r["retriever"],
+            f"{r['load_seconds']:.2f}s",
+            f"{r['build_seconds']:.2f}s" if r["build_seconds"] is not None else "-",
+            f"{r['memory_bytes'] / 1024 / 1024:.0f} MB",
+            f"{r['peak_memory_bytes'] / 1024 / 1024:.0f} MB",
+            f"{r['latency_ms']['p50']:.2f}",
+            f"{r['latency_ms']['p95']:.2f}",
+            f"{r['latency_ms']['p99']:.2f}",
+            f"{r['qps']:.0f}",
+            f"{r['batch_qps']:.0f}" if r["batch_qps"] is not None else "-",
+            f"{r['recall_at_k']:.3f}"
+        )
+    return table
+
+
+def compare(results: list, baseline_path: Path, tolerance: float) -> int:
+    """Print changes against a previous results file; returns the number of regressions"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["size"], r["retriever"]): r for r in json.load(f)["results"]}
+
+    table = Table(title=f"Compared with {baseline_path.name}")
+    table.add_column("Docs", justify="right")
+    table.add_column("Retriever", style="cyan")
+    table.add_column("p95", justify="right")
+    table.add_column("Queries/s", justify="right")
+    table.add_column("Recall", justify="right")
+    table.add_column("Load", justify="right")
+
+    def change(new: float, old: float, higher_is_better: bool) -> tuple:
+        ratio = new / old - 1 if old else 0.0
+        worse = (-ratio if higher_is_better else ratio) > tolerance
+        colour = "red" if worse else "green" if (ratio > 0) == higher_is_better and abs(ratio) > tolerance else "dim"
+        return f"[{colour}]{ratio:+.0%}[/{colour}]", worse
+
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["size"], r["retriever"]))
+        if old is None:
+            continue
+        p95, p95_worse = change(r["latency_ms"]["p95"], old["latency_ms"]["p95"], higher_is_better=False)
+        qps, qps_worse = change(r["qps"], old["qps"], higher_is_better=True)
+        load, load_worse = change(r["load_seconds"], old["load_seconds"], higher_is_better=False)
+        # Recall is compared in absolute terms: a 0.02 drop is already significant
+        recall_delta = r["recall_at_k"] - old["recall_at_k"]
+        recall_worse = recall_delta < -0.02
+        recall = f"[{'red' if recall_worse else 'dim'}]{recall_delta:+.3f}[/{'red' if recall_worse else 'dim'}]"
+        regressions += sum([p95_worse, qps_worse, load_worse, recall_worse])
+        table.add_row(f"{r['size']:,}", r["retriever"], p95, qps, recall, load)
+
+    console.print(table)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAGPipeline retrievers on synthetic corpora")
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="Comma-separated corpus sizes (default: 10000,100000,1000000)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (default: 384)")
+    parser.add_argument("--retrievers", default=",".join(RETRIEVERS),
+                        help=f"Comma-separated retrievers (default: {','.join(RETRIEVERS)}; hnsw needs hnswlib)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per run (default: 200)")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed queries before each run (default: 10)")
+    parser.add_argument("--top-k", type=int, default=5, help="Documents per query (default: 5)")
+    parser.add_argument("--clusters", type=int, default=256, help="Clusters in the synthetic corpus (default: 256)")
+    parser.add_argument("--spread", type=float, default=2.0,
+                        help="Noise around the cluster centres; higher is harder for hnsw/ivf (default: 2.0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--inmemory-max", type=int, default=100000,
+                        help="Largest corpus for Haystack's in-memory retriever (default: 100000)")
+    parser.add_argument("--work-dir", default=str(Config.DATA_DIR / "benchmarks" / "corpora"),
+                        help="Where synthetic corpora are generated and reused")
+    parser.add_argument("--output", help="Results file (default: data/benchmarks/retrieval-<time>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    retrievers = [name.strip() for name in args.retrievers.split(",") if name.strip()]
+    unknown = set(retrievers) - set(RETRIEVERS)
+    if unknown:
+        parser.error(f"Unknown retriever(s): {', '.join(sorted(unknown))}")
+    if "hnsw" in retrievers and not HNSW_AVAILABLE:
+        console.print("[yellow]hnswlib is not installed; skipping hnsw (pip install hnswlib)[/yellow]")
+        retrievers.remove("hnsw")
+
+    console.print(f"\n[bold cyan]Retrieval benchmark[/bold cyan] "
+                  f"({args.dim} dims, {args.queries} queries, top-{args.top_k})\n")
+
+    results = []
+    for size in sizes:
+        store = ensure_corpus(Path(args.work_dir), size, args.dim, args.clusters, args.spread, args.seed)
+        matrix = load_embeddings(store)
+        queries = make_queries(matrix, args.queries, args.seed)
+        truth, _ = exact_search(matrix, queries, args.top_k)
+        del matrix
+
+        for retriever in retrievers:
+            if retriever == "inmemory" and size > args.inmemory_max:
+                console.print(f"[dim]Skipping inmemory at {size:,} docs (--inmemory-max {args.inmemory_max:,})[/dim]")
+                continue
+            with console.status(f"[cyan]{retriever} on {size:,} docs...[/cyan]"):
+                result = run_benchmark(store, retriever, queries, truth, args.top_k, args.warmup)
+            results.append({"size": size, "dim": args.dim, **result})
+            console.print(
+                f"[green]+[/green] {retriever} on {size:,} docs: p50 {result['latency_ms']['p50']:.2f} ms, "
+                f"recall@{args.top_k} {result['recall_at_k']:.3f}"
+            )
+
+    console.print()
+    console.print(results_table(results, args.top_k))
+
+    output = Path(args.output) if args.output else (
+        Config.DATA_DIR / "benchmarks" / f"retrieval-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "environment": environment(),
+            "parameters": {
+                "dim": args.dim,
+                "queries": args.queries,
+                "top_k": args.top_k,
+                "clusters": args.clusters,
+                "spread": args.spread,
+                "seed": args.seed,
+                "hnsw": {"m": Config.HNSW_M, "ef_construction": Config.HNSW_EF_CONSTRUCTION,
+                         "ef_search": Config.HNSW_EF_SEARCH},
+                "ivf": {"nlist": Config.IVF_NLIST, "nprobe": Config.IVF_NPROBE}
+            },
+            "results": results
+        }, f, indent=2)
+    console.print(f"\n[dim]Results written to {output}[/dim]\n")
+
+    if args.compare:
+        regressions = compare(results, Path(args.compare), args.tolerance)
+        if regressions:
+            console.print(f"\n[bold red]{regressions} regression(s) beyond {args.tolerance:.0%}[/bold red]\n")
+            sys.exit(1)
+        console.print("\n[bold green]No regressions[/bold green]\n")
+
+
+if __name__ == "__main__":
+    main()
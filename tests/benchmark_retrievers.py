@@ -0,0 +1,95 @@
+"""
+Benchmark exact retrievers: MatrixEmbeddingRetriever vs Haystack's InMemoryEmbeddingRetriever
+Uses a synthetic corpus, so no models or knowledge base are required
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from haystack import Document
+from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from vector_index import MatrixEmbeddingRetriever, normalize  # noqa: E402
+
+console = Console()
+
+
+def time_queries(retriever, queries, top_k):
+    """Run every query once; return per-query latencies in ms and the retrieved ids"""
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        documents = retriever.run(query_embedding=query.tolist(), top_k=top_k)["documents"]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.id for doc in documents])
+    return np.array(latencies), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact retrieval")
+    parser.add_argument("--docs", type=int, default=20000, help="Corpus size (default: 20000)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (default: 384)")
+    parser.add_argument("--queries", type=int, default=50, help="Number of queries (default: 50)")
+    parser.add_argument("--top-k", type=int, default=5, help="Documents per query (default: 5)")
+    args = parser.parse_args()
+
+    console.print(f"\n[bold cyan]Exact retrieval benchmark[/bold cyan] "
+                  f"({args.docs} docs x {args.dim} dims, {args.queries} queries)\n")
+
+    rng = np.random.default_rng(0)
+    embeddings = normalize(rng.normal(size=(args.docs, args.dim)).astype(np.float32))
+    queries = normalize(rng.normal(size=(args.queries, args.dim)).astype(np.float32))
+    documents = [Document(id=str(i), content=f"document {i}") for i in range(args.docs)]
+
+    # Haystack retriever: documents carry their own embedding lists
+    start = time.perf_counter()
+    store = InMemoryDocumentStore()
+    store.write_documents([
+        Document(id=doc.id, content=doc.content, embedding=embeddings[i].tolist())
+        for i, doc in enumerate(documents)
+    ])
+    inmemory = InMemoryEmbeddingRetriever(document_store=store, top_k=args.top_k)
+    inmemory_setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = MatrixEmbeddingRetriever(embeddings=embeddings, documents=documents, top_k=args.top_k)
+    matrix_setup = time.perf_counter() - start
+
+    inmemory_ms, inmemory_ids = time_queries(inmemory, queries, args.top_k)
+    matrix_ms, matrix_ids = time_queries(matrix, queries, args.top_k)
+
+    agreement = np.mean([set(a) == set(b) for a, b in zip(inmemory_ids, matrix_ids)])
+
+    table = Table(title="Query latency")
+    table.add_column("Retriever", style="cyan")
+    table.add_column("Setup", justify="right")
+    table.add_column("p50 (ms)", justify="right", style="green")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("Queries/s", justify="right")
+    for name, setup, latencies in [
+        ("InMemoryEmbeddingRetriever", inmemory_setup, inmemory_ms),
+        ("MatrixEmbeddingRetriever", matrix_setup, matrix_ms),
+    ]:
+        table.add_row(
+            name,
+            f"{setup:.2f}s",
+            f"{np.percentile(latencies, 50):.2f}",
+            f"{np.percentile(latencies, 95):.2f}",
+            f"{1000 / latencies.mean():.0f}"
+        )
+    console.print(table)
+
+    speedup = np.median(inmemory_ms) / np.median(matrix_ms)
+    console.print(f"\n[bold green]Speedup (p50): {speedup:.1f}x[/bold green]")
+    console.print(f"[dim]Same top-{args.top_k} ids for {agreement:.0%} of queries[/dim]\n")
+
+
+if __name__ == "__main__":
+    main()
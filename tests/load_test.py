@@ -0,0 +1,334 @@
+"""
+Offline end-to-end load test: SimpleRAGPipeline against the mock LLM server
+Retrieval runs for real on the ingested knowledge base; the LLM is the mock server of
+tests/mock_llm_server.py, so no API credits or GPU are used
+
+Each concurrency level keeps that many questions in flight (closed loop) for a number
+of requests or seconds, and reports throughput, latency percentiles, time to first
+token (streamed questions) and error rates. Results are also written as JSON.
+
+Usage:
+    python tests/load_test.py --concurrency 1,4,16 --requests 200
+    python tests/load_test.py --provider openai --latency 0.8 --token-rate 30 --error-rate 0.05
+    python tests/load_test.py --questions my_questions.txt --stream-ratio 1 --duration 60 --answer-cache
+    python tests/load_test.py --url http://127.0.0.1:11435   # an already running mock server
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config  # noqa: E402
+from mock_llm_server import MockLLMServer  # noqa: E402
+from rag_pipeline import SimpleRAGPipeline  # noqa: E402
+
+console = Console()
+
+DEFAULT_QUESTIONS = [
+    "What is RAG?",
+    "How does Haystack work?",
+    "What are the main topics in the knowledge base?",
+    "Summarize the most important points of the documents.",
+    "Which documents mention security?",
+    "How do I add new documents?",
+    "What file formats are supported?",
+    "Explain the architecture in simple terms."
+]
+
+PERCENTILES = [50, 90, 95, 99]
+
+# Config attributes changed by point_config_at() and put back by restore_config()
+CONFIG_OVERRIDES = ["LLM_PROVIDER", "OLLAMA_BASE_URL", "OPENAI_BASE_URL", "OPENAI_API_KEY",
+                    "ANSWER_CACHE_ENABLED", "COALESCE_QUERIES"]
+
+
+def load_questions(path: Optional[str]) -> List[str]:
+    """
+    Questions to sample from, one per line (blank lines and # comments skipped)
+
+    A question listed several times is asked proportionally more often.
+    """
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path, "r", encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    if not questions:
+        raise ValueError(f"No questions in {path}")
+    return questions
+
+
+def point_config_at(provider: str, url: str, answer_cache: bool) -> Dict[str, Any]:
+    """
+    Send every pipeline's LLM calls to the mock server (collections inherit from Config)
+
+    Returns the previous settings for restore_config().
+    """
+    saved = {name: getattr(Config, name) for name in CONFIG_OVERRIDES}
+    # The OpenAI generator exports its key to the environment
+    saved["environ"] = os.environ.get("OPENAI_API_KEY")
+    Config.LLM_PROVIDER = provider
+    if provider == "ollama":
+        Config.OLLAMA_BASE_URL = url
+    else:
+        Config.OPENAI_BASE_URL = f"{url.rstrip('/')}/v1"
+        Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "mock"
+    if not answer_cache:
+        Config.ANSWER_CACHE_ENABLED = False
+        Config.COALESCE_QUERIES = False
+    return saved
+
+
+def restore_config(saved: Dict[str, Any]):
+    """Undo point_config_at()"""
+    environ = saved.pop("environ")
+    for name, value in saved.items():
+        setattr(Config, name, value)
+    if environ is None:
+        os.environ.pop("OPENAI_API_KEY", None)
+    else:
+        os.environ["OPENAI_API_KEY"] = environ
+
+
+def ask(rag: SimpleRAGPipeline, question: str, stream: bool) -> Dict[str, Any]:
+    """Ask one question; returns its latency, time to first token, tokens and error (if any)"""
+    start = time.perf_counter()
+    record = {"stream": stream, "latency": None, "first_token": None, "tokens": None, "cached": False, "error": None}
+    try:
+        if stream:
+            for event in rag.ask_stream(question):
+                if event["type"] == "token" and record["first_token"] is None:
+                    record["first_token"] = time.perf_counter() - start
+                elif event["type"] == "done":
+                    record["cached"] = event.get("cached", False)
+                    record["tokens"] = event.get("completion_tokens")
+        else:
+            result = rag.ask_detailed(question)
+            record["cached"] = result.get("cached", False)
+            record["tokens"] = result.get("completion_tokens")
+    except Exception as e:
+        record["error"] = type(e).__name__
+    record["latency"] = time.perf_counter() - start
+    return record
+
+
+def run_level(rag: SimpleRAGPipeline, questions: List[str], concurrency: int, requests: int,
+              duration: Optional[float], stream_ratio: float, seed: int) -> Dict[str, Any]:
+    """Keep `concurrency` questions in flight until `requests` were asked or `duration` seconds passed"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    records: List[Dict[str, Any]] = []
+    issued = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def next_request():
+        nonlocal issued
+        with lock:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return None
+            elif issued >= requests:
+                return None
+            issued += 1
+            return rng.choice(questions), rng.random() < stream_ratio
+
+    def worker():
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            record = ask(rag, *request)
+            with lock:
+                records.append(record)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(concurrency, records, time.perf_counter() - start)
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    """Milliseconds at PERCENTILES plus the maximum"""
+    if not values:
+        return None
+    summary = {f"p{p}": round(float(np.percentile(values, p)) * 1000, 1) for p in PERCENTILES}
+    summary["max"] = round(max(values) * 1000, 1)
+    return summary
+
+
+def summarize(concurrency: int, records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    ok = [r for r in records if r["error"] is None]
+    errors = Counter(r["error"] for r in records if r["error"] is not None)
+    tokens = sum(r["tokens"] or 0 for r in ok if not r["cached"])
+    return {
+        "concurrency": concurrency,
+        "requests": len(records),
+        "succeeded": len(ok),
+        "errors": dict(errors),
+        "error_rate": round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "tokens_per_second": round(tokens / elapsed, 1) if elapsed else 0.0,
+        "cache_hit_rate": round(sum(r["cached"] for r in ok) / len(ok), 4) if ok else 0.0,
+        "latency_ms": percentiles([r["latency"] for r in ok]),
+        "first_token_ms": percentiles([r["first_token"] for r in ok if r["first_token"] is not None])
+    }
+
+
+def results_table(levels: List[Dict[str, Any]]) -> Table:
+    table = Table(title="Load test")
+    table.add_column("Concurrency", justify="right", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("Answers/s", justify="right", style="green")
+    table.add_column("Tokens/s", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("TTFT p50", justify="right")
+    table.add_column("TTFT p95", justify="right")
+    table.add_column("Cached", justify="right")
+
+    def ms(summary: Optional[Dict[str, float]], key: str) -> str:
+        return f"{summary[key]:.0f} ms" if summary else "-"
+
+    for level in levels:
+        error_style = "red" if level["error_rate"] else "dim"
+        table.add_row(
+            str(level["concurrency"]),
+            str(level["requests"]),
+            f"[{error_style}]{level['error_rate']:.1%}[/{error_style}]",
+            f"{level['throughput']:.2f}",
+            f"{level['tokens_per_second']:.0f}",
+            ms(level["latency_ms"], "p50"),
+            ms(level["latency_ms"], "p95"),
+            ms(level["latency_ms"], "p99"),
+            ms(level["first_token_ms"], "p50"),
+            ms(level["first_token_ms"], "p95"),
+            f"{level['cache_hit_rate']:.0%}"
+        )
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the RAG pipeline against a mock LLM server")
+    parser.add_argument("--provider", choices=["ollama", "openai"], default="ollama",
+                        help="LLM API the pipeline speaks to the mock (default: ollama)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma-separated questions in flight, one run per level (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=100, help="Questions per level (default: 100)")
+    parser.add_argument("--duration", type=float, help="Seconds per level instead of a number of questions")
+    parser.add_argument("--questions", help="Question file, one per line (default: a built-in mix)")
+    parser.add_argument("--stream-ratio", type=float, default=0.5,
+                        help="Fraction of questions streamed, which measures time to first token (default: 0.5)")
+    parser.add_argument("--collection", help=f"Knowledge base to query (default: {Config.DEFAULT_COLLECTION})")
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="Keep the answer cache and request coalescing on (by default every question reaches "
+                             "the LLM, since a small question mix would otherwise be answered from the cache)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the question mix (default: 0)")
+    mock = parser.add_argument_group("mock LLM server")
+    mock.add_argument("--url", help="Use an already running server instead of starting one")
+    mock.add_argument("--latency", type=float, default=0.2, help="Seconds to the first token (default: 0.2)")
+    mock.add_argument("--jitter", type=float, default=0.25, help="Latency variation as a fraction (default: 0.25)")
+    mock.add_argument("--token-rate", type=float, default=50, help="Tokens per second, 0 = unlimited (default: 50)")
+    mock.add_argument("--tokens", type=int, default=60, help="Tokens per answer (default: 60)")
+    mock.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed LLM calls (default: 0)")
+    mock.add_argument("--error-status", type=int, default=503, help="HTTP status of failed calls (default: 503)")
+    parser.add_argument("--output", help="Results file (default: data/benchmarks/load-<time>.json)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    questions = load_questions(args.questions)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = MockLLMServer(latency=args.latency, jitter=args.jitter, token_rate=args.token_rate,
+                               tokens=args.tokens, error_rate=args.error_rate,
+                               error_status=args.error_status, seed=args.seed).start()
+        url = server.url
+
+    console.print(f"\n[bold cyan]Load test[/bold cyan] ({args.provider} API at {url}, "
+                  f"{len(set(questions))} distinct question(s), {args.stream_ratio:.0%} streamed)\n")
+
+    saved_config = point_config_at(args.provider, url, args.answer_cache)
+    try:
+        rag = SimpleRAGPipeline(args.collection)
+        start = time.perf_counter()
+        with console.status("[cyan]Loading the knowledge base and models...[/cyan]"):
+            num_docs = rag.initialize()
+        console.print(f"[green]+[/green] Loaded {num_docs} documents in {time.perf_counter() - start:.1f}s")
+
+        results = []
+        for i, concurrency in enumerate(levels):
+            with console.status(f"[cyan]{concurrency} concurrent question(s)...[/cyan]"):
+                level = run_level(rag, questions, concurrency, args.requests, args.duration,
+                                  args.stream_ratio, args.seed + i)
+            results.append(level)
+            errors = ", ".join(f"{name} x{count}" for name, count in level["errors"].items()) or "no errors"
+            console.print(f"[green]+[/green] Concurrency {concurrency}: {level['throughput']:.2f} answers/s, {errors}")
+
+        llm_stats = rag.collection_pipeline().llm_stats()
+        server_stats = server.stats() if server is not None else None
+    finally:
+        restore_config(saved_config)
+        if server is not None:
+            server.stop()
+
+    console.print()
+    console.print(results_table(results))
+    if server_stats:
+        console.print(
+            f"[dim]Mock server: {server_stats['requests']} LLM calls, "
+            f"{server_stats['errors_injected']} injected errors, {server_stats['tokens_sent']} tokens sent[/dim]"
+        )
+    if llm_stats:
+        console.print(
+            f"[dim]Pipeline: {llm_stats['retries']} retries, {llm_stats['failures']} failed LLM calls, "
+            f"circuit {llm_stats['circuit']['state']} (opened {llm_stats['circuit']['times_opened']}x)[/dim]"
+        )
+
+    output = Path(args.output) if args.output else (
+        Config.DATA_DIR / "benchmarks" / f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "parameters": {
+                "provider": args.provider,
+                "url": url if args.url else None,
+                "requests": None if args.duration else args.requests,
+                "duration": args.duration,
+                "stream_ratio": args.stream_ratio,
+                "questions": len(questions),
+                "answer_cache": args.answer_cache,
+                "retriever": Config.RETRIEVER,
+                "mock": None if args.url else {
+                    "latency": args.latency, "jitter": args.jitter, "token_rate": args.token_rate,
+                    "tokens": args.tokens, "error_rate": args.error_rate, "error_status": args.error_status
+                }
+            },
+            "levels": results,
+            "mock_server": server_stats,
+            "llm": llm_stats
+        }, f, indent=2)
+    console.print(f"\n[dim]Results written to {output}[/dim]\n")
+
+
+if __name__ == "__main__":
+    main()
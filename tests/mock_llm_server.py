@@ -0,0 +1,321 @@
+"""
+Mock LLM server speaking the Ollama and OpenAI chat APIs
+Answers with canned text at a configurable latency, token rate and error rate, so the
+pipeline can be load-tested without API credits, a GPU or a running Ollama
+
+Endpoints:
+    POST /api/chat              Ollama chat (streamed as NDJSON unless "stream": false)
+    POST /api/generate          Ollama model preload (an empty prompt, as sent at start-up)
+    GET  /api/tags              Ollama model list
+    POST /v1/chat/completions   OpenAI chat completions (streamed as server-sent events with "stream": true)
+    GET  /v1/models             OpenAI model list
+    GET  /stats                 requests received, injected errors and tokens sent (JSON)
+
+Usage:
+    python tests/mock_llm_server.py --port 11435 --latency 0.3 --token-rate 40 --error-rate 0.02
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 LLM_PROVIDER=ollama python chatbot.py
+    OPENAI_BASE_URL=http://127.0.0.1:11435/v1 OPENAI_API_KEY=mock LLM_PROVIDER=openai python chatbot.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+from rich.console import Console
+
+console = Console()
+
+WORDS = (
+    "Based on the provided context the knowledge base describes how documents are split into "
+    "chunks embedded retrieved by similarity and passed to the language model which answers "
+    "the question using only the most relevant passages and cites the source files"
+).split()
+
+
+class MockLLMServer:
+    """
+    Threaded HTTP server answering chat requests with canned text
+
+    Args:
+        latency: Mean seconds before the first token (time to first token)
+        jitter: Latency varies uniformly by this fraction (0.5 = +/- 50%)
+        token_rate: Tokens per second after the first one (0 = all at once)
+        tokens: Tokens per answer
+        error_rate: Fraction of requests answered with error_status instead
+        error_status: HTTP status of injected errors (503 is retried by the pipeline)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2, jitter: float = 0.25,
+                 token_rate: float = 50, tokens: int = 60, error_rate: float = 0.0,
+                 error_status: int = 503, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.counters = {"requests": 0, "streamed": 0, "errors_injected": 0, "tokens_sent": 0, "disconnects": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), MockLLMHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="mock-llm")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def count(self, counter: str, value: int = 1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.error_rate
+
+    def first_token_delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def answer_tokens(self) -> List[str]:
+        with self._lock:
+            start = self.random.randrange(len(WORDS))
+        words = [WORDS[(start + i) % len(WORDS)] for i in range(self.tokens)]
+        return [words[0].capitalize()] + [f" {word}" for word in words[1:-1]] + [f" {words[-1]}."]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters)
+
+
+def prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough prompt size (about 4/3 tokens per word) reported in the usage fields"""
+    words = sum(len(str(message.get("content") or "").split()) for message in messages)
+    return int(words * 4 / 3)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Ollama and OpenAI chat endpoints; settings and counters live on server.mock"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pools are exercised
+    server_version = "MockLLM/1.0"
+
+    @property
+    def mock(self) -> MockLLMServer:
+        return self.server.mock
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_stream(self, content_type: str):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def paced_tokens(self) -> Iterator[str]:
+        """Answer tokens, the first after the latency and the rest at the token rate"""
+        time.sleep(self.mock.first_token_delay())
+        for i, token in enumerate(self.mock.answer_tokens()):
+            if i and self.mock.token_rate > 0:
+                time.sleep(1 / self.mock.token_rate)
+            yield token
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json(HTTPStatus.OK, {"models": [{"name": "mock", "model": "mock"}]})
+        elif self.path == "/v1/models":
+            self.send_json(HTTPStatus.OK, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif self.path == "/stats":
+            self.send_json(HTTPStatus.OK, self.mock.stats())
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": "Request body must be JSON"})
+            return
+
+        if self.path == "/api/generate":
+            self.send_json(HTTPStatus.OK, {"model": request.get("model", "mock"), "response": "", "done": True})
+            return
+        if self.path not in ("/api/chat", "/v1/chat/completions"):
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path: {self.path}"})
+            return
+
+        openai = self.path == "/v1/chat/completions"
+        self.mock.count("requests")
+        if self.mock.should_fail():
+            self.mock.count("errors_injected")
+            message = "Injected error from the mock LLM server"
+            error = {"message": message, "type": "server_error", "code": None} if openai else message
+            self.send_json(self.mock.error_status, {"error": error})
+            return
+
+        # Ollama streams unless told not to; OpenAI only when asked
+        stream = request.get("stream", not openai)
+        if stream:
+            self.mock.count("streamed")
+        try:
+            if openai:
+                self.openai_chat(request, stream)
+            else:
+                self.ollama_chat(request, stream)
+        except (BrokenPipeError, ConnectionResetError):
+            self.mock.count("disconnects")
+            self.close_connection = True
+
+    def ollama_chat(self, request: Dict[str, Any], stream: bool):
+        model = request.get("model", "mock")
+        started = time.perf_counter()
+
+        def message(content: str, done: bool) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": content},
+                "done": done
+            }
+
+        def final(content: str, count: int) -> Dict[str, Any]:
+            elapsed = int((time.perf_counter() - started) * 1e9)
+            return {
+                **message(content, True),
+                "done_reason": "stop",
+                "total_duration": elapsed,
+                "eval_duration": elapsed,
+                "prompt_eval_count": prompt_tokens(request.get("messages", [])),
+                "eval_count": count
+            }
+
+        if not stream:
+            tokens = list(self.paced_tokens())
+            self.mock.count("tokens_sent", len(tokens))
+            self.send_json(HTTPStatus.OK, final("".join(tokens), len(tokens)))
+            return
+
+        self.start_stream("application/x-ndjson")
+        count = 0
+        for token in self.paced_tokens():
+            self.send_chunk(json.dumps(message(token, False)).encode("utf-8") + b"\n")
+            count += 1
+            self.mock.count("tokens_sent")
+        self.send_chunk(json.dumps(final("", count)).encode("utf-8") + b"\n")
+        self.end_stream()
+
+    def openai_chat(self, request: Dict[str, Any], stream: bool):
+        model = request.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt = prompt_tokens(request.get("messages", []))
+
+        def usage(count: int) -> Dict[str, int]:
+            return {"prompt_tokens": prompt, "completion_tokens": count, "total_tokens": prompt + count}
+
+        if not stream:
+            tokens = list(self.paced_tokens())
+            self.mock.count("tokens_sent", len(tokens))
+            self.send_json(HTTPStatus.OK, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage(len(tokens))
+            })
+            return
+
+        def event(choices: List[Dict[str, Any]], **extra) -> bytes:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": choices, **extra}
+            return b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n"
+
+        self.start_stream("text/event-stream")
+        count = 0
+        for token in self.paced_tokens():
+            delta = {"content": token} if count else {"role": "assistant", "content": token}
+            self.send_chunk(event([{"index": 0, "delta": delta, "finish_reason": None}]))
+            count += 1
+            self.mock.count("tokens_sent")
+        self.send_chunk(event([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self.send_chunk(event([], usage=usage(count)))
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.end_stream()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock Ollama and OpenAI chat APIs")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=11435, help="Port (default: 11435)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to the first token (default: 0.2)")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency variation as a fraction (default: 0.25)")
+    parser.add_argument("--token-rate", type=float, default=50, help="Tokens per second, 0 = unlimited (default: 50)")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens per answer (default: 60)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed requests (default: 0)")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of failures (default: 503)")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                           token_rate=args.token_rate, tokens=args.tokens,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    console.print(f"\n[bold cyan]Mock LLM server on {server.url}[/bold cyan]")
+    console.print(f"[dim]Ollama: OLLAMA_BASE_URL={server.url}   OpenAI: OPENAI_BASE_URL={server.url}/v1[/dim]\n")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        console.print(f"\n[cyan]Shutting down[/cyan] {server.stats()}")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
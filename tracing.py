@@ -0,0 +1,370 @@
+"""
+Tracing
+Local OpenTelemetry-style spans for the ingestion and query paths, exported to a JSONL file or the console
+
+Spans use the field names of the OpenTelemetry SDK's JSON span format
+(128-bit trace ids, 64-bit span ids, ISO timestamps, attributes, status),
+so traces can be read offline or replayed into OTel tooling later. No
+collector or network access is needed.
+
+Usage:
+    python tracing.py                 # slowest recent root spans (questions, ingestion runs)
+    python tracing.py <trace id>      # every span of one trace as a tree
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from rich.console import Console
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace id, parent span id) from a W3C traceparent header, or None if absent or invalid"""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None
+    return parts[1], parts[2]
+
+
+def _iso(epoch_ns: int) -> str:
+    return datetime.fromtimestamp(epoch_ns / 1e9, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "UNSET"
+        self.description = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.description = f"{type(error).__name__}: {error}"
+
+    def end(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+
+    @property
+    def duration(self) -> float:
+        """Seconds between start and end (or now, while running)"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = {"status_code": self.status}
+        if self.description:
+            status["description"] = self.description
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"0x{self.trace_id}", "span_id": f"0x{self.span_id}", "trace_state": "[]"},
+            "kind": "SpanKind.INTERNAL",
+            "parent_id": f"0x{self.parent_id}" if self.parent_id else None,
+            "start_time": _iso(self.start_ns),
+            "end_time": _iso(self.end_ns or time.time_ns()),
+            "status": status,
+            "attributes": self.attributes,
+            "events": [],
+            "links": [],
+            "resource": {"attributes": {"service.name": "rapidrag"}, "schema_url": ""}
+        }
+
+
+class _NoopSpan(Span):
+    """Stands in for a span while tracing is disabled"""
+
+    def __init__(self):
+        super().__init__("noop", trace_id=None)
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self, end_ns: Optional[int] = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class FileSpanExporter:
+    """Appends one JSON line per finished span"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class ConsoleSpanExporter:
+    """Prints one dim line per finished span"""
+
+    def __init__(self, console: Optional[Console] = None):
+        self.console = console or Console(stderr=True)
+
+    def export(self, span: Span):
+        error = f" [red]{span.description}[/red]" if span.status == "ERROR" else ""
+        self.console.print(
+            f"[dim]span {span.name} {span.duration * 1000:.1f} ms trace={span.trace_id}{error}[/dim]"
+        )
+
+
+class Tracer:
+    """Creates spans, tracks the current one per thread/task and hands finished spans to the exporters"""
+
+    def __init__(self, exporters: List):
+        self.exporters = exporters
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def _export(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                pass  # Tracing must never fail the traced operation
+
+    def start_span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                   **attributes) -> Span:
+        """
+        Start a child of the current span without making it current (see use_span)
+
+        Pass trace_id (and optionally parent_id) to start or continue a trace
+        received from elsewhere, e.g. a traceparent header.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if trace_id is None and parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        return Span(name, trace_id or new_trace_id(), parent_id, attributes)
+
+    def end_span(self, span: Span):
+        if span is NOOP_SPAN:
+            return
+        span.end()
+        self._export(span)
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+        """Run a block as a span, a child of the current span"""
+        span = self.start_span(name, trace_id, parent_id, **attributes)
+        try:
+            with use_span(span):
+                yield span
+        finally:
+            self.end_span(span)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None, **attributes):
+        """Export a span for work that just finished and was timed elsewhere (e.g. in a worker process)"""
+        parent = _current_span.get()
+        if not self.enabled or parent is None:
+            return
+        end_ns = time.time_ns()
+        span = Span(name, parent.trace_id, parent.span_id, attributes, start_ns=end_ns - int(seconds * 1e9))
+        if error is not None:
+            span.status = "ERROR"
+            span.description = error
+        span.end(end_ns)
+        self._export(span)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer(config=None) -> Tracer:
+    """The process-wide tracer, configured from TRACE_EXPORTER / TRACE_FILE on first use"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            if config is None:
+                from config import Config as config
+            exporters = []
+            if "file" in config.TRACE_EXPORTER:
+                exporters.append(FileSpanExporter(config.TRACE_FILE))
+            if "console" in config.TRACE_EXPORTER:
+                exporters.append(ConsoleSpanExporter())
+            _tracer = Tracer(exporters)
+        return _tracer
+
+
+def span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+    """Span on the process-wide tracer (see Tracer.span)"""
+    return get_tracer().span(name, trace_id, parent_id, **attributes)
+
+
+def start_span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes) -> Span:
+    return get_tracer().start_span(name, trace_id, parent_id, **attributes)
+
+
+def end_span(span: Span):
+    get_tracer().end_span(span)
+
+
+@contextmanager
+def use_span(span: Span):
+    """Make a started span current for a block (errors raised in the block are recorded on it)"""
+    if span is NOOP_SPAN:
+        yield span
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+
+
+def current_span() -> Span:
+    """The innermost running span, or a no-op span outside any trace"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    return current_span().trace_id
+
+
+def in_current_context(fn: Callable) -> Callable:
+    """Bind fn to a copy of the current context, so spans it opens in another thread join this trace"""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def load_spans(path: Path) -> List[Dict[str, Any]]:
+    """Spans from a JSONL trace file (unreadable lines are skipped)"""
+    spans = []
+    if not Path(path).exists():
+        return spans
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            start = datetime.strptime(record["start_time"], "%Y-%m-%dT%H:%M:%S.%fZ")
+            end = datetime.strptime(record["end_time"], "%Y-%m-%dT%H:%M:%S.%fZ")
+            record["duration"] = (end - start).total_seconds()
+            spans.append(record)
+    return spans
+
+
+def print_trace(spans: List[Dict[str, Any]], trace_id: str, console: Console):
+    """Print one trace as an indented tree in start order"""
+    trace_id = trace_id.lower().removeprefix("0x")
+    spans = sorted(
+        (s for s in spans if s["context"]["trace_id"] == f"0x{trace_id}"),
+        key=lambda s: s["start_time"]
+    )
+    if not spans:
+        console.print(f"[yellow]No spans found for trace {trace_id}[/yellow]")
+        return
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {s["context"]["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in span_ids else None
+        children.setdefault(parent, []).append(s)
+
+    def show(s: Dict[str, Any], depth: int):
+        attributes = ", ".join(f"{k}={v}" for k, v in s["attributes"].items())
+        error = f" [red]{s['status'].get('description', 'error')}[/red]" if s["status"]["status_code"] == "ERROR" else ""
+        console.print(
+            f"{'  ' * depth}[cyan]{s['name']}[/cyan] {s['duration'] * 1000:.1f} ms"
+            + (f" [dim]{attributes}[/dim]" if attributes else "") + error
+        )
+        for child in children.get(s["context"]["span_id"], []):
+            show(child, depth + 1)
+
+    console.print(f"\n[bold cyan]Trace {trace_id}[/bold cyan] ({spans[0]['start_time']})\n")
+    for root in children.get(None, []):
+        show(root, 0)
+    console.print()
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Inspect recorded traces")
+    parser.add_argument("trace_id", nargs="?", help="Show every span of this trace")
+    parser.add_argument("--file", default=str(Config.TRACE_FILE), help=f"Trace file (default: {Config.TRACE_FILE})")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest traces to list (default: 10)")
+    parser.add_argument("--name", help="Only list root spans with this name (e.g. rag.query, ingest.run)")
+    args = parser.parse_args()
+
+    console = Console()
+    spans = load_spans(Path(args.file))
+    if args.trace_id:
+        print_trace(spans, args.trace_id, console)
+        return
+
+    # Roots are spans whose parent is not recorded here (none, or in a caller's trace)
+    span_ids = {s["context"]["span_id"] for s in spans}
+    roots = [s for s in spans if s["parent_id"] not in span_ids and (not args.name or s["name"] == args.name)]
+    if not roots:
+        hint = "" if "file" in Config.TRACE_EXPORTER else " (set TRACE_EXPORTER=file to record them)"
+        console.print(f"[yellow]No traces recorded in {args.file}{hint}[/yellow]")
+        return
+    console.print(f"\n[bold cyan]Slowest of {len(roots)} trace(s)[/bold cyan]\n")
+    for s in sorted(roots, key=lambda s: s["duration"], reverse=True)[:args.slowest]:
+        error = " [red]error[/red]" if s["status"]["status_code"] == "ERROR" else ""
+        console.print(
+            f"{s['duration'] * 1000:10.1f} ms  [cyan]{s['name']}[/cyan]  "
+            f"{s['context']['trace_id'][2:]}  [dim]{s['start_time']}[/dim]{error}"
+        )
+    console.print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Vector Indexes
+Approximate nearest-neighbour indexes over the document store embeddings
+
+Two CPU-only index types are available:
+
+* HNSW - graph index from hnswlib (optional dependency: pip install hnswlib)
+* IVF  - inverted-file index (spherical k-means) implemented with numpy
+
+Indexes are built at ingest time and saved next to the document store.
+MatrixEmbeddingRetriever is the exact alternative: a brute-force scan over
+a normalised in-memory matrix. All scores are cosine similarities.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from haystack import Document, component
+
+from document_store_io import current_generation, is_binary_store, store_version
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+INDEX_TYPES = ["hnsw", "ivf"]
+
+# Rows processed per block when scanning large matrices
+BLOCK_SIZE = 65536
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the k largest scores per row, best first"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        empty = np.empty(scores.shape[:-1] + (0,))
+        return empty.astype(np.int64), empty.astype(np.float32)
+    idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part = np.take_along_axis(scores, idx, axis=-1)
+    order = np.argsort(-part, axis=-1)
+    return np.take_along_axis(idx, order, axis=-1), np.take_along_axis(part, order, axis=-1)
+
+
+def exact_search(matrix: np.ndarray, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force cosine search, scanning the matrix block by block"""
+    queries = normalize(np.atleast_2d(queries))
+    best_idx = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+    for start in range(0, len(matrix), BLOCK_SIZE):
+        block = normalize(matrix[start:start + BLOCK_SIZE])
+        idx, scores = top_k(queries @ block.T, k)
+        best_idx = np.concatenate([best_idx, idx + start], axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        if best_idx.shape[1] > k:
+            keep, best_scores = top_k(best_scores, k)
+            best_idx = np.take_along_axis(best_idx, keep, axis=1)
+
+    return best_idx, best_scores
+
+
+class HnswIndex:
+    """HNSW graph index backed by hnswlib"""
+
+    kind = "hnsw"
+    filename = "index_hnsw.bin"
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        if not HNSW_AVAILABLE:
+            raise ImportError("hnswlib not installed. Run: pip install hnswlib")
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+
+    def build(self, matrix: np.ndarray):
+        """Add every row of the matrix (row number = document position)"""
+        self.index.init_index(max_elements=max(len(matrix), 1), ef_construction=self.ef_construction, M=self.m)
+        for start in range(0, len(matrix), BLOCK_SIZE):
+            block = np.asarray(matrix[start:start + BLOCK_SIZE], dtype=np.float32)
+            self.index.add_items(block, np.arange(start, start + len(block)))
+        self.index.set_ef(self.ef_search)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory of the graph: vectors, labels and links (2M on the base layer, M above)"""
+        count = self.index.get_current_count()
+        return count * (self.dim * 4 + 8 + 2 * self.m * 4 + 4) + count // self.m * (self.m * 4 + 4)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, self.index.get_current_count())
+        if k <= 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(queries, k=k)
+        return labels.astype(np.int64), 1.0 - distances
+
+    def save(self, path: Path):
+        self.index.save_index(str(path))
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray, m: int = 16, ef_search: int = 64) -> "HnswIndex":
+        index = cls(matrix.shape[1], m=m, ef_search=ef_search)
+        index.index.load_index(str(path), max_elements=max(len(matrix), 1))
+        index.index.set_ef(ef_search)
+        return index
+
+
+class IvfIndex:
+    """Inverted-file index: spherical k-means clusters probed at query time"""
+
+    kind = "ivf"
+    filename = "index_ivf.npz"
+
+    def __init__(self, matrix: np.ndarray, nlist: int = 0, nprobe: int = 8, iterations: int = 15, seed: int = 0):
+        self.matrix = matrix
+        self.nlist = nlist or max(1, int(4 * np.sqrt(len(matrix))))
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.list_ids = None
+        self.list_offsets = None
+        self.norms = None
+
+    def build(self, matrix: np.ndarray = None):
+        """Train centroids on a sample, then assign every row to its nearest centroid"""
+        matrix = self.matrix if matrix is None else matrix
+        n = len(matrix)
+        rng = np.random.default_rng(self.seed)
+
+        if n:
+            self.nlist = min(self.nlist, n)
+            sample_size = min(n, self.nlist * 64)
+            sample = normalize(matrix[np.sort(rng.choice(n, sample_size, replace=False))])
+            centroids = sample[rng.choice(len(sample), self.nlist, replace=False)]
+        else:
+            self.nlist = 0
+            sample = centroids = np.zeros((0, matrix.shape[1]), dtype=np.float32)
+
+        for _ in range(self.iterations if n else 0):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            # Re-seed empty clusters with random sample points
+            empty = np.bincount(assign, minlength=self.nlist) == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        assignments = np.empty(n, dtype=np.int64)
+        norms = np.empty(n, dtype=np.float32)
+        for start in range(0, n, BLOCK_SIZE):
+            block = np.asarray(matrix[start:start + BLOCK_SIZE], dtype=np.float32)
+            block_norms = np.linalg.norm(block, axis=1)
+            norms[start:start + len(block)] = block_norms
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        self.centroids = centroids.astype(np.float32)
+        self.list_ids = np.argsort(assignments, kind="stable").astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.nlist))]).astype(np.int64)
+        norms[norms == 0] = 1.0
+        self.norms = norms
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the centroids and inverted lists (the matrix belongs to the store)"""
+        arrays = (self.centroids, self.list_ids, self.list_offsets, self.norms)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        """Row ids in the nprobe clusters closest to the query"""
+        nprobe = min(self.nprobe, len(self.centroids))
+        if nprobe == 0:
+            return np.empty(0, dtype=np.int64)
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe])
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize(np.atleast_2d(queries))
+        all_idx, all_scores = [], []
+        for query in queries:
+            ids = np.sort(self.candidates(query))
+            scores = (np.asarray(self.matrix[ids], dtype=np.float32) @ query) / self.norms[ids]
+            idx, best = top_k(scores, k)
+            all_idx.append(ids[idx])
+            all_scores.append(best)
+
+        width = max((len(row) for row in all_idx), default=0)
+        labels = np.full((len(queries), width), -1, dtype=np.int64)
+        scores = np.full((len(queries), width), -np.inf, dtype=np.float32)
+        for i, (row_idx, row_scores) in enumerate(zip(all_idx, all_scores)):
+            labels[i, :len(row_idx)] = row_idx
+            scores[i, :len(row_scores)] = row_scores
+        return labels, scores
+
+    def save(self, path: Path):
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_ids=self.list_ids,
+            list_offsets=self.list_offsets,
+            norms=self.norms,
+            nprobe=np.int64(self.nprobe)
+        )
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray, nprobe: int = None) -> "IvfIndex":
+        data = np.load(path)
+        index = cls(matrix, nlist=len(data["centroids"]), nprobe=int(nprobe or data["nprobe"]))
+        index.centroids = data["centroids"]
+        index.list_ids = data["list_ids"]
+        index.list_offsets = data["list_offsets"]
+        index.norms = data["norms"]
+        return index
+
+
+def index_file(store_path: Path, kind: str) -> Path:
+    """Path of a persisted index (inside the live generation for binary stores)"""
+    store_path = Path(store_path)
+    filename = _index_class(kind).filename
+    if is_binary_store(store_path):
+        return current_generation(store_path) / filename
+    return store_path.with_name(f"{store_path.stem}.{filename}")
+
+
+def _index_class(kind: str):
+    if kind == "hnsw":
+        return HnswIndex
+    if kind == "ivf":
+        return IvfIndex
+    raise ValueError(f"Unknown index type: {kind}")
+
+
+def build_index(kind: str, matrix: np.ndarray, config) -> Any:
+    """Build an index over the embedding matrix using the configured parameters"""
+    if kind == "hnsw":
+        index = HnswIndex(
+            matrix.shape[1],
+            m=config.HNSW_M,
+            ef_construction=config.HNSW_EF_CONSTRUCTION,
+            ef_search=config.HNSW_EF_SEARCH
+        )
+    else:
+        index = IvfIndex(matrix, nlist=config.IVF_NLIST, nprobe=config.IVF_NPROBE)
+    index.build(matrix)
+    return index
+
+
+def index_header_file(path: Path) -> Path:
+    """Sidecar recording which store version an index was built from"""
+    return path.with_name(path.name + ".json")
+
+
+def _index_header(kind: str, store_path: Path, matrix: np.ndarray) -> Dict[str, Any]:
+    return {"kind": kind, "store_version": store_version(store_path), "count": len(matrix), "dim": matrix.shape[1]}
+
+
+def _read_index_header(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(index_header_file(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def save_index(index, store_path: Path, matrix: np.ndarray):
+    """Persist an index next to its document store, tagged with the store's version and shape"""
+    path = index_file(store_path, index.kind)
+    index.save(path)
+    header = _index_header(index.kind, store_path, matrix)
+    if index.kind == "hnsw":
+        # The graph file does not record M, which the in-memory size depends on
+        header["m"] = index.m
+    with open(index_header_file(path), 'w', encoding='utf-8') as f:
+        json.dump(header, f)
+
+
+def index_is_current(kind: str, store_path: Path, matrix: np.ndarray) -> bool:
+    """Whether a persisted index exists and was built from this version of the store"""
+    path = index_file(store_path, kind)
+    header = _read_index_header(path)
+    if header is None or not path.exists():
+        return False
+    expected = _index_header(kind, store_path, matrix)
+    return {key: header.get(key) for key in expected} == expected
+
+
+def load_index(kind: str, store_path: Path, matrix: np.ndarray, config) -> Optional[Any]:
+    """Load a persisted index, or None if it is missing or was built from another version of the store"""
+    if not index_is_current(kind, store_path, matrix):
+        return None
+    path = index_file(store_path, kind)
+    if kind == "hnsw":
+        m = _read_index_header(path).get("m", config.HNSW_M)
+        return HnswIndex.load(path, matrix, m=m, ef_search=config.HNSW_EF_SEARCH)
+    return IvfIndex.load(path, matrix, nprobe=config.IVF_NPROBE)
+
+
+def measure_recall(index, matrix: np.ndarray, k: int = 10, sample: int = 200, seed: int = 0) -> float:
+    """
+    Recall@k of an index against exact search
+
+    Queries are stored vectors with a little noise, so that the
+    exact answer is not always the query's own row.
+    """
+    if not len(matrix):
+        return 1.0
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(matrix), min(sample, len(matrix)), replace=False)
+    queries = normalize(matrix[np.sort(rows)])
+    queries = normalize(queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32))
+
+    k = min(k, len(matrix))
+    truth, _ = exact_search(matrix, queries, k)
+    found, _ = index.search(queries, k)
+    hits = sum(len(set(t.tolist()) & set(f.tolist())) for t, f in zip(truth, found))
+    return hits / (len(queries) * k)
+
+
+@component
+class MatrixEmbeddingRetriever:
+    """
+    Exact cosine retriever over a contiguous, pre-normalised float32 matrix
+
+    The matrix is normalised once when the retriever is created, so a query
+    costs one matrix-vector product plus an argpartition top-k selection.
+    Rows are appended in place (with spare capacity) as documents are added.
+    """
+
+    def __init__(self, embeddings: np.ndarray, documents: List[Document], top_k: int = 10):
+        if len(embeddings) != len(documents):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(documents)} documents")
+        dim = embeddings.shape[1] if len(embeddings) else 0
+        self._matrix = np.empty((len(embeddings), dim), dtype=np.float32)
+        for start in range(0, len(embeddings), BLOCK_SIZE):
+            self._matrix[start:start + BLOCK_SIZE] = normalize(embeddings[start:start + BLOCK_SIZE])
+        self.size = len(embeddings)
+        self.documents = list(documents)
+        self.top_k = top_k
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Normalised embeddings of the current documents"""
+        return self._matrix[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the matrix, including rows reserved for growth"""
+        return self._matrix.nbytes
+
+    def add(self, embeddings: np.ndarray, documents: List[Document]):
+        """Append documents, growing the matrix geometrically"""
+        embeddings = normalize(np.atleast_2d(embeddings))
+        if len(embeddings) != len(documents):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(documents)} documents")
+        needed = self.size + len(embeddings)
+        if not self._matrix.shape[1]:
+            # An empty store has no dimension yet; the first documents set it
+            self._matrix = np.empty((0, embeddings.shape[1]), dtype=np.float32)
+        elif embeddings.shape[1] != self._matrix.shape[1]:
+            raise ValueError(f"Got {embeddings.shape[1]}-dim embeddings for a {self._matrix.shape[1]}-dim matrix")
+        if needed > len(self._matrix):
+            grown = np.empty((max(needed, 2 * len(self._matrix)), self._matrix.shape[1]), dtype=np.float32)
+            grown[:self.size] = self._matrix[:self.size]
+            self._matrix = grown
+        self._matrix[self.size:needed] = embeddings
+        self.size = needed
+        self.documents.extend(documents)
+
+    def search(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows and cosine scores for each query, optionally only among the given rows"""
+        queries = normalize(np.atleast_2d(queries))
+        if not self.size or (rows is not None and not len(rows)):
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+        if rows is None:
+            return top_k(queries @ self.matrix.T, k)
+        idx, scores = top_k(queries @ self.matrix[rows].T, k)
+        return rows[idx], scores
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], top_k: Optional[int] = None) -> Dict[str, List[Document]]:
+        labels, scores = self.search(np.asarray(query_embedding, dtype=np.float32), top_k or self.top_k)
+        documents = []
+        for label, score in zip(labels[0], scores[0]):
+            doc = self.documents[label]
+            documents.append(Document(id=doc.id, content=doc.content, meta=doc.meta, score=float(score)))
+        return {"documents": documents}
+
+
+@component
+class AnnEmbeddingRetriever:
+    """Retriever that answers embedding queries from an approximate nearest-neighbour index"""
+
+    def __init__(self, index, documents: List[Document], top_k: int = 10):
+        self.index = index
+        self.documents = documents
+        self.top_k = top_k
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k rows and cosine scores for each query (-1 where fewer were found)"""
+        return self.index.search(queries, k)
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], top_k: Optional[int] = None) -> Dict[str, List[Document]]:
+        labels, scores = self.search(np.asarray(query_embedding, dtype=np.float32), top_k or self.top_k)
+        documents = []
+        for label, score in zip(labels[0], scores[0]):
+            if label < 0:
+                continue
+            doc = self.documents[label]
+            documents.append(Document(id=doc.id, content=doc.content, meta=doc.meta, score=float(score)))
+        return {"documents": documents}
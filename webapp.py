@@ -17,6 +17,9 @@ from typing import List
 import plotly.graph_objects as go
 from rag_pipeline import SimpleRAGPipeline
 from config import Config
+from document_store_io import iter_store_records, read_store_info, resolve_store_path, store_exists
+import tracing
+from profiling import profiled
 import os
 import yaml
 from yaml.loader import SafeLoader
@@ -248,6 +251,8 @@ def init_session_state():
         st.session_state.rag_pipeline = None
     if 'system_initialized' not in st.session_state:
         st.session_state.system_initialized = False
+    if 'collection' not in st.session_state:
+        st.session_state.collection = Config.DEFAULT_COLLECTION
     if 'total_documents' not in st.session_state:
         st.session_state.total_documents = 0
     if 'total_queries' not in st.session_state:
@@ -294,15 +299,19 @@ def load_user_history(username):
 # Initialize RAG pipeline
 @st.cache_resource
 def get_rag_pipeline():
-    """Initialize and cache the RAG pipeline"""
+    """Create and cache the RAG pipeline; it loads in the background (see readiness())"""
     try:
         pipeline = SimpleRAGPipeline()
-        pipeline.initialize()  # CRITICAL: Load documents into the pipeline!
+        pipeline.initialize_in_background()  # CRITICAL: Load documents into the pipeline!
         return pipeline
     except Exception as e:
         st.error(f"Error initializing pipeline: {str(e)}")
         return None
 
+def collection_config():
+    """Configuration of the knowledge base collection selected in this session"""
+    return Config.for_collection(st.session_state.collection)
+
 # Load authentication config
 @st.cache_data
 def load_auth_config():
@@ -426,27 +435,45 @@ def main():
         # System status
         st.markdown("### 🔮 System Status")
         
-        # Initialize pipeline if not done
-        if not st.session_state.system_initialized:
-            with st.spinner("🚀 Initializing RAPIDRAG..."):
-                st.session_state.rag_pipeline = get_rag_pipeline()
-                if st.session_state.rag_pipeline:
-                    st.session_state.system_initialized = True
-                    # Get document count
-                    try:
-                        docs_path = Path("data/document_store.json")
-                        if docs_path.exists():
-                            with open(docs_path) as f:
-                                data = json.load(f)
-                                st.session_state.total_documents = len(data)
-                    except:
-                        st.session_state.total_documents = 0
+        # Initialize pipeline if not done (collections load in the background on first use)
+        warming_up = False
+        st.session_state.rag_pipeline = get_rag_pipeline()
+        if st.session_state.rag_pipeline:
+            knowledge_bases = st.session_state.rag_pipeline.knowledge_bases
+            collections = knowledge_bases.names()
+            if len(collections) > 1:
+                if st.session_state.collection not in collections:
+                    st.session_state.collection = Config.DEFAULT_COLLECTION
+                st.session_state.collection = st.selectbox(
+                    "📚 Knowledge base", collections, index=collections.index(st.session_state.collection)
+                )
+            
+            readiness = st.session_state.rag_pipeline.readiness(st.session_state.collection)
+            if readiness["ready"]:
+                st.session_state.system_initialized = True
+                # Get document count
+                try:
+                    docs_path = resolve_store_path(collection_config())
+                    if store_exists(docs_path):
+                        st.session_state.total_documents = read_store_info(docs_path)["count"]
+                except:
+                    st.session_state.total_documents = 0
+            else:
+                st.session_state.system_initialized = False
+                if all(state["status"] == "pending" for state in readiness["stages"].values()):
+                    st.session_state.rag_pipeline.initialize_in_background(st.session_state.collection)
+                warming_up = not readiness["failed"]
+                show_warmup_status(readiness)
         
         if st.session_state.system_initialized:
             st.success("✅ System Online")
             st.info(f"🤖 LLM: {Config.LLM_PROVIDER.upper()}")
             st.info(f"📚 Documents: {st.session_state.total_documents}")
             st.info(f"💬 Queries: {st.session_state.total_queries}")
+            if st.session_state.rag_pipeline:
+                show_warmup_status(st.session_state.rag_pipeline.readiness(st.session_state.collection), expanded=False)
+        elif warming_up:
+            st.warning("🚀 Initializing RAPIDRAG...")
         else:
             st.error("❌ System Offline")
         
@@ -512,6 +539,24 @@ def main():
         show_settings_page()
     elif page == "📊 Analytics":
         show_analytics_page()
+    
+    # Poll until the background warm-up finishes
+    if warming_up:
+        time.sleep(1)
+        st.rerun()
+
+def show_warmup_status(readiness, expanded=True):
+    """Per-stage start-up progress (document store, embedder, LLM)"""
+    icons = {"pending": "⏳", "loading": "🔄", "ready": "✅", "degraded": "⚠️", "failed": "❌"}
+    labels = {"store": "Knowledge base", "embedder": "Embedding model", "llm": "LLM"}
+    with st.expander("🚦 Start-up", expanded=expanded):
+        for stage, state in readiness["stages"].items():
+            line = f"{icons.get(state['status'], '')} {labels.get(stage, stage)}: {state['status']}"
+            if state["seconds"] is not None:
+                line += f" ({state['seconds']:.1f}s)"
+            st.markdown(line)
+            if state["error"]:
+                st.caption(state["error"])
 
 def show_chat_page():
     """Main chat interface"""
@@ -545,6 +590,23 @@ def show_chat_page():
     
     st.markdown("<br/>", unsafe_allow_html=True)
     
+    # Optional metadata filter (restricts retrieval to matching documents)
+    filters = {}
+    metadata_index = None
+    if st.session_state.system_initialized and st.session_state.rag_pipeline:
+        metadata_index = st.session_state.rag_pipeline.knowledge_bases.pipeline(st.session_state.collection).metadata_index
+    if metadata_index is not None:
+        with st.expander("🔎 Filter documents"):
+            col1, col2 = st.columns(2)
+            with col1:
+                file_types = st.multiselect("File types", metadata_index.values("file_type"))
+            with col2:
+                path_glob = st.text_input("Path pattern", placeholder="e.g. */policies/*")
+            if file_types:
+                filters["file_type"] = file_types
+            if path_glob.strip():
+                filters["filepath"] = path_glob.strip()
+    
     # Chat container
     chat_container = st.container()
     
@@ -553,6 +615,8 @@ def show_chat_page():
         for message in st.session_state.chat_history:
             with st.chat_message(message["role"], avatar="🌟" if message["role"] == "assistant" else "👤"):
                 st.markdown(message["content"])
+                if message.get("trace_id"):
+                    st.caption(f"trace {message['trace_id']}")
     
     # Chat input
     if prompt := st.chat_input("⚡ Ask anything from your knowledge base..."):
@@ -565,13 +629,37 @@ def show_chat_page():
         with st.chat_message("user", avatar="👤"):
             st.markdown(prompt)
         
-        # Generate response
-        with st.chat_message("assistant", avatar="🌟"):
+        # Generate response (streamed token by token once retrieval is done);
+        # the pipeline's spans join this question's trace. PROFILE_ENABLED=true
+        # also profiles each question (summary printed in the server console)
+        with st.chat_message("assistant", avatar="🌟"), \
+                profiled("webapp-query", Config.PROFILE_ENABLED), \
+                tracing.span("webapp.question", collection=st.session_state.collection) as span:
             with st.spinner("⚡ Searching knowledge base..."):
                 try:
-                    response = st.session_state.rag_pipeline.ask(prompt)
-                    st.markdown(response)
-                    st.session_state.chat_history.append({"role": "assistant", "content": response})
+                    events = st.session_state.rag_pipeline.ask_stream(
+                        prompt, filters=filters or None, collection=st.session_state.collection
+                    )
+                    next(events)
+                except Exception as e:
+                    span.record_error(e)
+                    events = None
+                    error_msg = f"❌ Error: {str(e)}"
+                    st.error(error_msg)
+                    st.session_state.chat_history.append(
+                        {"role": "assistant", "content": error_msg, "trace_id": span.trace_id}
+                    )
+            
+            if events is not None:
+                try:
+                    response = st.write_stream(
+                        event["text"] for event in events if event["type"] == "token"
+                    )
+                    if span.trace_id:
+                        st.caption(f"trace {span.trace_id}")
+                    st.session_state.chat_history.append(
+                        {"role": "assistant", "content": response, "trace_id": span.trace_id}
+                    )
                     st.session_state.total_queries += 1
                     
                     # Auto-save session if authenticated
@@ -586,9 +674,12 @@ def show_chat_page():
                         st.session_state.chat_history = st.session_state.chat_history[-50:]
                         
                 except Exception as e:
+                    span.record_error(e)
                     error_msg = f"❌ Error: {str(e)}"
                     st.error(error_msg)
-                    st.session_state.chat_history.append({"role": "assistant", "content": error_msg})
+                    st.session_state.chat_history.append(
+                        {"role": "assistant", "content": error_msg, "trace_id": span.trace_id}
+                    )
 
 def show_upload_page():
     """Document upload interface"""
@@ -629,9 +720,9 @@ def show_upload_page():
             with status_container:
                 status_text = st.empty()
             
-            # Save files
-            documents_dir = Path("documents")
-            documents_dir.mkdir(exist_ok=True)
+            # Save files into the selected collection's documents directory
+            documents_dir = collection_config().DOCUMENTS_DIR
+            documents_dir.mkdir(parents=True, exist_ok=True)
             
             for i, file in enumerate(uploaded_files):
                 with status_container:
@@ -662,45 +753,39 @@ def show_upload_page():
                 from ingest_documents import DocumentIngestionPipeline
                 
                 with progress_container:
-                    progress_bar.progress(70, text="Embedding documents...")
+                    progress_bar.progress(70, text="Embedding new and changed documents...")
                 
-                # Run ingestion
-                pipeline = DocumentIngestionPipeline()
-                pipeline.initialize_embedder()
+                # Run incremental ingestion (unchanged files are skipped)
+                pipeline = DocumentIngestionPipeline(collection=st.session_state.collection)
+                summary = pipeline.run(source_dir=documents_dir)
                 
-                with progress_container:
-                    progress_bar.progress(80, text="Loading documents...")
-                
-                # Load from directory
-                docs = pipeline.load_documents_from_directory(documents_dir)
-                
-                if docs:
-                    with progress_container:
-                        progress_bar.progress(85, text="Creating embeddings...")
-                    
-                    pipeline.embed_and_store_documents(docs)
-                    
-                    with progress_container:
-                        progress_bar.progress(95, text="Saving to knowledge base...")
-                    
-                    pipeline.save_document_store()
-                    
+                if summary["added"] or summary["updated"] or summary["removed"]:
                     with progress_container:
                         progress_bar.progress(100, text="Complete!")
                     
                     with status_container:
                         status_text.empty()
-                        st.success(f" {len(docs)} document(s) successfully added to knowledge base!")
+                        st.success(
+                            f" {summary['added']} document(s) added and {summary['updated']} updated "
+                            f"in the knowledge base!"
+                        )
                     
                     # Show balloons
                     st.balloons()
                     
-                    # Clear pipeline cache to reload
-                    if 'rag_pipeline' in st.session_state:
-                        del st.session_state.rag_pipeline
+                    # Unload the collection so it is reloaded with the new documents
+                    if st.session_state.rag_pipeline:
+                        st.session_state.rag_pipeline.knowledge_bases.evict(st.session_state.collection)
                         st.session_state.system_initialized = False
                     
                     st.info("💡 Go to Chat tab to query your new documents!")
+                elif summary["unchanged"]:
+                    with progress_container:
+                        progress_bar.progress(100, text="Complete!")
+                    
+                    with status_container:
+                        status_text.empty()
+                        st.info("ℹ️ Knowledge base is already up to date")
                 else:
                     with status_container:
                         status_text.empty()
@@ -716,23 +801,27 @@ def show_upload_page():
     st.markdown("---")
     st.markdown("### 📚 Current Knowledge Base")
     
-    docs_path = Path("data/document_store.json")
-    if docs_path.exists():
+    docs_path = resolve_store_path(collection_config())
+    if store_exists(docs_path):
         try:
-            with open(docs_path) as f:
-                data = json.load(f)
+            total = read_store_info(docs_path)["count"]
+                
+            if total:
+                st.info(f"📊 Total chunks: {total}")
                 
-            if data:
-                st.info(f"📊 Total documents: {len(data)}")
+                # List distinct files without loading any embeddings
+                files = {}
+                for doc in iter_store_records(docs_path, with_embeddings=False):
+                    meta = doc.get('meta', {})
+                    key = meta.get('filepath', meta.get('filename', 'Unknown'))
+                    files.setdefault(key, (meta.get('filename', 'Unknown'), meta.get('file_type', 'unknown')))
                 
                 with st.expander("View Document List"):
-                    for i, doc in enumerate(data[:10], 1):  # Show first 10
-                        filename = doc.get('meta', {}).get('filename', 'Unknown')
-                        file_type = doc.get('meta', {}).get('file_type', 'unknown')
+                    for i, (filename, file_type) in enumerate(list(files.values())[:10], 1):  # Show first 10
                         st.write(f"{i}. **{filename}** ({file_type})")
                     
-                    if len(data) > 10:
-                        st.write(f"... and {len(data) - 10} more documents")
+                    if len(files) > 10:
+                        st.write(f"... and {len(files) - 10} more documents")
             else:
                 st.warning("No documents in knowledge base yet.")
         except:
@@ -836,16 +925,19 @@ def show_analytics_page():
     # Document types
     st.markdown("### 📁 Document Types Distribution")
     
-    docs_path = Path("data/document_store.json")
-    if docs_path.exists():
+    docs_path = resolve_store_path(collection_config())
+    if store_exists(docs_path):
         try:
-            with open(docs_path) as f:
-                data = json.load(f)
-            
-            # Count file types
+            # Count file types (per file, not per chunk)
             file_types = {}
-            for doc in data:
-                file_type = doc.get('meta', {}).get('file_type', 'unknown')
+            seen_files = set()
+            for doc in iter_store_records(docs_path, with_embeddings=False):
+                meta = doc.get('meta', {})
+                key = meta.get('filepath', meta.get('filename'))
+                if key in seen_files:
+                    continue
+                seen_files.add(key)
+                file_type = meta.get('file_type', 'unknown')
                 file_types[file_type] = file_types.get(file_type, 0) + 1
             
             if file_types: